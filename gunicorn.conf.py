@@ -0,0 +1,21 @@
+"""
+gunicorn settings; gunicorn reads ./gunicorn.conf.py on its own, so the
+Procfile's ``gunicorn samarize.wsgi`` (or ``samarize.asgi:application`` with
+``-k uvicorn.workers.UvicornWorker``) picks this up.
+
+Each worker compiles every template right after loading the app and before
+taking requests, so the first requests after a deploy or a scale-up don't
+pay for it. Set TEMPLATE_WARMUP=False to skip it.
+"""
+
+
+def post_worker_init(worker):
+    from django.conf import settings
+
+    if not settings.TEMPLATE_WARMUP:
+        return
+
+    from main_app.warmup import warm_templates
+
+    count, seconds = warm_templates()
+    worker.log.info("Compiled %d templates in %.0f ms", count, seconds * 1000)
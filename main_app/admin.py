@@ -1,18 +1,43 @@
 from django.contrib import admin
+from django.db import transaction
+
 from .models import Category, Location, Asset, Inventory, PurchaseOrder, Supplier
+from .stock import record_movements
 
 # Register your models here.
 
 
+class StockAdmin(admin.ModelAdmin):
+    """Quantities change only through the stock ledger (see stock.py).
+
+    A new row's quantity is recorded as its opening receipt; afterwards it
+    is read-only here and changes on the item's stock page.
+    """
+
+    def get_readonly_fields(self, request, obj=None):
+        return ("quantity",) if obj else ()
+
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            if not change:
+                obj.save()
+                record_movements(type(obj), "receipt", [(obj, obj.quantity)], request.user, "New item")
+                return
+            # Leave the quantity alone, so a movement made while the form was open isn't overwritten
+            obj.save(update_fields=[
+                field.name for field in obj._meta.concrete_fields if not field.primary_key and field.name != "quantity"
+            ])
+
+
 # Category
 admin.site.register(Category)
 # Location
 admin.site.register(Location)
 # Asset
-admin.site.register(Asset)
+admin.site.register(Asset, StockAdmin)
 # Inventory
-admin.site.register(Inventory)
+admin.site.register(Inventory, StockAdmin)
 # PurchaseOrder
 admin.site.register(PurchaseOrder)
 # Supplier
-admin.site.register(Supplier)
\ No newline at end of file
+admin.site.register(Supplier)
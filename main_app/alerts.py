@@ -0,0 +1,123 @@
+"""
+Low stock alerts.
+
+An inventory item is low while its quantity is below its
+``reorder_threshold``; items without a threshold never are.
+``low_stock_items`` reads them through ``inventory_low_stock_idx``, a partial
+index that holds only the low items, in (quantity, id) order, so the
+dashboard reads the few rows it shows instead of sorting the table.
+
+``evaluate_low_stock`` (the ``evaluate_low_stock`` command; schedule it every
+few minutes) only looks at items updated since its ``Watermark``, which
+covers every quantity or threshold change:
+
+* a low item without an open ``StockAlert`` gets one, and a pending purchase
+  order for its ``reorder_quantity`` from its ``reorder_supplier`` when both
+  are set;
+* an open alert whose item is no longer low is resolved.
+
+Re-checking an item is harmless (an item has at most one open alert), so
+runs may overlap the previous one. Alerts and orders are written with
+``bulk_create``, which sends no signals, so the new orders' stat counters,
+search entries, dashboard KPIs and cached tables are updated here.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .analytics import WATERMARK_OVERLAP
+from .counters import COUNTED_FIELDS, apply_changes
+from .fragments import bump_generations
+from .kpis import invalidate_dashboard_kpis
+from .models import Inventory, PurchaseOrder, StockAlert, Watermark
+from .search import index_objects
+
+LOW_STOCK_WATERMARK = "alerts:inventory"
+
+EVALUATED_FIELDS = ("id", "name", "quantity", "reorder_threshold", "reorder_quantity", "reorder_supplier_id")
+
+
+def low_stock_items():
+    """Items below their reorder threshold, lowest quantity first."""
+    # Matches the partial index's condition, so the database can use it
+    return Inventory.objects.filter(quantity__lt=F("reorder_threshold")).order_by("quantity", "id")
+
+
+def _is_low(row):
+    return row["reorder_threshold"] is not None and row["quantity"] < row["reorder_threshold"]
+
+
+def _evaluate(rows, now, totals):
+    open_alerts = dict(
+        StockAlert.objects.filter(inventory_id__in=[row["id"] for row in rows], resolved_at__isnull=True)
+        .values_list("inventory_id", "id")
+    )
+    raising = [row for row in rows if _is_low(row) and row["id"] not in open_alerts]
+    resolving = [open_alerts[row["id"]] for row in rows if not _is_low(row) and row["id"] in open_alerts]
+
+    if resolving:
+        StockAlert.objects.filter(pk__in=resolving).update(resolved_at=now)
+
+    reordering = [row for row in raising if row["reorder_supplier_id"] and row["reorder_quantity"]]
+    orders = PurchaseOrder.objects.bulk_create(
+        PurchaseOrder(
+            name=f"Reorder: {row['name']}"[:200], supplier_id=row["reorder_supplier_id"],
+            order_date=timezone.localdate(now), quantity=row["reorder_quantity"], status="pending",
+            created_at=now, updated_at=now,
+        )
+        for row in reordering
+    )
+    if orders:
+        apply_changes(
+            PurchaseOrder,
+            added=[{field: getattr(order, field) for field in COUNTED_FIELDS[PurchaseOrder]} for order in orders],
+        )
+        index_objects(PurchaseOrder, orders)
+    order_ids = {row["id"]: order.pk for row, order in zip(reordering, orders)}
+
+    StockAlert.objects.bulk_create(
+        StockAlert(
+            inventory_id=row["id"], quantity=row["quantity"], threshold=row["reorder_threshold"],
+            purchase_order_id=order_ids.get(row["id"]), created_at=now,
+        )
+        for row in raising
+    )
+
+    totals["checked"] += len(rows)
+    totals["raised"] += len(raising)
+    totals["resolved"] += len(resolving)
+    totals["orders"] += len(orders)
+
+
+def evaluate_low_stock(batch_size=2000, full=False):
+    """Raise and resolve alerts for the items changed since the last run.
+
+    Returns ``{"checked", "raised", "resolved", "orders"}``. ``full=True``
+    ignores the watermark and checks every item.
+    """
+    totals = dict.fromkeys(("checked", "raised", "resolved", "orders"), 0)
+    with transaction.atomic():
+        # The row lock keeps two runs from interleaving
+        watermark, _ = Watermark.objects.select_for_update().get_or_create(name=LOW_STOCK_WATERMARK)
+        started = timezone.now()
+
+        changed = Inventory.objects.order_by()
+        if watermark.value and not full:
+            changed = changed.filter(updated_at__gt=watermark.value - WATERMARK_OVERLAP)
+
+        batch = []
+        for row in changed.values(*EVALUATED_FIELDS).iterator(chunk_size=batch_size):
+            batch.append(row)
+            if len(batch) == batch_size:
+                _evaluate(batch, started, totals)
+                batch = []
+        if batch:
+            _evaluate(batch, started, totals)
+
+        watermark.value = started
+        watermark.save()
+
+        if totals["orders"]:
+            transaction.on_commit(invalidate_dashboard_kpis)
+            transaction.on_commit(lambda: bump_generations(PurchaseOrder))
+    return totals
@@ -0,0 +1,270 @@
+"""
+Reports page data.
+
+``materialize_reports`` (run nightly with the ``materialize_reports``
+command) keeps three summary tables current:
+
+* ``PurchaseOrderFact``: one narrow row per order. Only orders whose
+  ``updated_at`` is past the ``Watermark`` are re-read; orders deleted since
+  the last run are found through their ``Tombstone`` rows (see sync.py) and
+  their facts dropped. ``full=True`` sweeps every fact without an order
+  instead, which also catches orders deleted before tombstones existed.
+* ``SupplierMonthlySpend`` and ``LeadTimeMonthly``: re-aggregated from the
+  facts, but only for the months the changed facts touched.
+
+Changed orders are read in ``(updated_at, id)`` batches, each stored in its
+own transaction, so progress is visible while a run goes on. A batch
+re-aggregates at once the months its facts moved out of; a run that dies
+half way leaves the watermark where it was, and the next one re-reads the
+same orders. A lease (another ``Watermark`` row, renewed every batch) keeps
+two runs from interleaving; a second run raises ``RefreshRunning``.
+
+Purchase orders carry no price, so supplier spend is measured in orders and
+units ordered. The category distribution comes from the stat counters (see
+counters.py), which are already kept current on every write.
+
+The reports page then reads a few hundred pre-aggregated rows at most.
+"""
+import datetime
+
+from django.db import transaction
+from django.db.models import Count, Exists, Max, OuterRef, Q, Sum
+from django.utils import timezone
+
+from . import counters
+from .models import (
+    Category, LeadTimeMonthly, PurchaseOrder, PurchaseOrderFact, SupplierMonthlySpend, Tombstone, Watermark,
+)
+from .sync import tombstone_name
+
+REPORTS_WATERMARK = "reports:purchase_orders"
+# Its value is when the running refresh's lease runs out
+REPORTS_LEASE = "reports:running"
+REFRESH_LEASE = datetime.timedelta(minutes=10)
+
+# Re-read orders updated shortly before the watermark too: a transaction that
+# stamped updated_at earlier can commit after a run has moved past it
+WATERMARK_OVERLAP = datetime.timedelta(minutes=10)
+
+# Months shown on the reports page
+REPORT_MONTHS = 12
+
+FACT_COLUMNS = ("id", "supplier_id", "order_date", "quantity", "delivered_at")
+
+
+class RefreshRunning(RuntimeError):
+    """Another report refresh holds the lease."""
+
+
+def _take_lease():
+    with transaction.atomic():
+        lease, _ = Watermark.objects.select_for_update().get_or_create(name=REPORTS_LEASE)
+        now = timezone.now()
+        if lease.value and lease.value > now:
+            raise RefreshRunning("Another report refresh is running.")
+        lease.value = now + REFRESH_LEASE
+        lease.save()
+    return lease.value
+
+
+def _renew_lease(held):
+    # Keyed on the expiry we set, so a run whose lease ran out can't take it back
+    renewed = timezone.now() + REFRESH_LEASE
+    if not Watermark.objects.filter(name=REPORTS_LEASE, value=held).update(value=renewed):
+        raise RefreshRunning("The report refresh lease ran out; another run took over.")
+    return renewed
+
+
+def _month(day):
+    return day.replace(day=1)
+
+
+def _fact(row):
+    fact = PurchaseOrderFact(
+        purchase_order_id=row["id"],
+        supplier_id=row["supplier_id"],
+        order_month=_month(row["order_date"]),
+        quantity=row["quantity"],
+    )
+    if row["delivered_at"]:
+        delivered = timezone.localtime(row["delivered_at"]).date()
+        fact.delivered_month = _month(delivered)
+        fact.lead_days = max((delivered - row["order_date"]).days, 0)
+    return fact
+
+
+def _store_facts(rows, order_months, delivered_months):
+    """Upsert the facts for ``rows``; re-aggregates the months they moved out of."""
+    ids = [row["id"] for row in rows]
+    # Where these orders counted until now
+    before = {
+        pk: (order_month, delivered_month)
+        for pk, order_month, delivered_month in PurchaseOrderFact.objects.filter(
+            purchase_order_id__in=ids
+        ).values_list("purchase_order_id", "order_month", "delivered_month")
+    }
+
+    facts = [_fact(row) for row in rows]
+    PurchaseOrderFact.objects.bulk_create(
+        facts,
+        update_conflicts=True,
+        unique_fields=["purchase_order_id"],
+        update_fields=["supplier_id", "order_month", "quantity", "delivered_month", "lead_days"],
+    )
+    left_order, left_delivered = set(), set()
+    for fact in facts:
+        order_months.add(fact.order_month)
+        delivered_months.add(fact.delivered_month)
+        old_order, old_delivered = before.get(fact.purchase_order_id, (fact.order_month, fact.delivered_month))
+        if old_order != fact.order_month:
+            left_order.add(old_order)
+        if old_delivered != fact.delivered_month:
+            left_delivered.add(old_delivered)
+    # In this batch's transaction: once it commits, nothing remembers these months
+    left_delivered.discard(None)
+    if left_order:
+        _refresh_supplier_spend(sorted(left_order))
+    if left_delivered:
+        _refresh_lead_times(sorted(left_delivered))
+
+
+def _refresh_supplier_spend(months):
+    SupplierMonthlySpend.objects.filter(month__in=months).delete()
+    SupplierMonthlySpend.objects.bulk_create(
+        SupplierMonthlySpend(
+            supplier_id=row["supplier_id"], month=row["order_month"], orders=row["orders"], units=row["units"] or 0,
+        )
+        for row in PurchaseOrderFact.objects.filter(order_month__in=months)
+        .values("supplier_id", "order_month")
+        .annotate(orders=Count("id"), units=Sum("quantity"))
+        .order_by()
+    )
+
+
+def _refresh_lead_times(months):
+    LeadTimeMonthly.objects.filter(month__in=months).delete()
+    LeadTimeMonthly.objects.bulk_create(
+        LeadTimeMonthly(
+            month=row["delivered_month"], delivered=row["delivered"],
+            total_lead_days=row["total"] or 0, max_lead_days=row["longest"] or 0,
+        )
+        for row in PurchaseOrderFact.objects.filter(delivered_month__in=months)
+        .values("delivered_month")
+        .annotate(delivered=Count("id"), total=Sum("lead_days"), longest=Max("lead_days"))
+        .order_by()
+    )
+
+
+def materialize_reports(batch_size=2000, full=False, progress=None):
+    """Bring the report tables up to date.
+
+    Returns ``{"facts": orders re-read, "removed": facts dropped, "months": months refreshed}``.
+    ``full=True`` ignores the watermark and re-reads every order.
+    ``progress(orders_read, total=None)`` is called after every batch.
+    Raises ``RefreshRunning`` while another run holds the lease.
+    """
+    lease = _take_lease()
+    try:
+        watermark, _ = Watermark.objects.get_or_create(name=REPORTS_WATERMARK)
+        started = timezone.now()
+
+        changed = PurchaseOrder.objects.order_by()
+        if watermark.value and not full:
+            changed = changed.filter(updated_at__gt=watermark.value - WATERMARK_OVERLAP)
+
+        order_months, delivered_months = set(), set()
+        processed = 0
+        if progress:
+            progress(0, total=changed.count())
+        after = Q()
+        while True:
+            # Keyset on (updated_at, id), like the sync feed
+            rows = changed.filter(after).order_by("updated_at", "id").values("updated_at", *FACT_COLUMNS)
+            batch = list(rows[:batch_size])
+            if not batch:
+                break
+            last = batch[-1]
+            after = Q(updated_at__gt=last["updated_at"]) | Q(updated_at=last["updated_at"], id__gt=last["id"])
+            with transaction.atomic():
+                lease = _renew_lease(lease)
+                _store_facts(batch, order_months, delivered_months)
+            processed += len(batch)
+            if progress:
+                progress(processed)
+
+        with transaction.atomic():
+            lease = _renew_lease(lease)
+            if watermark.value and not full:
+                # Orders deleted since the last run, from their tombstones
+                deleted = Tombstone.objects.filter(
+                    model=tombstone_name(PurchaseOrder), deleted_at__gt=watermark.value - WATERMARK_OVERLAP,
+                )
+                orphans = PurchaseOrderFact.objects.filter(purchase_order_id__in=deleted.values("object_id"))
+            else:
+                # Every fact whose order no longer exists
+                orphans = PurchaseOrderFact.objects.filter(
+                    ~Exists(PurchaseOrder.objects.filter(pk=OuterRef("purchase_order_id")))
+                )
+            for order_month, delivered_month in orphans.values_list("order_month", "delivered_month"):
+                order_months.add(order_month)
+                delivered_months.add(delivered_month)
+            removed, _ = orphans.delete()
+
+            delivered_months.discard(None)
+            if order_months:
+                _refresh_supplier_spend(sorted(order_months))
+            if delivered_months:
+                _refresh_lead_times(sorted(delivered_months))
+
+            watermark.value = started
+            watermark.save()
+    finally:
+        Watermark.objects.filter(name=REPORTS_LEASE, value=lease).update(value=None)
+
+    return {"facts": processed, "removed": removed, "months": len(order_months | delivered_months)}
+
+
+def _first_report_month():
+    today = timezone.localdate()
+    year, month = divmod(today.year * 12 + today.month - 1 - (REPORT_MONTHS - 1), 12)
+    return datetime.date(year, month + 1, 1)
+
+
+def supplier_spend():
+    """Orders and units per supplier per month, newest month and biggest supplier first."""
+    return list(
+        SupplierMonthlySpend.objects.filter(month__gte=_first_report_month())
+        .select_related("supplier")
+        .only("month", "orders", "units", "supplier__name")
+        .order_by("-month", "-units", "supplier__name")
+    )
+
+
+def lead_time_trend():
+    return list(LeadTimeMonthly.objects.filter(month__gte=_first_report_month()).order_by("month"))
+
+
+def category_distribution():
+    """Per category: asset count/quantity and inventory item count/value, biggest value first."""
+    stats = counters.read("asset_category", "inventory_category")
+    keys = stats["asset_category"].keys() | stats["inventory_category"].keys()
+    names = dict(Category.objects.filter(pk__in=[int(key) for key in keys]).values_list("id", "name"))
+
+    rows = []
+    for key in keys:
+        assets = stats["asset_category"].get(key)
+        inventory = stats["inventory_category"].get(key)
+        rows.append({
+            "name": names.get(int(key), f"Category {key}"),
+            "assets": assets.count if assets else 0,
+            "asset_quantity": assets.quantity if assets else 0,
+            "inventory_items": inventory.count if inventory else 0,
+            "inventory_value": inventory.value if inventory else 0,
+        })
+    rows.sort(key=lambda row: (-row["inventory_value"], -row["assets"], row["name"]))
+    return [row for row in rows if row["assets"] or row["inventory_items"]]
+
+
+def last_materialized():
+    """When the report tables were last refreshed, or None if never."""
+    return Watermark.objects.filter(name=REPORTS_WATERMARK).values_list("updated_at", flat=True).first()
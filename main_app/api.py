@@ -0,0 +1,90 @@
+"""
+Read-only JSON API.
+
+Rows are serialized straight from ``.values()``, so no model instances are
+built, and ``?fields=name,status`` narrows the SELECT to those columns
+(``id`` is always included, since pages are keyed on it). Lists are cursor
+paginated like the HTML lists and accept the same filters.
+
+Every response carries a weak ETag built from the matching rows'
+``max(updated_at)`` and count (one aggregate query) plus the query string,
+so a client polling with ``If-None-Match`` gets a ``304 Not Modified``
+without the page being fetched or serialized.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+
+from .filters import filter_assets, filter_inventory, filter_purchase_orders
+from .models import Asset, Category, Inventory, Location, PurchaseOrder, Supplier
+
+
+def _unfiltered(queryset, params):
+    return queryset
+
+
+# resource -> (model, exposed fields, list filter, groups allowed to read it or None for any user).
+# The groups match the resource's HTML pages. Foreign keys are exposed as ids.
+RESOURCES = {
+    "assets": (
+        Asset,
+        ("id", "name", "serial_number", "category", "location", "quantity", "status", "purchase_date", "created_at", "updated_at"),
+        filter_assets,
+        ("Manager", "Owner", "Staff"),
+    ),
+    "inventory": (
+        Inventory,
+        (
+            "id", "name", "category", "location", "quantity", "unit_price",
+            "reorder_threshold", "reorder_quantity", "reorder_supplier", "created_at", "updated_at",
+        ),
+        filter_inventory,
+        None,
+    ),
+    "purchase-orders": (
+        PurchaseOrder,
+        ("id", "name", "supplier", "order_date", "quantity", "status", "delivered_at", "created_at", "updated_at"),
+        filter_purchase_orders,
+        None,
+    ),
+    "suppliers": (
+        Supplier,
+        ("id", "name", "contact_person", "phone_number", "email", "address", "created_at", "updated_at"),
+        _unfiltered,
+        # Rows include the address, which only the supplier detail page shows
+        ("Manager", "Owner"),
+    ),
+    "categories": (Category, ("id", "name", "description", "created_at", "updated_at"), _unfiltered, None),
+    "locations": (
+        Location, ("id", "name", "address", "created_at", "updated_at"), _unfiltered, ("Manager", "Owner", "Staff"),
+    ),
+}
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def selected_fields(resource, param):
+    """Fields to select for ``?fields=``; all exposed fields when it's empty."""
+    exposed = RESOURCES[resource][1]
+    if not param:
+        return list(exposed)
+    requested = [name.strip() for name in param.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in exposed]
+    if unknown:
+        raise InvalidFields(f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(exposed)}.")
+    return ["id"] + [name for name in dict.fromkeys(requested) if name != "id"]
+
+
+def filtered_queryset(resource, params):
+    model, _, list_filter, _ = RESOURCES[resource]
+    return list_filter(model.objects.all(), params)
+
+
+def etag(queryset, *parts):
+    """Weak ETag for ``queryset``: changes when a row is added, removed or updated."""
+    state = queryset.order_by().aggregate(changed=Max("updated_at"), rows=Count("id"))
+    changed = state["changed"].isoformat() if state["changed"] else "-"
+    digest = hashlib.md5("|".join([changed, str(state["rows"]), *parts]).encode(), usedforsecurity=False)
+    return f'W/"{digest.hexdigest()}"'
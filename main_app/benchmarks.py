@@ -0,0 +1,359 @@
+"""
+Benchmark data and route timings.
+
+``seed_bench_data`` bulk-generates a realistic dataset (``seed_bench``
+command): a few popular suppliers get most of the orders, older orders are
+delivered and recent ones still open, lead times depend on the supplier,
+inventory clusters in a few big categories stored mostly at one location
+each. Rows are written with ``bulk_create`` in batches, then the stat
+counters, search index and report tables are rebuilt, the opening stock
+movements recorded and the cached tables dropped, since bulk writes skip
+the signals and paths that maintain them.
+
+``run_routes`` requests the pages in BENCH_ROUTES repeatedly, through the
+test client in this process or over HTTP against a running server, and
+records p50/p95/p99 latency, queries per request (read from the
+``Server-Timing`` header, see instrumentation.py) and process RSS per
+route (``bench_routes`` command). ``compare_results`` diffs two of those
+JSON baselines (``bench_compare`` command).
+"""
+import datetime
+import itertools
+import math
+import os
+import random
+import re
+import subprocess
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from decimal import Decimal
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.contrib.auth.models import Group
+from django.db.models import Max
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from .analytics import materialize_reports
+from .counters import compute_counters, rebuild_counters
+from .fragments import bump_generations
+from .models import Asset, Category, Inventory, Location, PurchaseOrder, Supplier
+from .search import rebuild_search_index
+from .stock import record_opening_balances
+
+# Rows per unit of --scale (categories and locations grow with its square root)
+SCALE_UNIT = {"suppliers": 100, "assets": 1000, "inventory": 1000, "purchase_orders": 1000}
+
+BENCH_USERS = {"bench_manager": "Manager", "bench_owner": "Owner", "bench_staff": "Staff"}
+
+# Orders are spread over this many days before today
+ORDER_HISTORY_DAYS = 730
+
+WORDS = (
+    "Steel", "Copper", "Cable", "Panel", "Valve", "Sensor", "Filter", "Bracket", "Pump", "Motor",
+    "Switch", "Relay", "Hose", "Bolt", "Gasket", "Battery", "Monitor", "Laptop", "Printer", "Router",
+)
+
+
+def _zipf_weights(count, exponent=1.1):
+    return list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(count)))
+
+
+def _insert(model, rows, batch_size):
+    """bulk_create ``rows`` (an iterable of unsaved instances) in batches; returns the created pks."""
+    pks = []
+    for batch in iter(lambda: list(itertools.islice(rows, batch_size)), []):
+        pks.extend(obj.pk for obj in model.objects.bulk_create(batch))
+    return pks
+
+
+def _bench_users(password):
+    users = []
+    for username, group_name in BENCH_USERS.items():
+        user, _ = get_user_model().objects.get_or_create(username=username)
+        user.is_staff = group_name == "Owner"
+        user.set_password(password)
+        user.save()
+        user.groups.add(Group.objects.get_or_create(name=group_name)[0])
+        users.append(user)
+    return users
+
+
+def seed_bench_data(scale=1, batch_size=5000, seed=42, password="bench", log=print):
+    """Add ``scale`` units of benchmark data; returns ``{table: rows added}``."""
+    rng = random.Random(seed)
+    today = timezone.localdate()
+    added = {}
+
+    def timed(name, model, rows):
+        start = time.perf_counter()
+        pks = _insert(model, rows, batch_size)
+        added[name] = len(pks)
+        log(f"{name:<16} {len(pks):>10} rows in {time.perf_counter() - start:6.1f}s")
+        return pks
+
+    owners = _bench_users(password)
+    # Continue numbering after an earlier run, so names and serial numbers stay unique
+    offset = (Asset.objects.aggregate(last=Max("id"))["last"] or 0) + 1
+
+    category_count = 20 + int(10 * math.sqrt(scale))
+    location_count = 10 + int(5 * math.sqrt(scale))
+    categories = timed("categories", Category, (
+        Category(name=f"{rng.choice(WORDS)} {offset + i}", description="Benchmark category", owner=rng.choice(owners))
+        for i in range(category_count)
+    ))
+    locations = timed("locations", Location, (
+        Location(name=f"Site {offset + i}", address=f"{rng.randint(1, 999)} Industrial Way", owner=rng.choice(owners))
+        for i in range(location_count)
+    ))
+    suppliers = timed("suppliers", Supplier, (
+        Supplier(
+            name=f"{rng.choice(WORDS)} {rng.choice(WORDS)} {offset + i}", contact_person=f"Contact {offset + i}",
+            phone_number=f"555-{rng.randint(0, 9_999_999):07d}", email=f"orders{offset + i}@supplier.test",
+            address=f"{rng.randint(1, 999)} Commerce St", owner=rng.choice(owners),
+        )
+        for i in range(SCALE_UNIT["suppliers"] * scale)
+    ))
+
+    # A few categories and suppliers take most of the rows
+    category_weights = _zipf_weights(len(categories))
+    supplier_weights = _zipf_weights(len(suppliers))
+    home_location = {category: rng.choice(locations) for category in categories}
+    base_price = {category: Decimal(rng.randint(100, 50_000)) / 100 for category in categories}
+    lead_days = {supplier: rng.randint(2, 21) for supplier in suppliers}
+
+    def placed(category):
+        # Most of a category is stored at its home location
+        return home_location[category] if rng.random() < 0.7 else rng.choice(locations)
+
+    def assets():
+        for i in range(SCALE_UNIT["assets"] * scale):
+            category = rng.choices(categories, cum_weights=category_weights)[0]
+            age = rng.randint(0, 5 * 365)
+            status = "discontinued" if age > 4 * 365 and rng.random() < 0.5 else rng.choices(
+                ["available", "unavailable"], weights=[85, 15])[0]
+            yield Asset(
+                name=f"{rng.choice(WORDS)} {offset + i}", category_id=category, location_id=placed(category),
+                quantity=rng.randint(1, 5), serial_number=f"BENCH-{offset + i:010d}",
+                purchase_date=today - datetime.timedelta(days=age), status=status, owner=rng.choice(owners),
+            )
+
+    def inventory():
+        for i in range(SCALE_UNIT["inventory"] * scale):
+            category = rng.choices(categories, cum_weights=category_weights)[0]
+            yield Inventory(
+                name=f"{rng.choice(WORDS)} {rng.choice(WORDS)} {offset + i}", category_id=category,
+                location_id=placed(category), quantity=int(rng.lognormvariate(3, 1.2)),
+                unit_price=(base_price[category] * Decimal(rng.uniform(0.8, 1.25))).quantize(Decimal("0.01")),
+                owner=rng.choice(owners),
+            )
+
+    def purchase_orders():
+        for i in range(SCALE_UNIT["purchase_orders"] * scale):
+            supplier = rng.choices(suppliers, cum_weights=supplier_weights)[0]
+            age = rng.randint(0, ORDER_HISTORY_DAYS)
+            order_date = today - datetime.timedelta(days=age)
+            lead = max(1, int(rng.gauss(lead_days[supplier], 2)))
+            if age > lead + 30:
+                status = "delivered" if rng.random() < 0.97 else "shipped"
+            elif age > lead:
+                status = rng.choice(["shipped", "delivered"])
+            else:
+                status = rng.choices(["pending", "confirmed", "shipped"], weights=[40, 35, 25])[0]
+            order = PurchaseOrder(
+                name=f"PO {rng.choice(WORDS)} {offset + i}", supplier_id=supplier, order_date=order_date,
+                quantity=rng.randint(1, 200), status=status, owner=rng.choice(owners),
+                created_at=timezone.make_aware(datetime.datetime.combine(order_date, datetime.time(9))),
+            )
+            if status == "delivered":
+                order.delivered_at = order.created_at + datetime.timedelta(days=lead)
+            yield order
+
+    asset_pks = timed("assets", Asset, assets())
+    inventory_pks = timed("inventory", Inventory, inventory())
+    timed("purchase_orders", PurchaseOrder, purchase_orders())
+
+    # Bulk writes skip the signals that keep these current
+    start = time.perf_counter()
+    rebuild_counters(compute_counters())
+    record_opening_balances(Asset, asset_pks, batch_size)
+    record_opening_balances(Inventory, inventory_pks, batch_size)
+    rebuild_search_index(batch_size=batch_size)
+    materialize_reports(batch_size=batch_size, full=True)
+    bump_generations(Category, Location, Supplier, Asset, Inventory, PurchaseOrder)
+    log(f"{'derived tables':<16} rebuilt in {time.perf_counter() - start:6.1f}s")
+    return added
+
+
+def _first_pk(model, **filters):
+    return model.objects.filter(**filters).order_by("pk").values_list("pk", flat=True).first()
+
+
+# label -> (route name, URL args() or None, query parameters or a function returning them).
+# Read-only pages only.
+BENCH_ROUTES = {
+    "dashboard": ("dashboard", None, {}),
+    "reports": ("reports", None, {}),
+    "global_search": ("global_search", None, {"q": "valve"}),
+    "purchase_order_list": ("purchase_order_list", None, {}),
+    "purchase_order_list?status": ("purchase_order_list", None, {"status": "pending"}),
+    "purchase_order_detail": ("purchase_order_detail", lambda: [_first_pk(PurchaseOrder)], {}),
+    "asset_index": ("asset_index", None, {}),
+    "asset_index?status": ("asset_index", None, {"status": "discontinued"}),
+    "asset_detail": ("asset_detail", lambda: [_first_pk(Asset)], {}),
+    "inventory_list": ("inventory_list", None, {}),
+    "inventory_list?category": ("inventory_list", None, lambda: {"category": _first_pk(Category)}),
+    "inventory_detail": ("inventory_detail", lambda: [_first_pk(Inventory)], {}),
+    "inventory_report": ("inventory_report", lambda: ["month"], {}),
+    "category_list": ("category_list", None, {}),
+    "location_list": ("location_list", None, {}),
+    "supplier_list": ("supplier_list", None, {}),
+    "supplier_list?q": ("supplier_list", None, {"q": "steel"}),
+    "supplier_search": ("supplier_search", None, {"q": "cop"}),
+    "api_list": ("api_list", lambda: ["inventory"], {"fields": "name,quantity"}),
+    "api_sync": ("api_sync", lambda: ["purchase-orders"], {}),
+}
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def _rss_mb(pid=None):
+    """Resident set size of ``pid`` (default: this process) in MB, or None where /proc isn't available."""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as statm:
+            pages = int(statm.read().split()[1])
+    except OSError:
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024, 1)
+
+
+class InProcessTransport:
+    """Requests through Django's test client, in this process."""
+
+    def __init__(self, user):
+        self.client = Client()
+        self.client.force_login(user)
+
+    def get(self, path, params):
+        response = self.client.get(path, params)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response.status_code, response.get("Server-Timing", "")
+
+    def rss_mb(self):
+        return _rss_mb()
+
+
+class HttpTransport:
+    """Requests over HTTP to a running server that shares this database (for the session)."""
+
+    def __init__(self, user, base_url, pid=None):
+        self.base_url = base_url.rstrip("/")
+        self.pid = pid
+        # Log in the way the test client does: a session row with the user's id
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        self.opener = urllib.request.build_opener()
+        self.opener.addheaders = [("Cookie", f"{settings.SESSION_COOKIE_NAME}={session.session_key}")]
+
+    def get(self, path, params):
+        url = f"{self.base_url}{path}"
+        if params:
+            url += "?" + urllib.parse.urlencode(params)
+        try:
+            with self.opener.open(url) as response:
+                response.read()
+                return response.status, response.headers.get("Server-Timing", "")
+        except urllib.error.HTTPError as error:
+            return error.code, error.headers.get("Server-Timing", "")
+
+    def rss_mb(self):
+        # The server's memory, when we know which process it is
+        return _rss_mb(self.pid) if self.pid else None
+
+
+def _percentile(values, fraction):
+    return values[max(math.ceil(len(values) * fraction) - 1, 0)]
+
+
+def run_routes(transport, repeat=20, warmup=1, labels=None, log=print):
+    """Time every route in BENCH_ROUTES (or just ``labels``); returns ``{label: stats}``."""
+    results = {}
+    for label, (name, args, params) in BENCH_ROUTES.items():
+        if labels and label not in labels:
+            continue
+        path = reverse(name, args=args() if args else None)
+        params = params() if callable(params) else params
+        for _ in range(warmup):
+            transport.get(path, params)
+
+        rss_before = transport.rss_mb()
+        timings, queries, statuses = [], [], set()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            status, server_timing = transport.get(path, params)
+            timings.append((time.perf_counter() - start) * 1000)
+            statuses.add(status)
+            match = SERVER_TIMING_QUERIES.search(server_timing)
+            if match:
+                queries.append(int(match.group(1)))
+        rss_after = transport.rss_mb()
+
+        timings.sort()
+        results[label] = {
+            "path": path,
+            "status": sorted(statuses),
+            "p50": round(_percentile(timings, 0.5), 2),
+            "p95": round(_percentile(timings, 0.95), 2),
+            "p99": round(_percentile(timings, 0.99), 2),
+            "mean": round(sum(timings) / len(timings), 2),
+            "queries": max(queries) if queries else None,
+            "rss_mb": rss_after,
+            "rss_delta_mb": round(rss_after - rss_before, 1) if rss_after is not None and rss_before is not None else None,
+        }
+        row = results[label]
+        log(f"{label:<28} p50={row['p50']:8.2f}ms  p95={row['p95']:8.2f}ms  p99={row['p99']:8.2f}ms  queries={row['queries']}")
+    return results
+
+
+def baseline(results, mode, repeat):
+    """The JSON document ``bench_routes`` writes."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "meta": {
+            "commit": commit,
+            "created": timezone.now().isoformat(),
+            "mode": mode,
+            "repeat": repeat,
+            "rows": {model.__name__: model.objects.count() for model in (Supplier, Asset, Inventory, PurchaseOrder)},
+        },
+        "routes": results,
+    }
+
+
+def compare_results(old, new, threshold=0.15, min_ms=2.0):
+    """Per route in both baselines: ``(label, old, new, regressed)``.
+
+    A route regresses when its p95 grows by more than ``threshold`` (a
+    fraction) and ``min_ms``, or it runs more queries.
+    """
+    rows = []
+    for label in old["routes"].keys() & new["routes"].keys():
+        before, after = old["routes"][label], new["routes"][label]
+        slower = after["p95"] > before["p95"] * (1 + threshold) and after["p95"] - before["p95"] > min_ms
+        chattier = None not in (before["queries"], after["queries"]) and after["queries"] > before["queries"]
+        rows.append((label, before, after, slower or chattier))
+    return sorted(rows)
@@ -0,0 +1,70 @@
+"""
+Helpers for the async views.
+
+Django's async ORM calls (``aget``, ``async for``) still run one after
+another on the request's single sync thread, so independent reads gain
+nothing from being awaited together. ``gather_queries`` instead runs each
+read on a thread from a long-lived pool, where it gets its own database
+connection, so a page waits for its slowest query rather than the sum of
+them. The pool outlives requests (and the per-request event loop Django
+starts for async views under WSGI), so its connections are reused and aged
+out under CONN_MAX_AGE like request connections are.
+
+Inside a transaction the reads stay on the request's connection, one after
+another: other connections can't see the transaction's uncommitted writes
+(the test suite runs every test inside one).
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from .query_plans import render_planned
+
+_executor = ThreadPoolExecutor(max_workers=settings.ASYNC_QUERY_THREADS, thread_name_prefix="query")
+
+
+def _in_transaction():
+    return connection.in_atomic_block or not connection.get_autocommit()
+
+
+def _isolated(func):
+    # Treat each call like a request: drop a connection that is broken or past CONN_MAX_AGE
+    close_old_connections()
+    try:
+        return func()
+    finally:
+        close_old_connections()
+
+
+async def gather_queries(*funcs):
+    """Call the zero-argument callables concurrently and return their results in order."""
+    if await sync_to_async(_in_transaction)():
+        return [await sync_to_async(func)() for func in funcs]
+    return await asyncio.gather(*(
+        sync_to_async(_isolated, thread_sensitive=False, executor=_executor)(func) for func in funcs
+    ))
+
+
+async def run_query(func):
+    (result,) = await gather_queries(func)
+    return result
+
+
+async def resolve_user(request):
+    """Load ``request.user`` once for async code.
+
+    Async ``login_required`` loads the user with ``auser()``, which doesn't
+    fill the lazy ``request.user`` that sync code and templates read, so it
+    would be fetched again. Store the loaded user there instead.
+    """
+    request.user = await request.auser()
+    return request.user
+
+
+async def render_async(request, template_name, context=None):
+    await resolve_user(request)
+    # Templates, sessions and messages are sync-only; render on the request's sync thread
+    return await sync_to_async(render_planned)(request, template_name, context)
@@ -0,0 +1,171 @@
+"""
+Incrementally maintained stat counters.
+
+Every tracked row contributes to a few ``StatCounter`` rows, e.g. an asset
+adds 1 (and its quantity) to ``asset_status:available``,
+``asset_category:<id>``, ``asset_location:<id>`` and ``total:asset``.
+Writes apply the difference between the old and new contributions with
+``F()`` increments, inside the same transaction as the row itself.
+
+Bulk writes (``bulk_create``, ``QuerySet.update``) don't send signals; code
+that uses them must call ``apply_changes`` itself. ``rebuild_counters``
+recomputes everything from scratch and can verify the table for drift.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+
+from .models import Asset, Inventory, PurchaseOrder, StatCounter, Supplier
+
+# Columns each model's contributions depend on
+COUNTED_FIELDS = {
+    PurchaseOrder: ("status",),
+    Asset: ("status", "category_id", "location_id", "quantity"),
+    Inventory: ("category_id", "location_id", "quantity", "unit_price"),
+    Supplier: (),
+}
+
+ZERO = Decimal("0.00")
+
+
+def _contributions(model, row):
+    """(scope, key, count, quantity, value) tuples a single row adds."""
+    if model is PurchaseOrder:
+        return [("total", "purchase_order", 1, 0, ZERO), ("po_status", row["status"], 1, 0, ZERO)]
+    if model is Asset:
+        qty = row["quantity"]
+        return [
+            ("total", "asset", 1, qty, ZERO),
+            ("asset_status", row["status"], 1, qty, ZERO),
+            ("asset_category", str(row["category_id"]), 1, qty, ZERO),
+            ("asset_location", str(row["location_id"]), 1, qty, ZERO),
+        ]
+    if model is Inventory:
+        qty = row["quantity"]
+        value = (Decimal(qty) * Decimal(row["unit_price"])).quantize(Decimal("0.01"))
+        return [
+            ("total", "inventory", 1, qty, value),
+            ("inventory_category", str(row["category_id"]), 1, qty, value),
+            ("inventory_location", str(row["location_id"]), 1, qty, value),
+        ]
+    if model is Supplier:
+        return [("total", "supplier", 1, 0, ZERO)]
+    return []
+
+
+def _bump(scope, key, count, quantity, value):
+    changes = {
+        "count": F("count") + count,
+        "quantity": F("quantity") + quantity,
+        "value": F("value") + value,
+    }
+    if StatCounter.objects.filter(scope=scope, key=key).update(**changes):
+        return
+    try:
+        # Savepoint, so losing a race to create the row doesn't poison the transaction
+        with transaction.atomic():
+            StatCounter.objects.create(scope=scope, key=key, count=count, quantity=quantity, value=value)
+    except IntegrityError:
+        StatCounter.objects.filter(scope=scope, key=key).update(**changes)
+
+
+def apply_changes(model, removed=(), added=()):
+    """Move counters from the ``removed`` row values to the ``added`` ones.
+
+    Rows are dicts holding the model's COUNTED_FIELDS.
+    """
+    deltas = defaultdict(lambda: [0, 0, ZERO])
+    for sign, rows in ((-1, removed), (1, added)):
+        for row in rows:
+            for scope, key, count, quantity, value in _contributions(model, row):
+                delta = deltas[scope, key]
+                delta[0] += sign * count
+                delta[1] += sign * quantity
+                delta[2] += sign * value
+
+    with transaction.atomic():
+        for (scope, key), (count, quantity, value) in sorted(deltas.items()):
+            if count or quantity or value:
+                _bump(scope, key, count, quantity, value)
+
+
+def read(*scopes):
+    """Counters for the given scopes as {scope: {key: StatCounter}}, in one query."""
+    result = {scope: {} for scope in scopes}
+    for counter in StatCounter.objects.filter(scope__in=scopes):
+        result[counter.scope][counter.key] = counter
+    return result
+
+
+def _money(value):
+    return Decimal(value or 0).quantize(Decimal("0.01"))
+
+
+def _grouped(model, field, **aggregates):
+    """[(key, totals)] grouped by ``field``; ``field=None`` gives one overall row."""
+    qs = model.objects.order_by()
+    if field is None:
+        return [(None, qs.aggregate(n=Count("pk"), **aggregates))]
+    return [(row.pop(field), row) for row in qs.values(field).annotate(n=Count("pk"), **aggregates)]
+
+
+def compute_counters():
+    """Recompute every counter from the source tables with grouped queries."""
+    line_value = ExpressionWrapper(
+        F("quantity") * F("unit_price"), output_field=DecimalField(max_digits=24, decimal_places=2)
+    )
+    groupings = [
+        (PurchaseOrder, {}, [("po_status", "status"), ("total:purchase_order", None)]),
+        (Supplier, {}, [("total:supplier", None)]),
+        (Asset, {"qty": Sum("quantity")}, [
+            ("asset_status", "status"),
+            ("asset_category", "category_id"),
+            ("asset_location", "location_id"),
+            ("total:asset", None),
+        ]),
+        (Inventory, {"qty": Sum("quantity"), "val": Sum(line_value)}, [
+            ("inventory_category", "category_id"),
+            ("inventory_location", "location_id"),
+            ("total:inventory", None),
+        ]),
+    ]
+
+    expected = {}
+    for model, aggregates, scopes in groupings:
+        for scope, field in scopes:
+            for key, totals in _grouped(model, field, **aggregates):
+                if not totals["n"]:
+                    continue
+                if key is None:
+                    # "total:asset" -> scope "total", key "asset"
+                    scope_name, key = scope.split(":")
+                else:
+                    scope_name = scope
+                expected[scope_name, str(key)] = (totals["n"], totals.get("qty") or 0, _money(totals.get("val")))
+    return expected
+
+
+def diff_counters(expected):
+    """{(scope, key): (stored, expected)} for every counter that disagrees."""
+    stored = {
+        (c.scope, c.key): (c.count, c.quantity, c.value)
+        for c in StatCounter.objects.all()
+    }
+    drift = {}
+    for key in stored.keys() | expected.keys():
+        have = stored.get(key, (0, 0, ZERO))
+        want = expected.get(key, (0, 0, ZERO))
+        if have != want:
+            drift[key] = (have, want)
+    return drift
+
+
+def rebuild_counters(expected):
+    with transaction.atomic():
+        StatCounter.objects.all().delete()
+        StatCounter.objects.bulk_create(
+            StatCounter(scope=scope, key=key, count=count, quantity=quantity, value=value)
+            for (scope, key), (count, quantity, value) in expected.items()
+        )
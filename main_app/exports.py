@@ -0,0 +1,123 @@
+"""
+Streaming CSV/XLSX exports.
+
+Rows are read with ``values_list().iterator(chunk_size=EXPORT_CHUNK_SIZE)``
+(a server-side cursor on PostgreSQL) and written through a small buffer
+that is flushed to the client every EXPORT_BUFFER_BYTES, so memory stays
+flat whether the export has a thousand rows or millions.
+
+CSV streams straight from the view. XLSX (a zip, which can't be streamed
+row by row) and exports requested with ``?background=1`` are built by a
+background job instead (see jobs.py).
+"""
+import csv
+import io
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from openpyxl import Workbook
+
+from .filters import filter_assets, filter_inventory, filter_purchase_orders
+from .models import Asset, Inventory, PurchaseOrder
+
+# name -> (model, list filter, ordering, [(header, column), ...])
+EXPORTS = {
+    "inventory": (Inventory, filter_inventory, ("id",), [
+        ("ID", "id"),
+        ("Name", "name"),
+        ("Category", "category__name"),
+        ("Location", "location__name"),
+        ("Quantity", "quantity"),
+        ("Unit Price", "unit_price"),
+        ("Created At", "created_at"),
+        ("Updated At", "updated_at"),
+    ]),
+    "assets": (Asset, filter_assets, ("id",), [
+        ("ID", "id"),
+        ("Name", "name"),
+        ("Serial Number", "serial_number"),
+        ("Category", "category__name"),
+        ("Location", "location__name"),
+        ("Quantity", "quantity"),
+        ("Status", "status"),
+        ("Purchase Date", "purchase_date"),
+        ("Added By", "owner__username"),
+        ("Created At", "created_at"),
+    ]),
+    "purchase_orders": (PurchaseOrder, filter_purchase_orders, ("-order_date", "-id"), [
+        ("ID", "id"),
+        ("Name", "name"),
+        ("Supplier", "supplier__name"),
+        ("Order Date", "order_date"),
+        ("Quantity", "quantity"),
+        ("Status", "status"),
+        ("Created At", "created_at"),
+    ]),
+}
+
+
+def export_queryset(name, params):
+    """The rows an export covers, honouring the list filters in ``params``."""
+    model, list_filter, ordering, _ = EXPORTS[name]
+    return list_filter(model.objects.order_by(*ordering), params)
+
+
+def export_rows(name, params):
+    """(headers, row iterator) for an export."""
+    columns = EXPORTS[name][3]
+    rows = export_queryset(name, params).values_list(*[column for _, column in columns])
+    return [header for header, _ in columns], rows.iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+
+def _cell(value):
+    # Keep spreadsheet apps from treating user text as a formula
+    if isinstance(value, str) and value[:1] in ("=", "+", "-", "@"):
+        return "'" + value
+    return value
+
+
+def iter_csv(headers, rows, buffer_bytes=None):
+    """Yield CSV text in chunks of roughly ``buffer_bytes``."""
+    buffer_bytes = buffer_bytes or settings.EXPORT_BUFFER_BYTES
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    for row in rows:
+        writer.writerow([_cell(value) for value in row])
+        if buffer.tell() >= buffer_bytes:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_filename(name, extension):
+    return f"{name}-{timezone.now():%Y%m%d-%H%M}.{extension}"
+
+
+def write_csv(headers, rows, fileobj):
+    """Write CSV to a binary file object."""
+    for chunk in iter_csv(headers, rows):
+        fileobj.write(chunk.encode())
+
+
+def csv_response(name, params):
+    headers, rows = export_rows(name, params)
+    response = StreamingHttpResponse(iter_csv(headers, rows), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{export_filename(name, "csv")}"'
+    return response
+
+
+def write_xlsx(headers, rows, fileobj):
+    """Write rows to ``fileobj`` with openpyxl's write-only (streaming) mode."""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(headers)
+    for row in rows:
+        # Excel has no time zones; export UTC wall-clock times
+        sheet.append([
+            value.replace(tzinfo=None) if getattr(value, "tzinfo", None) else _cell(value)
+            for value in row
+        ])
+    workbook.save(fileobj)
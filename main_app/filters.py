@@ -0,0 +1,39 @@
+"""
+Query-string filters shared by the list views and the exports, so an export
+always contains exactly the rows the list shows (minus pagination).
+"""
+
+
+def _int_param(params, name):
+    try:
+        return int(params[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def filter_purchase_orders(queryset, params):
+    # ?status=delivered&supplier=3
+    if params.get("status"):
+        queryset = queryset.filter(status=params["status"])
+    supplier = _int_param(params, "supplier")
+    if supplier is not None:
+        queryset = queryset.filter(supplier_id=supplier)
+    return queryset
+
+
+def filter_inventory(queryset, params):
+    # ?category=1&location=2
+    category = _int_param(params, "category")
+    if category is not None:
+        queryset = queryset.filter(category_id=category)
+    location = _int_param(params, "location")
+    if location is not None:
+        queryset = queryset.filter(location_id=location)
+    return queryset
+
+
+def filter_assets(queryset, params):
+    # ?status=available&category=1&location=2
+    if params.get("status"):
+        queryset = queryset.filter(status=params["status"])
+    return filter_inventory(queryset, params)
@@ -1,7 +1,8 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
-from .models import Category, Location, Inventory, PurchaseOrder, Supplier, Asset
+from .models import Category, Location, Inventory, PurchaseOrder, Supplier, Asset, StockMovement
 from django.contrib.auth import get_user_model
+from .reports import DIMENSIONS, GROUPS, MAX_PERIODS, periods
 
 
 AuthUser = get_user_model()
@@ -22,16 +23,30 @@ class SignupForm(UserCreationForm):
             user.save()
         return user
     
-class InventoryForm(forms.ModelForm):
+class QuantitySeenMixin:
+    """Carries the quantity the edit form showed, so saving applies the change
+    the user made rather than overwriting the stored quantity (see stock.save_stock_form)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["quantity_seen"] = forms.IntegerField(
+            required=False, widget=forms.HiddenInput, initial=self.instance.quantity if self.instance.pk else None,
+        )
+
+
+class InventoryForm(QuantitySeenMixin, forms.ModelForm):
     class Meta:
         model = Inventory
-        fields = ['name', 'category', 'location', 'quantity', 'unit_price', 'quantity']
+        fields = ['name', 'category', 'location', 'quantity', 'unit_price', 'reorder_threshold', 'reorder_quantity', 'reorder_supplier']
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control'}),
             'category': forms.Select(attrs={'class': 'form-control'}),
             'location': forms.Select(attrs={'class': 'form-control'}),
             'quantity': forms.NumberInput(attrs={"class": "form-control", "min": "0"}),
             'unit_price': forms.NumberInput(attrs={'class': 'form-control'}),
+            'reorder_threshold': forms.NumberInput(attrs={"class": "form-control", "min": "0"}),
+            'reorder_quantity': forms.NumberInput(attrs={"class": "form-control", "min": "1"}),
+            'reorder_supplier': forms.Select(attrs={'class': 'form-control'}),
         }
 
 class CategoryForm(forms.ModelForm):
@@ -53,7 +68,7 @@ class LocationForm(forms.ModelForm):
         }
 
 
-class AssetForm(forms.ModelForm):
+class AssetForm(QuantitySeenMixin, forms.ModelForm):
     class Meta:
         model = Asset
         fields = ["name", "category", "location", "serial_number", "purchase_date", "status", "quantity"]
@@ -67,6 +82,26 @@ class AssetForm(forms.ModelForm):
             "purchase_date": forms.DateInput(attrs={"type": "date", "class": "form-control"}),
         }
 
+# CSV import (see imports.py): the add/edit rules minus category/location,
+# which the importer resolves by name
+class InventoryImportForm(InventoryForm):
+    class Meta(InventoryForm.Meta):
+        fields = ["name", "quantity", "unit_price"]
+
+
+class AssetImportForm(AssetForm):
+    class Meta(AssetForm.Meta):
+        fields = ["name", "serial_number", "purchase_date", "status", "quantity"]
+
+    def validate_unique(self):
+        # An existing serial number updates that asset instead of failing
+        pass
+
+
+class ImportUploadForm(forms.Form):
+    file = forms.FileField(widget=forms.ClearableFileInput(attrs={"class": "form-control", "accept": ".csv,text/csv"}))
+
+
 class PurchaseOrderForm(forms.ModelForm):
     class Meta:
         model = PurchaseOrder
@@ -89,3 +124,40 @@ class SupplierForm(forms.ModelForm):
             "email": forms.EmailInput(attrs={"class": "form-control"}),
             "address": forms.Textarea(attrs={"class": "form-control", "rows": 3}),
         }
+
+
+class StockMovementForm(forms.Form):
+    kind = forms.ChoiceField(choices=StockMovement.KIND_CHOICES, widget=forms.Select(attrs={"class": "form-select"}))
+    # Units moved, or the counted quantity for an adjustment
+    quantity = forms.IntegerField(min_value=0, widget=forms.NumberInput(attrs={"class": "form-control", "min": "0"}))
+    location = forms.ModelChoiceField(
+        queryset=Location.objects.order_by("name"), required=False, label="To location",
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    note = forms.CharField(max_length=200, required=False, widget=forms.TextInput(attrs={"class": "form-control"}))
+
+    def clean(self):
+        cleaned = super().clean()
+        kind, quantity = cleaned.get("kind"), cleaned.get("quantity")
+        if kind == "transfer" and not cleaned.get("location"):
+            self.add_error("location", "Pick the location to transfer to.")
+        if kind in ("receipt", "issue", "transfer") and quantity == 0:
+            self.add_error("quantity", "Enter at least 1.")
+        return cleaned
+
+
+class InventoryReportForm(forms.Form):
+    start = forms.DateField(widget=forms.DateInput(attrs={"type": "date", "class": "form-control"}))
+    end = forms.DateField(widget=forms.DateInput(attrs={"type": "date", "class": "form-control"}))
+    group = forms.ChoiceField(choices=[(g, g.capitalize()) for g in GROUPS], widget=forms.Select(attrs={"class": "form-control"}))
+    by = forms.ChoiceField(choices=[(d, d.capitalize()) for d in DIMENSIONS], widget=forms.Select(attrs={"class": "form-control"}))
+
+    def clean(self):
+        cleaned = super().clean()
+        start, end, group = cleaned.get("start"), cleaned.get("end"), cleaned.get("group")
+        if start and end and group:
+            if end < start:
+                raise forms.ValidationError("End date must be on or after the start date.")
+            if len(periods(start, end, group)) > MAX_PERIODS:
+                raise forms.ValidationError(f"That range has more than {MAX_PERIODS} periods; pick a larger grouping.")
+        return cleaned
@@ -0,0 +1,127 @@
+"""
+Fragment caching for the list and dashboard tables.
+
+A table (its rows, empty state and pager) is cached whole, keyed on the
+query string and on a generation for each model it shows. Saving or
+deleting any of those models replaces its generation (see signals.py), so
+the next request misses, runs the table's query and renders it again. That
+render takes each row from the cache too: a row is keyed on its model, pk
+and ``updated_at`` and on the generations of the related models it shows
+(an inventory row shows its category and location names), so only the rows
+that changed since they were cached are rendered.
+
+Bulk writes don't send signals, so the import, status change and seeding
+paths bump the generations themselves. Keys also carry a digest of the
+templates, so a deploy that changes the markup doesn't serve the old copy.
+Rows and tables must not show anything that differs between users; forms
+with a CSRF token go around the fragment, not inside it.
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+from .query_plans import strict_rendering
+
+
+def _generation_key(model):
+    return f"fragments:generation:{model._meta.label_lower}"
+
+
+def _generations(models):
+    keys = [_generation_key(model) for model in models]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Unknown (never set or evicted): start a new generation so old fragments miss
+            cache.add(key, uuid.uuid4().hex, None)
+            found[key] = cache.get(key)
+    return [str(found[key]) for key in keys]
+
+
+def generations(*models):
+    """The current generations of ``models``, as one key part."""
+    return ":".join(_generations(models))
+
+
+def bump_generations(*models):
+    """Invalidate every cached table (and related-model rows) that shows ``models``."""
+    cache.set_many({_generation_key(model): uuid.uuid4().hex for model in models}, None)
+
+
+def _template_digest(*template_names):
+    digest = hashlib.md5(usedforsecurity=False)
+    for name in template_names:
+        digest.update(get_template(name).template.source.encode())
+    return digest.hexdigest()[:12]
+
+
+def _render(template_name, context, request=None):
+    # Querysets are evaluated before this, so rendering must not query
+    with strict_rendering():
+        return render_to_string(template_name, context, request)
+
+
+class TableFragment:
+    """A table rendered from ``template_name`` with one ``row_template_name`` render per object.
+
+    The row template sees its object as ``row_name``; the table template sees
+    the rendered ``rows`` and the ``page`` when the table is paginated.
+    ``related`` are the other models the rows show.
+    """
+
+    def __init__(self, template_name, row_template_name, row_name, model, related=()):
+        self.template_name = template_name
+        self.row_template_name = row_template_name
+        self.row_name = row_name
+        self.model = model
+        self.related = tuple(related)
+
+    def render_rows(self, objects, related_generations=None):
+        objects = list(objects)
+        if not settings.FRAGMENT_CACHE:
+            return [mark_safe(_render(self.row_template_name, {self.row_name: obj})) for obj in objects]
+
+        if related_generations is None:
+            related_generations = generations(*self.related)
+        prefix = f"fragments:row:{_template_digest(self.row_template_name)}:{related_generations}"
+        keys = [f"{prefix}:{self.model._meta.label_lower}:{obj.pk}:{obj.updated_at.isoformat()}" for obj in objects]
+        cached = cache.get_many(keys)
+        missing = {}
+        for key, obj in zip(keys, objects):
+            if key not in cached:
+                missing[key] = cached[key] = _render(self.row_template_name, {self.row_name: obj})
+        if missing:
+            cache.set_many(missing, settings.FRAGMENT_CACHE_TTL)
+        return [mark_safe(cached[key]) for key in keys]
+
+    def render(self, load, request=None, **context):
+        """The table's HTML. ``load()`` returns a page or a list of objects, and is only called on a miss.
+
+        With ``request`` the table is cached per query string. ``context`` is
+        passed to the table template and must not vary between requests.
+        """
+        related_generations = None
+        if settings.FRAGMENT_CACHE:
+            # Read the generations before loading, so a write during the load leaves this copy unreachable
+            own, *related = _generations((self.model, *self.related))
+            related_generations = ":".join(related)
+            digest = _template_digest(self.template_name, self.row_template_name)
+            query = hashlib.md5(request.GET.urlencode().encode(), usedforsecurity=False).hexdigest() if request else ""
+            key = f"fragments:table:{digest}:{own}:{related_generations}:{query}"
+            html = cache.get(key)
+            if html is not None:
+                return mark_safe(html)
+
+        loaded = load()
+        page = loaded if hasattr(loaded, "object_list") else None
+        objects = loaded if page is None else page.object_list
+        html = _render(self.template_name, {
+            **context, "rows": self.render_rows(objects, related_generations), "page": page,
+        }, request)
+        if settings.FRAGMENT_CACHE:
+            cache.set(key, html, settings.FRAGMENT_CACHE_TTL)
+        return mark_safe(html)
@@ -0,0 +1,45 @@
+"""
+Health check and database connection metrics for ``/health/``.
+
+The check runs ``SELECT 1``; with pooling on (``DB_POOL``, see settings.py)
+the borrowed connection goes straight back to the pool. ``pool_stats``
+reports this process's pool: its size limits, how many connections are open
+and in use, and psycopg_pool's counters (requests served, waits, timeouts).
+"""
+import time
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+def check_database(alias=DEFAULT_DB_ALIAS):
+    """``(ok, milliseconds)`` for a trivial query."""
+    start = time.perf_counter()
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute("SELECT 1")
+    except DatabaseError:
+        return False, None
+    return True, round((time.perf_counter() - start) * 1000, 2)
+
+
+def pool_stats(alias=DEFAULT_DB_ALIAS):
+    """This process's connection pool usage, or None when pooling is off."""
+    connection = connections[alias]
+    # Only the PostgreSQL backend pools; the property is None when it isn't configured
+    pool = getattr(connection, "pool", None)
+    if pool is None:
+        return None
+    stats = pool.get_stats()
+    return {
+        "min_size": pool.min_size,
+        "max_size": pool.max_size,
+        "open": stats.get("pool_size", 0),
+        "in_use": stats.get("pool_size", 0) - stats.get("pool_available", 0),
+        "waiting": stats.get("requests_waiting", 0),
+        "requests": stats.get("requests_num", 0),
+        "requests_queued": stats.get("requests_queued", 0),
+        "wait_ms": stats.get("requests_wait_ms", 0),
+        "timeouts": stats.get("requests_errors", 0),
+        "connections_opened": stats.get("connections_num", 0),
+        "connections_lost": stats.get("connections_lost", 0),
+    }
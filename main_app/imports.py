@@ -0,0 +1,248 @@
+"""
+Bulk CSV import for inventory and assets.
+
+The CSV is read row by row, so file size doesn't matter. Category and
+location names are resolved through dicts loaded with one query each, and
+every row is validated with the same rules as the add/edit forms
+(``InventoryImportForm`` / ``AssetImportForm``). Valid rows are written
+``IMPORT_BATCH_SIZE`` at a time, one transaction per batch: inventory with
+``bulk_create``, assets with a ``bulk_create`` upsert keyed on
+``serial_number`` that inserts new assets and updates existing ones (the
+last row wins when a serial number repeats). Asset batches lock one row
+first, so two asset imports take turns and each sees the assets the other
+created. Invalid rows are skipped and reported with their line number.
+
+``checkpoint(rows_read, result)`` is called in each batch's transaction, so
+what it records commits with the batch. An import run again with
+``resume=(rows_read, result_dict)`` from its last checkpoint skips the rows
+that were already written instead of creating them twice.
+
+Bulk writes don't send signals, so each batch updates the stat counters and
+the search index itself, and the dashboard KPIs and cached tables are dropped
+afterwards. Each batch also records its quantity changes in the stock ledger
+(see stock.py): a receipt for every new row and an adjustment for every
+existing asset whose quantity the import changed.
+"""
+import csv
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .counters import COUNTED_FIELDS, apply_changes
+from .forms import AssetImportForm, InventoryImportForm
+from .fragments import bump_generations
+from .kpis import invalidate_dashboard_kpis
+from .models import Asset, Category, Inventory, Location, Watermark
+from .reports import invalidate_inventory_report
+from .search import index_objects
+from .stock import record_movements
+
+# Row locked by every asset import batch
+ASSET_IMPORT_LOCK = "imports:assets"
+
+# Overwritten on existing assets (matched by serial number)
+ASSET_UPDATE_FIELDS = ["name", "category", "location", "quantity", "purchase_date", "status", "updated_at"]
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        # [(line number, ["message", ...])], capped at IMPORT_MAX_ERRORS
+        self.errors = []
+
+    @property
+    def rows(self):
+        return self.created + self.updated + self.error_count
+
+    @classmethod
+    def from_dict(cls, data):
+        result = cls()
+        result.created = data["created"]
+        result.updated = data["updated"]
+        result.error_count = data["error_count"]
+        result.errors = [(line, messages) for line, messages in data["errors"]]
+        return result
+
+    def as_dict(self):
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+    def add_error(self, line, messages):
+        self.error_count += 1
+        if len(self.errors) < settings.IMPORT_MAX_ERRORS:
+            self.errors.append((line, messages))
+
+
+def _key(name):
+    return (name or "").strip().casefold()
+
+
+def _lookup(model):
+    # Name -> id for every row, in one query; names are matched case-insensitively
+    return {_key(name): pk for pk, name in model.objects.values_list("id", "name")}
+
+
+def _form_errors(form):
+    return [
+        f"{field}: {message}" if field != "__all__" else message
+        for field, messages in form.errors.items()
+        for message in messages
+    ]
+
+
+class _Importer:
+    form_class = None
+
+    def __init__(self, owner=None, batch_size=None, checkpoint=None, resume=None):
+        self.owner = owner
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        self.categories = _lookup(Category)
+        self.locations = _lookup(Location)
+        self.resume_after, self.result = 0, ImportResult()
+        if resume:
+            self.resume_after, self.result = resume[0], ImportResult.from_dict(resume[1])
+
+    def build(self, line, row):
+        """A validated, unsaved instance for ``row``, or None after recording its errors."""
+        errors = []
+        category_id = self.categories.get(_key(row.get("category")))
+        if category_id is None:
+            errors.append(f"category: Unknown category {row.get('category')!r}.")
+        location_id = self.locations.get(_key(row.get("location")))
+        if location_id is None:
+            errors.append(f"location: Unknown location {row.get('location')!r}.")
+
+        form = self.form_class(row)
+        if not form.is_valid():
+            errors.extend(_form_errors(form))
+        if errors:
+            self.result.add_error(line, errors)
+            return None
+
+        obj = form.save(commit=False)
+        obj.category_id = category_id
+        obj.location_id = location_id
+        obj.owner = self.owner
+        return obj
+
+    def run(self, rows):
+        """Import ``rows`` (an iterable of dicts, e.g. a csv.DictReader)."""
+        batch = []
+        read = self.resume_after
+        # Line 1 is the header
+        for line, row in enumerate(rows, start=2):
+            if line - 1 <= self.resume_after:
+                # Written (or reported) by the run that was interrupted
+                continue
+            read = line - 1
+            obj = self.build(line, row)
+            if obj is not None:
+                batch.append(obj)
+            if len(batch) == self.batch_size:
+                self.commit(batch, read)
+                batch = []
+        if batch or read > self.resume_after:
+            self.commit(batch, read)
+        transaction.on_commit(invalidate_dashboard_kpis)
+        transaction.on_commit(lambda: bump_generations(self.form_class._meta.model))
+        return self.result
+
+    def commit(self, batch, read):
+        with transaction.atomic():
+            if batch:
+                self.write(batch)
+            if self.checkpoint:
+                self.checkpoint(read, self.result)
+        self.resume_after = read
+
+    def write(self, objs):
+        """Save one batch; runs in the batch's transaction."""
+        raise NotImplementedError
+
+
+class InventoryImporter(_Importer):
+    form_class = InventoryImportForm
+
+    def write(self, objs):
+        now = timezone.now()
+        for obj in objs:
+            obj.created_at = obj.updated_at = now
+        created = Inventory.objects.bulk_create(objs)
+        apply_changes(Inventory, added=[_counted(Inventory, obj) for obj in created])
+        index_objects(Inventory, created)
+        record_movements(Inventory, "receipt", [(obj, obj.quantity) for obj in created], self.owner, "CSV import")
+        transaction.on_commit(lambda: invalidate_inventory_report(now))
+        self.result.created += len(created)
+
+
+class AssetImporter(_Importer):
+    form_class = AssetImportForm
+
+    def write(self, batch):
+        now = timezone.now()
+        # Last row wins when a serial number repeats within the batch
+        by_serial = {obj.serial_number: obj for obj in batch}
+        # One asset import batch at a time until commit: a serial number another import
+        # inserted after the read below would be overwritten by the upsert but counted as new
+        Watermark.objects.select_for_update().get_or_create(name=ASSET_IMPORT_LOCK)
+        existing = {
+            row.pop("serial_number"): row
+            for row in Asset.objects.select_for_update()
+            .filter(serial_number__in=list(by_serial))
+            .values("id", "serial_number", *COUNTED_FIELDS[Asset])
+        }
+        objs = list(by_serial.values())
+        for obj in objs:
+            obj.created_at = obj.updated_at = now
+        # One INSERT .. ON CONFLICT (serial_number) DO UPDATE for new and existing assets
+        Asset.objects.bulk_create(
+            objs, update_conflicts=True, unique_fields=["serial_number"], update_fields=ASSET_UPDATE_FIELDS,
+        )
+        apply_changes(
+            Asset,
+            removed=list(existing.values()),
+            added=[_counted(Asset, obj) for obj in objs],
+        )
+        index_objects(Asset, objs)
+        record_movements(
+            Asset, "receipt", [(obj, obj.quantity) for obj in objs if obj.serial_number not in existing],
+            self.owner, "CSV import",
+        )
+        record_movements(
+            Asset, "adjustment",
+            [(obj, obj.quantity - existing[obj.serial_number]["quantity"]) for obj in objs if obj.serial_number in existing],
+            self.owner, "CSV import",
+        )
+        created = len(objs) - len(existing)
+        self.result.created += created
+        # Existing assets, plus rows replaced by a later row with the same serial number
+        self.result.updated += len(existing) + len(batch) - len(by_serial)
+
+
+IMPORTERS = {
+    "inventory": InventoryImporter,
+    "assets": AssetImporter,
+}
+
+
+def _counted(model, obj):
+    return {field: getattr(obj, field) for field in COUNTED_FIELDS[model]}
+
+
+def import_csv(kind, fileobj, owner=None, batch_size=None, checkpoint=None, resume=None):
+    """Import a CSV text stream into ``kind`` ("inventory" or "assets").
+
+    ``checkpoint(rows_read, result)`` is called in every batch's
+    transaction; ``resume`` is the ``(rows_read, result.as_dict())`` of the
+    last one, to carry on an interrupted import.
+    """
+    importer = IMPORTERS[kind](owner=owner, batch_size=batch_size, checkpoint=checkpoint, resume=resume)
+    return importer.run(csv.DictReader(fileobj))
@@ -0,0 +1,220 @@
+"""
+Per-request metrics.
+
+``RequestMetricsMiddleware`` records, for every request, the view that
+handled it, how many SQL queries it ran and how long they took, and how long
+its templates took to render. It adds them to the response as a
+``Server-Timing`` header (shown in the browser's network panel), writes one
+JSON log line to the ``main_app.requests`` logger, and keeps the last
+REQUEST_METRICS_WINDOW requests per view in memory for
+``/metrics/requests/``.
+
+Queries are counted by an execute wrapper that every new database
+connection gets (see signals.py), which reports to the request's recorder
+through a context variable. That way the queries an async view runs on other
+threads (see concurrency.py) are counted too. Templates are timed by the
+render helpers in query_plans.py.
+
+A statement run DUPLICATE_QUERY_THRESHOLD times in one request (the shape of
+an N+1 loop) is logged as a warning with the code that issued it.
+"""
+import json
+import logging
+import math
+import threading
+import time
+import traceback
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger("main_app.requests")
+
+# Upper bounds (ms) of the latency histogram buckets
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, math.inf)
+
+# Project frames shown for a duplicated query
+STACK_DEPTH = 5
+
+_recorder = ContextVar("request_metrics", default=None)
+
+
+class RequestRecorder:
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.statements = Counter()
+        self.duplicates = {}
+        self._lock = threading.Lock()
+
+    def add_query(self, sql, seconds):
+        threshold = settings.DUPLICATE_QUERY_THRESHOLD
+        with self._lock:
+            self.queries += 1
+            self.db_seconds += seconds
+            self.statements[sql] += 1
+            repeated = self.statements[sql]
+        # Only look at the stack once, when a statement reaches the threshold
+        if threshold and repeated == threshold:
+            self.duplicates[sql] = _origin()
+
+    def add_render(self, seconds):
+        with self._lock:
+            self.template_seconds += seconds
+
+
+def _origin():
+    # The innermost frames from this project (not Django, not this module)
+    base = str(settings.BASE_DIR)
+    frames = [
+        f"{frame.filename.removeprefix(base + '/')}:{frame.lineno} in {frame.name}"
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(base) and "site-packages" not in frame.filename and frame.filename != __file__
+    ]
+    return frames[-STACK_DEPTH:]
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper installed on every connection; a no-op outside a request."""
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.add_query(sql, time.perf_counter() - start)
+
+
+@contextmanager
+def timed_render():
+    recorder = _recorder.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if recorder is not None:
+            recorder.add_render(time.perf_counter() - start)
+
+
+class _Histogram:
+    """The last REQUEST_METRICS_WINDOW requests of each view."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = defaultdict(self._window)
+
+    @staticmethod
+    def _window():
+        return deque(maxlen=settings.REQUEST_METRICS_WINDOW)
+
+    def add(self, view, total_ms, queries, db_ms, template_ms):
+        with self._lock:
+            self._views[view].append((total_ms, queries, db_ms, template_ms))
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+
+    def snapshot(self):
+        with self._lock:
+            views = {view: list(samples) for view, samples in self._views.items()}
+        return {view: _summarize(samples) for view, samples in sorted(views.items())}
+
+
+def _percentile(values, fraction):
+    return values[max(math.ceil(len(values) * fraction) - 1, 0)]
+
+
+def _summarize(samples):
+    totals = sorted(sample[0] for sample in samples)
+    queries = sorted(sample[1] for sample in samples)
+    db = sorted(sample[2] for sample in samples)
+    templates = sorted(sample[3] for sample in samples)
+    buckets = Counter(next(bound for bound in BUCKETS_MS if total <= bound) for total in totals)
+    return {
+        "requests": len(samples),
+        "total_ms": {
+            "p50": _percentile(totals, 0.5), "p95": _percentile(totals, 0.95),
+            "p99": _percentile(totals, 0.99), "max": totals[-1],
+        },
+        "db_ms": {"p50": _percentile(db, 0.5), "p95": _percentile(db, 0.95)},
+        "template_ms": {"p50": _percentile(templates, 0.5), "p95": _percentile(templates, 0.95)},
+        "queries": {"mean": round(sum(queries) / len(queries), 1), "max": queries[-1]},
+        # Requests per latency bucket, keyed by its upper bound in ms
+        "histogram": {("+inf" if bound == math.inf else str(bound)): buckets.get(bound, 0) for bound in BUCKETS_MS},
+    }
+
+
+histogram = _Histogram()
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        if not settings.REQUEST_METRICS:
+            return self.get_response(request)
+        recorder, token, start = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self._finish(request, response, recorder, start)
+
+    async def _acall(self, request):
+        if not settings.REQUEST_METRICS:
+            return await self.get_response(request)
+        recorder, token, start = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self._finish(request, response, recorder, start)
+
+    def _start(self):
+        recorder = RequestRecorder()
+        return recorder, _recorder.set(recorder), time.perf_counter()
+
+    def _finish(self, request, response, recorder, start):
+        total_ms = round((time.perf_counter() - start) * 1000, 2)
+        db_ms = round(recorder.db_seconds * 1000, 2)
+        template_ms = round(recorder.template_seconds * 1000, 2)
+        match = request.resolver_match
+        view = (match.view_name or match._func_path) if match else "unresolved"
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={db_ms};desc="{recorder.queries} queries"',
+            f"tpl;dur={template_ms}",
+            f"total;dur={total_ms}",
+        ])
+        logger.info(json.dumps({
+            "view": view,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": recorder.queries,
+            "db_ms": db_ms,
+            "template_ms": template_ms,
+            "total_ms": total_ms,
+            "duplicate_queries": len(recorder.duplicates),
+        }))
+        for sql, origin in recorder.duplicates.items():
+            logger.warning(
+                "%s ran %d times in one request to %s: %s\n  %s",
+                sql[:200], recorder.statements[sql], view, request.path, "\n  ".join(origin),
+            )
+        histogram.add(view, total_ms, recorder.queries, db_ms, template_ms)
+        return response
@@ -0,0 +1,214 @@
+"""
+Database-backed background jobs.
+
+A web request calls ``enqueue()`` and returns straight away with the job id;
+the ``run_jobs`` worker claims queued jobs with
+``select_for_update(skip_locked=True)``, so any number of worker processes
+can share the queue, and runs them on a thread pool. Handlers report
+progress as they go; the job page polls ``/jobs/<id>/status/`` and offers
+the result file for download when the job is done.
+
+A job that stops reporting progress for JOB_STALE_SECONDS (its worker was
+killed, say) is claimed again by the next worker that polls. Every write a
+run makes to its job is guarded on the ``started_at`` of its claim, so a run
+that was only slow finds out it lost the job (``JobLost``) and stops
+instead of overwriting the newer run's status and result. Imports record
+the rows they have committed with each batch, and a re-claimed import
+carries on from there.
+"""
+import io
+import logging
+import signal
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .analytics import materialize_reports
+from .exports import export_filename, export_queryset, export_rows, write_csv, write_xlsx
+from .imports import import_csv
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Seconds between progress writes, so a fast job doesn't hammer the jobs table
+PROGRESS_INTERVAL = 1.0
+
+HANDLERS = {}
+
+
+class JobLost(Exception):
+    """The job went stale and another worker claimed it; this run must stop."""
+
+
+def _claimed(job):
+    # The job's row, as long as it is still this run's claim
+    return Job.objects.filter(pk=job.pk, started_at=job.started_at)
+
+
+def handler(kind):
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, owner=None, params=None, input_file=None):
+    job = Job(kind=kind, owner=owner, params=params or {})
+    if input_file is not None:
+        job.input_file.save(input_file.name, input_file, save=False)
+    job.save()
+    return job
+
+
+def _reporter(job):
+    last = [0.0]
+
+    def report(progress, total=None, force=False):
+        job.progress = progress
+        if total is not None:
+            job.total = total
+        now = time.monotonic()
+        if force or now - last[0] >= PROGRESS_INTERVAL:
+            last[0] = now
+            if not _claimed(job).update(progress=job.progress, total=job.total, updated_at=timezone.now()):
+                raise JobLost(job.pk)
+
+    return report
+
+
+def claim_jobs(limit):
+    """Mark up to ``limit`` of the oldest runnable jobs as running and return them."""
+    stale = timezone.now() - timedelta(seconds=settings.JOB_STALE_SECONDS)
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(Q(status="queued") | Q(status="running", updated_at__lt=stale))
+            .order_by("created_at", "id")[:limit]
+        )
+        now = timezone.now()
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(status="running", started_at=now, updated_at=now)
+    for job in jobs:
+        job.status, job.started_at = "running", now
+    return jobs
+
+
+def run_job(job):
+    report = _reporter(job)
+    try:
+        HANDLERS[job.kind](job, report)
+    except JobLost:
+        logger.warning("Job %s (%s) was claimed by another worker; dropping this run", job.pk, job.kind)
+        return job
+    except Exception as error:
+        logger.exception("Job %s (%s) failed", job.pk, job.kind)
+        job.status = "failed"
+        job.message = str(error) or error.__class__.__name__
+    else:
+        job.status = "done"
+    job.finished_at = timezone.now()
+    # Only the fields a run sets, and only while the claim is still ours
+    saved = _claimed(job).update(
+        status=job.status, message=job.message, result=job.result, result_file=job.result_file.name,
+        progress=job.progress, total=job.total, finished_at=job.finished_at, updated_at=job.finished_at,
+    )
+    if not saved:
+        logger.warning("Job %s (%s) was claimed by another worker; dropping this run's outcome", job.pk, job.kind)
+    return job
+
+
+def _run_in_thread(job):
+    try:
+        run_job(job)
+    finally:
+        # Each pool thread has its own connection
+        connection.close()
+
+
+def work(workers=None, once=False, poll_interval=None):
+    """Run jobs until stopped (SIGTERM/SIGINT), or until the queue is empty with ``once``."""
+    workers = workers or settings.JOB_WORKERS
+    poll_interval = settings.JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+    stopping = threading.Event()
+    previous = {}
+    if threading.current_thread() is threading.main_thread():
+        # Finish the jobs in hand, but claim no more
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            previous[signum] = signal.signal(signum, lambda *args: stopping.set())
+
+    running = set()
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job") as pool:
+            while not stopping.is_set():
+                close_old_connections()
+                running = {future for future in running if not future.done()}
+                jobs = claim_jobs(workers - len(running)) if len(running) < workers else []
+                running.update(pool.submit(_run_in_thread, job) for job in jobs)
+                if once and not jobs and not running:
+                    break
+                if not jobs:
+                    stopping.wait(poll_interval)
+    finally:
+        for signum, previous_handler in previous.items():
+            signal.signal(signum, previous_handler)
+
+
+# Handlers: handler(job, report) does the work, reporting progress with
+# report(progress, total=None), and may set job.result, job.message and
+# job.result_file before the job is saved as done. report() raises JobLost
+# once another worker has claimed the job.
+
+@handler("import")
+def run_import(job, report):
+    def checkpoint(rows, result):
+        # Commits with the batch, so a re-claimed run skips exactly the rows written
+        job.progress, job.result = rows, result.as_dict()
+        if not _claimed(job).update(progress=rows, result=job.result, updated_at=timezone.now()):
+            raise JobLost(job.pk)
+
+    # A job claimed again after its worker died carries on from its last checkpoint
+    resume = (job.progress, job.result) if job.progress else None
+    with job.input_file.open("rb") as raw:
+        text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+        result = import_csv(job.params["kind"], text, owner=job.owner, checkpoint=checkpoint, resume=resume)
+    report(result.rows, total=result.rows, force=True)
+    job.result = result.as_dict()
+    job.message = f"Created {result.created}, updated {result.updated}, skipped {result.error_count} invalid rows."
+
+
+def _counting(rows, report, every):
+    for count, row in enumerate(rows, start=1):
+        yield row
+        if count % every == 0:
+            report(count)
+
+
+@handler("export")
+def run_export(job, report):
+    name, extension = job.params["name"], job.params.get("format", "csv")
+    filters = job.params.get("filters", {})
+    total = export_queryset(name, filters).count()
+    report(0, total=total, force=True)
+
+    headers, rows = export_rows(name, filters)
+    write = write_xlsx if extension == "xlsx" else write_csv
+    with tempfile.TemporaryFile() as spool:
+        write(headers, _counting(rows, report, settings.EXPORT_CHUNK_SIZE), spool)
+        spool.seek(0)
+        job.result_file.save(export_filename(name, extension), File(spool), save=False)
+    report(total, force=True)
+    job.message = f"Exported {total} rows."
+
+
+@handler("materialize_reports")
+def run_materialize_reports(job, report):
+    job.result = materialize_reports(progress=report)
+    report(job.result["facts"], force=True)
+    job.message = f"Processed {job.result['facts']} orders, refreshed {job.result['months']} months."
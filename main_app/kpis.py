@@ -0,0 +1,42 @@
+"""
+Dashboard KPIs.
+
+The counts are read from the stat counter table (see counters.py), which is
+a handful of rows however large the source tables get, and cached for
+KPI_CACHE_TTL seconds. Saves and deletes of the counted models drop the
+cached copy (see signals.py).
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from . import counters
+from .models import PurchaseOrder
+
+KPI_CACHE_KEY = "dashboard:kpis"
+
+OPEN_PO_STATUSES = ("pending", "confirmed")
+
+
+def compute_dashboard_kpis():
+    stats = counters.read("total", "po_status")
+
+    def count(scope, key):
+        counter = stats[scope].get(key)
+        return counter.count if counter else 0
+
+    po_status = {status: count("po_status", status) for status, _ in PurchaseOrder.STATUS_CHOICES}
+    return {
+        "assets": count("total", "asset"),
+        "suppliers": count("total", "supplier"),
+        "pos_open": sum(po_status[status] for status in OPEN_PO_STATUSES),
+        "pos_delivered": po_status["delivered"],
+        "po_status": po_status,
+    }
+
+
+def get_dashboard_kpis():
+    return cache.get_or_set(KPI_CACHE_KEY, compute_dashboard_kpis, settings.KPI_CACHE_TTL)
+
+
+def invalidate_dashboard_kpis():
+    cache.delete(KPI_CACHE_KEY)
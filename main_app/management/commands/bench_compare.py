@@ -0,0 +1,40 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.benchmarks import compare_results
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare two bench_routes baselines route by route; exits non-zero when a route's p95 "
+        "grew by more than --threshold or it runs more queries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("old")
+        parser.add_argument("new")
+        parser.add_argument("--threshold", type=float, default=0.15, help="Allowed p95 growth, as a fraction.")
+        parser.add_argument("--min-ms", type=float, default=2.0, help="Ignore p95 changes smaller than this.")
+
+    def handle(self, *args, **options):
+        baselines = []
+        for path in (options["old"], options["new"]):
+            with open(path) as baseline:
+                baselines.append(json.load(baseline))
+        old, new = baselines
+        self.stdout.write(f"{old['meta'].get('commit') or options['old']} -> {new['meta'].get('commit') or options['new']}")
+
+        rows = compare_results(old, new, threshold=options["threshold"], min_ms=options["min_ms"])
+        for label, before, after, regressed in rows:
+            change = (after["p95"] - before["p95"]) / before["p95"] * 100 if before["p95"] else 0
+            line = (
+                f"{label:<28} p95 {before['p95']:8.2f} -> {after['p95']:8.2f}ms ({change:+6.1f}%)  "
+                f"queries {before['queries']} -> {after['queries']}"
+            )
+            self.stdout.write(self.style.ERROR(line) if regressed else line)
+
+        regressions = [label for label, _, _, regressed in rows if regressed]
+        if regressions:
+            raise CommandError(f"{len(regressions)} route(s) regressed: {', '.join(regressions)}")
+        self.stdout.write(self.style.SUCCESS(f"No regressions across {len(rows)} routes."))
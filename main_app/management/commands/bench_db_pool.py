@@ -0,0 +1,86 @@
+import math
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+MODES = ("unpooled", "persistent", "pooled")
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test database connection handling: THREADS threads each run request-like "
+        "cycles (take a connection, run a query, release it as request_finished would) "
+        "with a new connection per request, persistent per-thread connections, and a "
+        "psycopg pool, and print p50/p95 latency for each."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--requests", type=int, default=2000, help="Requests per mode, split across the threads.")
+        parser.add_argument("--pool-size", type=int, default=None, help="Pool max size (default: --threads).")
+        parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+        parser.add_argument("--query", default="SELECT 1")
+
+    def handle(self, *args, **options):
+        if connections[DEFAULT_DB_ALIAS].vendor != "postgresql":
+            raise CommandError("Connection pooling needs PostgreSQL.")
+
+        for mode in options["modes"]:
+            alias = self.configure(mode, options["pool_size"] or options["threads"])
+            try:
+                timings, elapsed = self.run(alias, options)
+            finally:
+                if mode == "pooled":
+                    connections[alias].close_pool()
+            timings.sort()
+            p95 = timings[math.ceil(len(timings) * 0.95) - 1]
+            self.stdout.write(
+                f"{mode:<11} p50={statistics.median(timings):7.2f}ms  p95={p95:7.2f}ms  "
+                f"max={timings[-1]:7.2f}ms  {len(timings) / elapsed:8.0f} req/s"
+            )
+
+    def configure(self, mode, pool_size):
+        # A copy of the default database under its own alias, so each mode gets fresh connections
+        config = dict(connections.settings[DEFAULT_DB_ALIAS])
+        options = {key: value for key, value in config.get("OPTIONS", {}).items() if key != "pool"}
+        if mode == "pooled":
+            options["pool"] = {"min_size": pool_size, "max_size": pool_size, "timeout": 30}
+        config["OPTIONS"] = options
+        config["CONN_MAX_AGE"] = 600 if mode == "persistent" else 0
+        alias = f"bench_{mode}"
+        connections.settings[alias] = config
+        return alias
+
+    def run(self, alias, options):
+        per_thread = max(1, options["requests"] // options["threads"])
+        timings = []
+        lock = threading.Lock()
+
+        def worker():
+            connection = connections[alias]
+            local = []
+            try:
+                for _ in range(per_thread):
+                    start = time.perf_counter()
+                    # What the request_started/request_finished handlers do around a request
+                    connection.close_if_unusable_or_obsolete()
+                    with connection.cursor() as cursor:
+                        cursor.execute(options["query"])
+                        cursor.fetchall()
+                    connection.close_if_unusable_or_obsolete()
+                    local.append((time.perf_counter() - start) * 1000)
+            finally:
+                connection.close()
+            with lock:
+                timings.extend(local)
+
+        threads = [threading.Thread(target=worker) for _ in range(options["threads"])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return timings, time.perf_counter() - start
@@ -0,0 +1,83 @@
+import math
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template import engines
+from django.test.utils import override_settings
+
+from main_app.fragments import bump_generations
+from main_app.models import Category, Inventory, Location
+from main_app.views import INVENTORY_LIST_PLAN, INVENTORY_TABLE
+
+# The list page before fragment caching: one template looping over the rows
+INLINE_TABLE = "{% for item in items %}{% include row_template %}{% endfor %}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed N inventory items inside a transaction, time rendering them as one "
+        "table with and without the fragment cache, then roll everything back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=10, help="Renders per mode.")
+
+    # Single process, so the per-process default cache is fine here
+    @override_settings(FRAGMENT_CACHE=True)
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            categories = Category.objects.bulk_create(Category(name=f"Category {i}") for i in range(20))
+            locations = Location.objects.bulk_create(Location(name=f"Site {i}") for i in range(10))
+            created = Inventory.objects.bulk_create(
+                Inventory(
+                    name=f"Item {i}", quantity=i % 500, unit_price=Decimal(i % 1000) / 10,
+                    category=categories[i % len(categories)], location=locations[i % len(locations)],
+                )
+                for i in range(options["rows"])
+            )
+            first_pk = min(item.pk for item in created)
+            items = list(INVENTORY_LIST_PLAN.apply(Inventory.objects.filter(pk__gte=first_pk).order_by("id")))
+            self.stdout.write(f"Rendering {len(items)} rows with {type(caches['default']).__name__}...")
+
+            inline = engines["django"].from_string(INLINE_TABLE)
+
+            def render_inline():
+                inline.render({"items": items, "row_template": INVENTORY_TABLE.row_template_name})
+
+            def render_table():
+                INVENTORY_TABLE.render(lambda: items)
+
+            def uncached():
+                with override_settings(FRAGMENT_CACHE=False):
+                    render_table()
+
+            modes = {
+                "inline": (None, render_inline),
+                "uncached": (None, uncached),
+                # New related generations: every row key misses, rows are rendered and stored
+                "cold": (lambda: bump_generations(Category, Location), render_table),
+                # A new inventory generation: the table misses, every row is read from the cache
+                "warm rows": (lambda: bump_generations(Inventory), render_table),
+                "warm table": (None, render_table),
+            }
+            render_table()
+            for label, (before, render) in modes.items():
+                timings = []
+                for _ in range(options["repeat"]):
+                    if before:
+                        before()
+                    start = time.perf_counter()
+                    render()
+                    timings.append((time.perf_counter() - start) * 1000)
+                timings.sort()
+                p95 = timings[math.ceil(len(timings) * 0.95) - 1]
+                self.stdout.write(f"{label:<11} p50={statistics.median(timings):8.2f}ms  p95={p95:8.2f}ms")
+
+            # Leave the database as we found it
+            transaction.set_rollback(True)
+        bump_generations(Category, Location, Inventory)
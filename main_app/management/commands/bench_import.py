@@ -0,0 +1,51 @@
+import io
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from main_app.imports import import_csv
+from main_app.models import Category, Location
+
+HEADERS = {
+    "assets": "name,category,location,serial_number,purchase_date,status,quantity\n",
+    "inventory": "name,category,location,quantity,unit_price\n",
+}
+
+
+def _row(kind, i):
+    category, location = f"Bench category {i % 20}", f"Bench site {i % 10}"
+    if kind == "assets":
+        return f"Asset {i},{category},{location},BENCH-{i},2024-01-01,available,{i % 5 + 1}\n"
+    return f"Item {i},{category},{location},{i % 500},{i % 1000 / 10:.2f}\n"
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a synthetic N-row CSV inside a transaction, print the rate in rows "
+        "a minute, then roll everything back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", nargs="?", choices=sorted(HEADERS), default="assets")
+        parser.add_argument("--rows", type=int, default=50_000)
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--min-rate", type=int, default=None, help="Fail below this many rows a minute.")
+
+    def handle(self, *args, **options):
+        kind, rows = options["kind"], options["rows"]
+        csv_text = HEADERS[kind] + "".join(_row(kind, i) for i in range(rows))
+        with transaction.atomic():
+            Category.objects.bulk_create(Category(name=f"Bench category {i}") for i in range(20))
+            Location.objects.bulk_create(Location(name=f"Bench site {i}") for i in range(10))
+            self.stdout.write(f"Importing {rows} {kind} rows on {connection.vendor}...")
+            start = time.perf_counter()
+            result = import_csv(kind, io.StringIO(csv_text), batch_size=options["batch_size"])
+            elapsed = time.perf_counter() - start
+            # Leave the database as we found it
+            transaction.set_rollback(True)
+
+        rate = result.rows / elapsed * 60
+        self.stdout.write(f"{result.created} created, {result.error_count} invalid in {elapsed:.2f}s: {rate:,.0f} rows/min")
+        if options["min_rate"] and rate < options["min_rate"]:
+            raise CommandError(f"{rate:,.0f} rows/min is below --min-rate {options['min_rate']:,}.")
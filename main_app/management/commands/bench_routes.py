@@ -0,0 +1,45 @@
+import json
+import logging
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.benchmarks import BENCH_ROUTES, HttpTransport, InProcessTransport, baseline, run_routes
+
+
+class Command(BaseCommand):
+    help = (
+        "Request the main pages repeatedly and record p50/p95/p99 latency, queries per request "
+        "and RSS per route, optionally writing a JSON baseline for bench_compare. Runs in this "
+        "process through the test client, or against a running server with --base-url."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20, help="Timed requests per route.")
+        parser.add_argument("--warmup", type=int, default=1, help="Untimed requests per route first.")
+        parser.add_argument("--user", default="bench_owner", help="User to request pages as (see seed_bench).")
+        parser.add_argument("--base-url", help="e.g. http://127.0.0.1:8000 for a local gunicorn sharing this database.")
+        parser.add_argument("--pid", type=int, help="With --base-url: the server process to read RSS from.")
+        parser.add_argument("--route", action="append", choices=sorted(BENCH_ROUTES), help="Only these routes.")
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options["user"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user {options['user']!r}; run seed_bench first or pass --user.")
+
+        if options["base_url"]:
+            transport, mode = HttpTransport(user, options["base_url"], options["pid"]), "http"
+        else:
+            transport, mode = InProcessTransport(user), "in-process"
+
+        # The per-request log lines would drown out the results
+        logging.getLogger("main_app.requests").setLevel(logging.WARNING)
+        results = run_routes(
+            transport, repeat=options["repeat"], warmup=options["warmup"], labels=options["route"], log=self.stdout.write,
+        )
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                json.dump(baseline(results, mode, options["repeat"]), output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}."))
@@ -0,0 +1,97 @@
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.benchmarks import BENCH_ROUTES, InProcessTransport, run_routes
+from main_app.warmup import warm_templates
+
+MODES = ("cold", "warm")
+
+
+class Command(BaseCommand):
+    help = (
+        "Start fresh processes and time each one's first request to every route, without "
+        "and with the template warm-up gunicorn workers run at boot, against the same "
+        "requests once the process is warm."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=5, help="Fresh processes per mode.")
+        parser.add_argument("--user", default="bench_owner", help="User to request pages as (see seed_bench).")
+        parser.add_argument("--route", action="append", choices=sorted(BENCH_ROUTES), help="Only these routes.")
+        # Set on the processes this command starts
+        parser.add_argument("--child", choices=MODES, help="Internal: time one process and print JSON.")
+
+    def handle(self, *args, **options):
+        if options["child"]:
+            self.child(options)
+            return
+
+        samples = {mode: [] for mode in MODES}
+        # Alternate the modes so drift in machine load affects both alike
+        for _ in range(options["processes"]):
+            for mode in MODES:
+                samples[mode].append(self.spawn(mode, options))
+
+        labels = list(samples["cold"][0]["first"])
+        for mode in MODES:
+            runs = samples[mode]
+            line = f"{mode:<5} process p50={statistics.median(run['wall_ms'] for run in runs):8.1f}ms"
+            if mode == "warm":
+                line += f"  warm-up p50={statistics.median(run['warmup_ms'] for run in runs):7.1f}ms ({runs[0]['templates']} templates)"
+            self.stdout.write(line)
+
+        self.stdout.write(f"\n{'route':<28} {'cold first':>11} {'warm first':>11} {'steady':>9}")
+        totals = dict.fromkeys(("cold", "warm", "steady"), 0.0)
+        for label in labels:
+            row = {
+                "cold": statistics.median(run["first"][label] for run in samples["cold"]),
+                "warm": statistics.median(run["first"][label] for run in samples["warm"]),
+                "steady": statistics.median(run["steady"][label] for run in samples["warm"]),
+            }
+            for key, value in row.items():
+                totals[key] += value
+            self.stdout.write(f"{label:<28} {row['cold']:9.2f}ms {row['warm']:9.2f}ms {row['steady']:7.2f}ms")
+        self.stdout.write(f"{'all routes':<28} {totals['cold']:9.2f}ms {totals['warm']:9.2f}ms {totals['steady']:7.2f}ms")
+
+    def spawn(self, mode, options):
+        command = [
+            sys.executable, str(settings.BASE_DIR / "manage.py"), "bench_startup",
+            "--child", mode, "--user", options["user"],
+        ]
+        for label in options["route"] or ():
+            command += ["--route", label]
+        # Cached tables would skip the very rendering being timed
+        env = {**os.environ, "FRAGMENT_CACHE": "False"}
+        start = time.perf_counter()
+        process = subprocess.run(command, env=env, capture_output=True, text=True)
+        wall_ms = (time.perf_counter() - start) * 1000
+        if process.returncode:
+            raise CommandError(process.stderr.strip().splitlines()[-1] if process.stderr.strip() else "Child failed.")
+        return {**json.loads(process.stdout.strip().splitlines()[-1]), "wall_ms": wall_ms}
+
+    def child(self, options):
+        try:
+            user = get_user_model().objects.get(username=options["user"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user {options['user']!r}; run seed_bench first or pass --user.")
+
+        logging.getLogger("main_app.requests").setLevel(logging.WARNING)
+        result = {"templates": 0, "warmup_ms": 0.0}
+        if options["child"] == "warm":
+            count, seconds = warm_templates()
+            result.update(templates=count, warmup_ms=seconds * 1000)
+
+        transport = InProcessTransport(user)
+        quiet = {"log": lambda *args: None, "labels": options["route"], "repeat": 1, "warmup": 0}
+        result["first"] = {label: row["p50"] for label, row in run_routes(transport, **quiet).items()}
+        result["steady"] = {label: row["p50"] for label, row in run_routes(transport, **quiet).items()}
+        self.stdout.write(json.dumps(result))
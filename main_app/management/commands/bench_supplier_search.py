@@ -0,0 +1,69 @@
+import math
+import random
+import statistics
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from main_app.models import Supplier
+from main_app.search import search_suppliers
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed N synthetic suppliers inside a transaction, time supplier searches, "
+        "then roll everything back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=20, help="Runs per query.")
+        parser.add_argument("--batch-size", type=int, default=5_000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+
+        def word(length):
+            return "".join(rng.choices(string.ascii_lowercase, k=length))
+
+        with transaction.atomic():
+            self.stdout.write(f"Seeding {options['rows']} suppliers on {connection.vendor}...")
+            batch = []
+            for i in range(options["rows"]):
+                name = f"{word(6).title()} {word(5).title()}"
+                contact = f"{word(5).title()} {word(7).title()}"
+                batch.append(Supplier(
+                    name=name, contact_person=contact, phone_number=f"555-{i:07d}",
+                    email=f"{word(6)}@{word(5)}.test", address="",
+                ))
+                if len(batch) == options["batch_size"]:
+                    Supplier.objects.bulk_create(batch)
+                    batch = []
+            Supplier.objects.bulk_create(batch)
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE main_app_supplier")
+
+            sample = Supplier.objects.order_by("?").values("name", "email").first()
+            queries = {
+                "prefix": sample["name"][:3],
+                "word": sample["name"].split()[0],
+                "substring": sample["email"][2:6],
+                "miss": "zzqqxx",
+            }
+            for label, query in queries.items():
+                timings = []
+                for _ in range(options["repeat"]):
+                    start = time.perf_counter()
+                    list(search_suppliers(query).order_by("-rank", "id")[:50])
+                    timings.append((time.perf_counter() - start) * 1000)
+                timings.sort()
+                p95 = timings[math.ceil(len(timings) * 0.95) - 1]
+                self.stdout.write(
+                    f"{label:<10} q={query!r:<14} p50={statistics.median(timings):7.2f}ms  p95={p95:7.2f}ms"
+                )
+
+            # Leave the database as we found it
+            transaction.set_rollback(True)
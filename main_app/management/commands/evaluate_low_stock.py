@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from main_app.alerts import evaluate_low_stock
+
+
+class Command(BaseCommand):
+    help = (
+        "Raise low stock alerts (and draft reorders) for inventory items that fell below their "
+        "reorder threshold since the last run, and resolve alerts for items restocked since."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--full", action="store_true", help="Ignore the watermark and check every item.")
+
+    def handle(self, *args, **options):
+        result = evaluate_low_stock(batch_size=options["batch_size"], full=options["full"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {result['checked']} items: raised {result['raised']} alerts, drafted "
+            f"{result['orders']} purchase orders, resolved {result['resolved']} alerts."
+        ))
@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.imports import IMPORTERS, import_csv
+
+
+class Command(BaseCommand):
+    help = "Import inventory items or assets from a CSV file (header row required)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(IMPORTERS))
+        parser.add_argument("path")
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--user", help="Username recorded as the owner of imported rows.")
+
+    def handle(self, *args, **options):
+        owner = None
+        if options["user"]:
+            try:
+                owner = get_user_model().objects.get(username=options["user"])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No user named {options['user']!r}.")
+
+        with open(options["path"], newline="", encoding="utf-8-sig") as fileobj:
+            result = import_csv(options["kind"], fileobj, owner=owner, batch_size=options["batch_size"])
+
+        for line, messages in result.errors:
+            self.stderr.write(f"Line {line}: {'; '.join(messages)}")
+        if result.error_count > len(result.errors):
+            self.stderr.write(f"... and {result.error_count - len(result.errors)} more rows with errors.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result.created}, updated {result.updated}, skipped {result.error_count} invalid rows."
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.analytics import RefreshRunning, materialize_reports
+
+
+class Command(BaseCommand):
+    help = "Refresh the reports page's summary tables from orders changed since the last run."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--full", action="store_true", help="Ignore the watermark and re-read every order.")
+
+    def handle(self, *args, **options):
+        try:
+            result = materialize_reports(batch_size=options["batch_size"], full=options["full"])
+        except RefreshRunning as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {result['facts']} orders, removed {result['removed']} deleted ones, "
+            f"refreshed {result['months']} months."
+        ))
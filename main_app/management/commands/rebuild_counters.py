@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.counters import compute_counters, diff_counters, rebuild_counters
+
+
+class Command(BaseCommand):
+    help = "Recompute the stat counters from the source tables, or verify them with --verify."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Only compare the stored counters with the source tables; exit non-zero on drift.",
+        )
+
+    def handle(self, *args, **options):
+        expected = compute_counters()
+
+        if options["verify"]:
+            drift = diff_counters(expected)
+            for (scope, key), (stored, wanted) in sorted(drift.items()):
+                self.stdout.write(f"{scope}:{key} stored={stored} expected={wanted}")
+            if drift:
+                raise CommandError(f"{len(drift)} counter(s) out of date; run rebuild_counters.")
+            self.stdout.write(self.style.SUCCESS("Counters match the source tables."))
+            return
+
+        rebuild_counters(expected)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(expected)} counters."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from main_app.jobs import work
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (imports, exports, report refreshes) on a thread pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=None, help="Threads per process (default JOB_WORKERS).")
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is empty.")
+        parser.add_argument("--poll-interval", type=float, default=None)
+
+    def handle(self, *args, **options):
+        work(workers=options["workers"], once=options["once"], poll_interval=options["poll_interval"])
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from main_app.benchmarks import BENCH_USERS, SCALE_UNIT, seed_bench_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-generate benchmark data: per unit of --scale, "
+        + ", ".join(f"{rows} {table.replace('_', ' ')}" for table, rows in SCALE_UNIT.items())
+        + ", plus categories, locations and one user per group. Adds to what's already there."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", type=int, default=1, help="1000 gives a million orders and inventory items.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=42, help="Random seed, for repeatable data.")
+        parser.add_argument("--password", default="bench", help="Password for the benchmark users.")
+
+    def handle(self, *args, **options):
+        added = seed_bench_data(
+            scale=options["scale"], batch_size=options["batch_size"], seed=options["seed"],
+            password=options["password"], log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Added {sum(added.values())} rows. Log in as {', '.join(BENCH_USERS)} with the password given."
+        ))
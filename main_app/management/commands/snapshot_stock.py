@@ -0,0 +1,29 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main_app.stock import snapshot_stock
+
+
+class Command(BaseCommand):
+    help = (
+        "Store the end-of-day quantity of every inventory item and asset that moved since the "
+        "last snapshot, so past quantities are read without replaying the stock ledger."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="Day to snapshot (YYYY-MM-DD); defaults to yesterday.")
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        day = None
+        if options["date"]:
+            try:
+                day = datetime.date.fromisoformat(options["date"])
+            except ValueError:
+                raise CommandError(f"Invalid date {options['date']!r}; use YYYY-MM-DD.")
+        try:
+            written = snapshot_stock(day, batch_size=options["batch_size"])
+        except ValueError as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} stock snapshots."))
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:44
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, ExpressionWrapper, F, Sum
+
+
+# Counters each model contributes to, as of this migration: (model, "total" key, [(scope, grouped by)]).
+# A frozen copy of counters.compute_counters over historical models, so later
+# changes to the counted fields can't change what this migration does.
+GROUPINGS = [
+    ('PurchaseOrder', 'purchase_order', [('po_status', 'status')]),
+    ('Supplier', 'supplier', []),
+    ('Asset', 'asset', [('asset_status', 'status'), ('asset_category', 'category_id'), ('asset_location', 'location_id')]),
+    ('Inventory', 'inventory', [('inventory_category', 'category_id'), ('inventory_location', 'location_id')]),
+]
+
+
+def populate_counters(apps, schema_editor):
+    StatCounter = apps.get_model('main_app', 'StatCounter')
+    line_value = ExpressionWrapper(F('quantity') * F('unit_price'), output_field=models.DecimalField(max_digits=24, decimal_places=2))
+    counters = []
+    for model_name, total_key, scopes in GROUPINGS:
+        rows = apps.get_model('main_app', model_name).objects.order_by()
+        aggregates = {'n': Count('pk')}
+        if model_name in ('Asset', 'Inventory'):
+            aggregates['qty'] = Sum('quantity')
+        if model_name == 'Inventory':
+            aggregates['val'] = Sum(line_value)
+
+        grouped = [('total', total_key, rows.aggregate(**aggregates))]
+        for scope, field in scopes:
+            grouped += [(scope, str(row.pop(field)), row) for row in rows.values(field).annotate(**aggregates)]
+        for scope, key, totals in grouped:
+            if totals['n']:
+                counters.append(StatCounter(
+                    scope=scope, key=key, count=totals['n'], quantity=totals.get('qty') or 0,
+                    value=Decimal(totals.get('val') or 0).quantize(Decimal('0.01')),
+                ))
+    StatCounter.objects.bulk_create(counters)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0008_purchaseorder_quantity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=30)),
+                ('key', models.CharField(max_length=50)),
+                ('count', models.BigIntegerField(default=0)),
+                ('quantity', models.BigIntegerField(default=0)),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=24)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('scope', 'key'), name='unique_stat_counter')],
+            },
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
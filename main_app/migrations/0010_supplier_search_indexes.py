@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:02
+
+from django.db import migrations
+
+# PostgreSQL only: the search code falls back to icontains elsewhere.
+# The indexed expression must match SUPPLIER_DOCUMENT in main_app/search.py.
+DOCUMENT = "(name || ' ' || contact_person || ' ' || email)"
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS main_app_supplier_search_fts "
+        f"ON main_app_supplier USING gin (to_tsvector('simple', {DOCUMENT}))"
+    )
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS main_app_supplier_search_trgm "
+        f"ON main_app_supplier USING gin ({DOCUMENT} gin_trgm_ops)"
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS main_app_supplier_search_fts")
+    schema_editor.execute("DROP INDEX IF EXISTS main_app_supplier_search_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0009_statcounter'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_delivered_at(apps, schema_editor):
+    # The real delivery time wasn't recorded; the last update is the closest we have
+    PurchaseOrder = apps.get_model('main_app', 'PurchaseOrder')
+    PurchaseOrder.objects.filter(status='delivered').update(delivered_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0012_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeadTimeMonthly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True)),
+                ('delivered', models.IntegerField(default=0)),
+                ('total_lead_days', models.BigIntegerField(default=0)),
+                ('max_lead_days', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Watermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='purchaseorder',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='PurchaseOrderFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('purchase_order_id', models.BigIntegerField(unique=True)),
+                ('supplier_id', models.BigIntegerField()),
+                ('order_month', models.DateField()),
+                ('quantity', models.BigIntegerField(default=0)),
+                ('delivered_month', models.DateField(blank=True, null=True)),
+                ('lead_days', models.IntegerField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['order_month'], name='po_fact_order_month_idx'), models.Index(fields=['delivered_month'], name='po_fact_delivered_month_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SupplierMonthlySpend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('orders', models.IntegerField(default=0)),
+                ('units', models.BigIntegerField(default=0)),
+                ('supplier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='main_app.supplier')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('supplier', 'month'), name='unique_supplier_month')],
+            },
+        ),
+        migrations.RunPython(backfill_delivered_at, migrations.RunPython.noop),
+    ]
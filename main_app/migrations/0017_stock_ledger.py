@@ -0,0 +1,71 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:50
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def record_opening_balances(apps, schema_editor):
+    # Quantities from before the ledger become one opening adjustment per item,
+    # so every item's movements add up to its quantity
+    StockMovement = apps.get_model('main_app', 'StockMovement')
+    now = django.utils.timezone.now()
+    for model_name in ('inventory', 'asset'):
+        rows = (
+            apps.get_model('main_app', model_name).objects.filter(quantity__gt=0)
+            .values_list('id', 'quantity', 'location_id').iterator(chunk_size=2000)
+        )
+        StockMovement.objects.bulk_create(
+            (
+                StockMovement(
+                    model=model_name, object_id=pk, kind='adjustment', delta=quantity, quantity=quantity,
+                    location_id=location_id, note='Opening balance', created_at=now,
+                )
+                for pk, quantity, location_id in rows
+            ),
+            batch_size=2000,
+        )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0016_low_stock'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=50)),
+                ('object_id', models.BigIntegerField()),
+                ('date', models.DateField()),
+                ('quantity', models.PositiveIntegerField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('model', 'object_id', 'date'), name='unique_stock_snapshot')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=50)),
+                ('object_id', models.BigIntegerField()),
+                ('kind', models.CharField(choices=[('receipt', 'Receipt'), ('issue', 'Issue'), ('transfer', 'Transfer'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('delta', models.IntegerField()),
+                ('quantity', models.PositiveIntegerField()),
+                ('note', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('location', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='main_app.location')),
+                ('other_location', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='main_app.location')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model', 'object_id', 'created_at'], name='movement_object_created_idx'), models.Index(fields=['created_at'], name='movement_created_at_idx')],
+            },
+        ),
+        migrations.RunPython(record_opening_balances, migrations.RunPython.noop),
+    ]
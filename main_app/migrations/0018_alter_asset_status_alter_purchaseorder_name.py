@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main_app', '0017_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='asset',
+            name='status',
+            field=models.CharField(choices=[('available', '✅ Available'), ('unavailable', '❌ Unavailable'), ('discontinued', '🛑 Discontinued')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='purchaseorder',
+            name='name',
+            field=models.CharField(max_length=200),
+        ),
+    ]
@@ -1,7 +1,23 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
 
+
+class AtomicWriteMixin:
+    """Run save()/delete() and their signal handlers in one transaction.
+
+    The stat counters are updated from signals, so they commit or roll back
+    together with the row they describe.
+    """
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            return super().delete(*args, **kwargs)
+
 # Category Model
 class Category(models.Model):
     name = models.CharField(max_length=50)
@@ -10,6 +26,12 @@ class Category(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Delta sync reads changes in (updated_at, id) order
+            models.Index(fields=["updated_at", "id"], name="category_updated_id_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -21,12 +43,18 @@ class Location(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Delta sync reads changes in (updated_at, id) order
+            models.Index(fields=["updated_at", "id"], name="location_updated_id_idx"),
+        ]
+
     def __str__(self):
         return self.name
     
 
 # Supplier Model
-class Supplier(models.Model):
+class Supplier(AtomicWriteMixin, models.Model):
     name = models.CharField(max_length=50)
     contact_person = models.CharField(max_length=50)
     phone_number = models.CharField(max_length=20)
@@ -36,12 +64,18 @@ class Supplier(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Delta sync reads changes in (updated_at, id) order
+            models.Index(fields=["updated_at", "id"], name="supplier_updated_id_idx"),
+        ]
+
     def __str__(self):
         return self.name
     
 
 # Asset Model
-class Asset(models.Model):
+class Asset(AtomicWriteMixin, models.Model):
     STATUS_CHOICES = [
         ('available', '✅ Available'),
         ('unavailable', '❌ Unavailable'),
@@ -59,12 +93,20 @@ class Asset(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Asset filters by status, optionally narrowed to a category
+            models.Index(fields=["status", "category"], name="asset_status_category_idx"),
+            # Delta sync reads changes in (updated_at, id) order
+            models.Index(fields=["updated_at", "id"], name="asset_updated_id_idx"),
+        ]
+
     def __str__(self):
         return self.name
     
 
 # Inventory Model
-class Inventory(models.Model):
+class Inventory(AtomicWriteMixin, models.Model):
     name = models.CharField(max_length=200)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     location = models.ForeignKey(Location, on_delete=models.CASCADE)
@@ -73,13 +115,33 @@ class Inventory(models.Model):
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
+    # Low stock below this quantity (none: never); see alerts.py
+    reorder_threshold = models.PositiveIntegerField(null=True, blank=True)
+    # With both set, a low stock alert also drafts an order for this many
+    reorder_quantity = models.PositiveIntegerField(null=True, blank=True)
+    reorder_supplier = models.ForeignKey(
+        Supplier, on_delete=models.SET_NULL, null=True, blank=True, related_name="reorder_items",
+    )
+
+    class Meta:
+        indexes = [
+            # Only the items below their reorder threshold, lowest first: the dashboard reads it in order
+            models.Index(
+                fields=["quantity", "id"], name="inventory_low_stock_idx",
+                condition=models.Q(quantity__lt=models.F("reorder_threshold")),
+            ),
+            # Inventory reports filter by creation date
+            models.Index(fields=["created_at"], name="inventory_created_at_idx"),
+            # Delta sync reads changes in (updated_at, id) order
+            models.Index(fields=["updated_at", "id"], name="inventory_updated_id_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
 
 # Purchase Order Model
-class PurchaseOrder(models.Model):
+class PurchaseOrder(AtomicWriteMixin, models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending Order'),
         ('confirmed', 'Order Confirmed'),
@@ -95,6 +157,282 @@ class PurchaseOrder(models.Model):
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
+    # Set when the order is first marked delivered (lead time = delivered_at - order_date)
+    delivered_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Status filters and per-status updates
+            models.Index(fields=["status"], name="po_status_idx"),
+            # purchase_order_list and the dashboard sort by (-order_date, -id)
+            models.Index(fields=["order_date", "id"], name="po_order_date_id_idx"),
+            # Delta sync reads changes in (updated_at, id) order
+            models.Index(fields=["updated_at", "id"], name="po_updated_id_idx"),
+        ]
     
     def __str__(self):
-        return f"PO-{self.pk}-{self.supplier.id}"
\ No newline at end of file
+        return f"PO-{self.pk}-{self.supplier.id}"
+
+    def save(self, *args, **kwargs):
+        delivered_at = self.delivered_at
+        if self.status == "delivered":
+            self.delivered_at = self.delivered_at or timezone.now()
+        else:
+            self.delivered_at = None
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and self.delivered_at != delivered_at:
+            kwargs["update_fields"] = {*update_fields, "delivered_at"}
+        super().save(*args, **kwargs)
+
+
+# Stat Counter Model
+# Denormalized totals kept up to date by signals (see counters.py), so the
+# dashboard and reports read a handful of rows instead of counting tables.
+class StatCounter(models.Model):
+    scope = models.CharField(max_length=30)
+    key = models.CharField(max_length=50)
+    count = models.BigIntegerField(default=0)
+    quantity = models.BigIntegerField(default=0)
+    value = models.DecimalField(max_digits=24, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["scope", "key"], name="unique_stat_counter"),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}:{self.key}"
+
+
+# Search Entry Model
+# One denormalized row per searchable object (see search.py), so a single
+# indexed query can return mixed results across every model.
+class SearchEntry(models.Model):
+    kind = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    title = models.CharField(max_length=200)
+    subtitle = models.CharField(max_length=200, blank=True)
+    search_text = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "object_id"], name="unique_search_entry"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.title}"
+
+
+# Watermark Model
+# How far an incremental job has got through a table, e.g. the latest
+# updated_at the report materializer has processed.
+class Watermark(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+# Stock Alert Model
+# Raised by evaluate_low_stock (see alerts.py) when an item drops below its
+# reorder threshold, and resolved once it is back at or above it.
+class StockAlert(models.Model):
+    inventory = models.ForeignKey(Inventory, on_delete=models.CASCADE, related_name="stock_alerts")
+    quantity = models.PositiveIntegerField()
+    threshold = models.PositiveIntegerField()
+    purchase_order = models.ForeignKey(PurchaseOrder, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # At most one open alert per item
+            models.UniqueConstraint(
+                fields=["inventory"], condition=models.Q(resolved_at__isnull=True), name="unique_open_stock_alert",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.inventory_id}: {self.quantity} < {self.threshold}"
+
+
+# Stock Movement Model
+# One row per change to an inventory item's or asset's quantity (see
+# stock.py). Rows are only ever added; ``model``/``object_id`` rather than a
+# foreign key, so an item's history outlives it.
+class StockMovement(models.Model):
+    KIND_CHOICES = [
+        ('receipt', 'Receipt'),
+        ('issue', 'Issue'),
+        ('transfer', 'Transfer'),
+        ('adjustment', 'Adjustment'),
+    ]
+
+    model = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # Signed change, and the quantity on hand right after it
+    delta = models.IntegerField()
+    quantity = models.PositiveIntegerField()
+    location = models.ForeignKey(Location, on_delete=models.SET_NULL, null=True, blank=True)
+    # For transfers: where the stock came from or went to
+    other_location = models.ForeignKey(
+        Location, on_delete=models.SET_NULL, null=True, blank=True, related_name="+",
+    )
+    note = models.CharField(max_length=200, blank=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # An item's history, and its movements since a snapshot
+            models.Index(fields=["model", "object_id", "created_at"], name="movement_object_created_idx"),
+            # Snapshots read each day's movements
+            models.Index(fields=["created_at"], name="movement_created_at_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.model}:{self.object_id} {self.delta:+d}"
+
+
+# Stock Snapshot Model
+# An item's quantity at the end of ``date``, written by snapshot_stock for the
+# items that moved since the previous snapshot.
+class StockSnapshot(models.Model):
+    model = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    date = models.DateField()
+    quantity = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["model", "object_id", "date"], name="unique_stock_snapshot"),
+        ]
+
+    def __str__(self):
+        return f"{self.model}:{self.object_id} {self.date}: {self.quantity}"
+
+
+# Tombstone Model
+# One row per deleted record, so delta sync clients (see sync.py) can drop it
+# from their copy. Written by a post_delete signal.
+class Tombstone(models.Model):
+    model = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Delta sync reads one model's deletes in (deleted_at, id) order
+            models.Index(fields=["model", "deleted_at", "id"], name="tombstone_model_deleted_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.model}:{self.object_id}"
+
+
+# Report tables (see analytics.py). Built by the materialize_reports command
+# so the reports page reads a few small tables instead of scanning orders.
+
+# One narrow row per purchase order, holding just what the summaries need
+class PurchaseOrderFact(models.Model):
+    purchase_order_id = models.BigIntegerField(unique=True)
+    supplier_id = models.BigIntegerField()
+    order_month = models.DateField()
+    quantity = models.BigIntegerField(default=0)
+    delivered_month = models.DateField(null=True, blank=True)
+    lead_days = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["order_month"], name="po_fact_order_month_idx"),
+            models.Index(fields=["delivered_month"], name="po_fact_delivered_month_idx"),
+        ]
+
+    def __str__(self):
+        return f"PO-{self.purchase_order_id} fact"
+
+
+# Orders and units per supplier per order month
+class SupplierMonthlySpend(models.Model):
+    supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE)
+    month = models.DateField()
+    orders = models.IntegerField(default=0)
+    units = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["supplier", "month"], name="unique_supplier_month"),
+        ]
+
+    def __str__(self):
+        return f"{self.supplier_id} {self.month:%Y-%m}"
+
+
+# Delivered orders and their lead times per delivery month
+class LeadTimeMonthly(models.Model):
+    month = models.DateField(unique=True)
+    delivered = models.IntegerField(default=0)
+    total_lead_days = models.BigIntegerField(default=0)
+    max_lead_days = models.IntegerField(default=0)
+
+    @property
+    def average_lead_days(self):
+        return self.total_lead_days / self.delivered if self.delivered else None
+
+    def __str__(self):
+        return f"{self.month:%Y-%m}"
+
+
+# Job Model
+# Background work (imports, exports, report refreshes) queued by web requests
+# and run by the run_jobs worker (see jobs.py).
+class Job(models.Model):
+    KIND_CHOICES = [
+        ('import', 'CSV import'),
+        ('export', 'Export'),
+        ('materialize_reports', 'Report refresh'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
+    input_file = models.FileField(upload_to="jobs/input/", blank=True)
+    result_file = models.FileField(upload_to="jobs/results/", blank=True)
+    # Summary of the outcome, e.g. an import's counts and row errors
+    result = models.JSONField(default=dict, blank=True)
+    progress = models.PositiveBigIntegerField(default=0)
+    total = models.PositiveBigIntegerField(null=True, blank=True)
+    message = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Touched on every progress report; a running job that goes quiet is requeued
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # The worker claims the oldest queued jobs
+            models.Index(fields=["status", "created_at"], name="job_status_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    @property
+    def percent(self):
+        if self.status == "done":
+            return 100
+        if not self.total:
+            return None
+        return min(100, int(self.progress * 100 / self.total))
@@ -0,0 +1,158 @@
+"""
+Keyset (cursor) pagination shared by the list views.
+
+Instead of ``OFFSET``, every page is fetched with a ``WHERE`` clause that
+starts right after the last row of the previous page, plus a ``LIMIT``.
+The cost of a page is therefore the same on page 1 and on page 10,000.
+
+The ordering must be unique and made of non-null columns, so always end
+it with the primary key, e.g. ``("-order_date", "-id")``.
+"""
+import base64
+import binascii
+import datetime
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # Keep microseconds (DjangoJSONEncoder cuts them to milliseconds), or a
+        # cursor on a timestamp column would sort before its own row
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token can't be decoded for this ordering."""
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor, previous_cursor, page_size):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.page_size = page_size
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class CursorPaginator:
+    def __init__(self, queryset, ordering, page_size=None):
+        self.queryset = queryset
+        # Split "-order_date" into ("order_date", True)
+        self.ordering = [(f.lstrip("-"), f.startswith("-")) for f in ordering]
+        self.page_size = page_size or settings.PAGINATION_PAGE_SIZE
+
+    def page(self, cursor=None):
+        if not cursor:
+            rows = list(self._ordered(reverse=False)[:self.page_size + 1])
+            return self._forward_page(rows, has_previous=False)
+
+        values, backwards = self.decode(cursor)
+        if not backwards:
+            qs = self._ordered(reverse=False).filter(self._seek(values, reverse=False))
+            rows = list(qs[:self.page_size + 1])
+            return self._forward_page(rows, has_previous=True)
+
+        # Walk backwards from the cursor, then flip the rows back into display order
+        qs = self._ordered(reverse=True).filter(self._seek(values, reverse=True))
+        rows = list(qs[:self.page_size + 1])
+        has_previous = len(rows) > self.page_size
+        rows = rows[:self.page_size][::-1]
+        return CursorPage(
+            rows,
+            next_cursor=self.encode(rows[-1]) if rows else None,
+            previous_cursor=self.encode(rows[0], backwards=True) if rows and has_previous else None,
+            page_size=self.page_size,
+        )
+
+    def _forward_page(self, rows, has_previous):
+        has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        return CursorPage(
+            rows,
+            next_cursor=self.encode(rows[-1]) if rows and has_next else None,
+            previous_cursor=self.encode(rows[0], backwards=True) if rows and has_previous else None,
+            page_size=self.page_size,
+        )
+
+    def _ordered(self, reverse):
+        order_by = []
+        for field, descending in self.ordering:
+            descending = descending != reverse
+            order_by.append(f"-{field}" if descending else field)
+        return self.queryset.order_by(*order_by)
+
+    def _seek(self, values, reverse):
+        # (a, b) after (x, y)  ==>  a > x OR (a = x AND b > y)
+        condition = Q()
+        equal_so_far = Q()
+        for (field, descending), value in zip(self.ordering, values):
+            lookup = "lt" if descending != reverse else "gt"
+            condition |= equal_so_far & Q(**{f"{field}__{lookup}": value})
+            equal_so_far &= Q(**{field: value})
+        return condition
+
+    def _row_values(self, row):
+        if isinstance(row, dict):
+            return [row[field] for field, _ in self.ordering]
+        return [getattr(row, field) for field, _ in self.ordering]
+
+    def encode(self, row, backwards=False):
+        payload = {"v": self._row_values(row)}
+        if backwards:
+            payload["b"] = 1
+        raw = json.dumps(payload, cls=CursorEncoder, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def decode(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            payload = json.loads(raw)
+            values = payload["v"]
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise InvalidCursor("Malformed cursor.")
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise InvalidCursor("Cursor does not match this ordering.")
+        try:
+            # Building the filter converts each value with its column's field, without querying
+            self.queryset.filter(self._seek(values, reverse=False))
+        except (ValidationError, ValueError, TypeError):
+            raise InvalidCursor("Cursor values don't fit this ordering.")
+        return values, bool(payload.get("b"))
+
+
+def get_page_size(request):
+    # Allow ?page_size=, but never beyond the configured maximum
+    try:
+        size = int(request.GET.get("page_size", settings.PAGINATION_PAGE_SIZE))
+    except ValueError:
+        size = settings.PAGINATION_PAGE_SIZE
+    return max(1, min(size, settings.PAGINATION_MAX_PAGE_SIZE))
+
+
+def paginate(request, queryset, ordering):
+    paginator = CursorPaginator(queryset, ordering, get_page_size(request))
+    try:
+        return paginator.page(request.GET.get("cursor"))
+    except InvalidCursor:
+        # A stale or hand-edited link just starts over at the first page
+        return paginator.page()
@@ -0,0 +1,83 @@
+"""
+Group membership lookups shared by ``groups_required`` and
+``GroupRequiredMixin``.
+
+A user's group names are loaded with one query and kept on the request, so
+every check during that request is free. With ``GROUP_CACHE_IN_SESSION`` on
+they are also stored in the session, tagged with a membership version kept
+in the cache; adding/removing groups (``m2m_changed``) or renaming/deleting a
+group replaces the version, which makes stale session copies reload. That
+only works if every process sees the new version, so the session copy is
+refused unless the cache is shared (``SHARED_CACHE``, i.e. ``REDIS_URL``).
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+
+SESSION_KEY = "_group_names"
+GLOBAL_VERSION_KEY = "groups:version"
+
+
+def _user_version_key(user_id):
+    return f"groups:version:{user_id}"
+
+
+def _version(key):
+    version = cache.get(key)
+    if version is None:
+        # Unknown (never set or evicted): start a new version so old copies miss
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def membership_version(user_id):
+    return f"{_version(GLOBAL_VERSION_KEY)}:{_version(_user_version_key(user_id))}"
+
+
+def bump_user_version(*user_ids):
+    cache.set_many({_user_version_key(user_id): uuid.uuid4().hex for user_id in user_ids}, None)
+
+
+def bump_global_version():
+    cache.set(GLOBAL_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def get_group_names(request):
+    user = request.user
+    if not user.is_authenticated:
+        return frozenset()
+
+    names = getattr(request, "_group_names", None)
+    if names is not None:
+        return names
+
+    version = None
+    if settings.GROUP_CACHE_IN_SESSION:
+        if not settings.SHARED_CACHE:
+            # A per-process version would let other processes trust a revoked membership
+            raise ImproperlyConfigured("GROUP_CACHE_IN_SESSION requires a shared cache; set REDIS_URL.")
+        version = membership_version(user.pk)
+        stored = request.session.get(SESSION_KEY)
+        if stored and stored["user"] == user.pk and stored["version"] == version:
+            names = frozenset(stored["names"])
+
+    if names is None:
+        names = frozenset(user.groups.values_list("name", flat=True))
+        if version is not None:
+            request.session[SESSION_KEY] = {"user": user.pk, "version": version, "names": sorted(names)}
+
+    request._group_names = names
+    return names
+
+
+def user_in_groups(request, group_names):
+    user = request.user
+    if not user.is_authenticated:
+        return False
+    # Superuser bypasses group checks
+    if user.is_superuser:
+        return True
+    return not get_group_names(request).isdisjoint(group_names)
@@ -0,0 +1,75 @@
+"""
+Per-view query plans.
+
+Each list/detail view declares the relations and columns its template reads,
+and builds its queryset through that plan. With ``STRICT_QUERY_PLANS`` on
+(the tests turn it on), any SQL issued while the template renders raises
+``UnplannedQueryError``, so a template that reaches an unloaded relation or a
+deferred column fails loudly instead of quietly adding N+1 queries.
+"""
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.shortcuts import render
+
+from .instrumentation import timed_render
+
+
+class UnplannedQueryError(AssertionError):
+    """A template touched data its view's query plan did not load."""
+
+
+class QueryPlan:
+    def __init__(self, select_related=(), prefetch_related=(), only=()):
+        self.select_related = tuple(select_related)
+        self.prefetch_related = tuple(prefetch_related)
+        self.only = tuple(only)
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if self.only:
+            queryset = queryset.only(*self.only)
+        return queryset
+
+
+def _forbid_query(execute, sql, params, many, context):
+    raise UnplannedQueryError(f"Query issued while rendering a template: {sql}")
+
+
+@contextmanager
+def strict_rendering():
+    # Render time goes into the request metrics (see instrumentation.py)
+    with timed_render():
+        # Only guard when asked to; production renders without the wrapper
+        if not settings.STRICT_QUERY_PLANS:
+            yield
+            return
+        with connection.execute_wrapper(_forbid_query):
+            yield
+
+
+def render_planned(request, template_name, context=None):
+    # Every queryset in the context must already be evaluated
+    with strict_rendering():
+        return render(request, template_name, context)
+
+
+class QueryPlanMixin:
+    """Apply ``query_plan`` to a generic view and render under the same guard."""
+    query_plan = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.query_plan is not None:
+            queryset = self.query_plan.apply(queryset)
+        return queryset
+
+    def render_to_response(self, context, **response_kwargs):
+        response = super().render_to_response(context, **response_kwargs)
+        with strict_rendering():
+            response.render()
+        return response
@@ -0,0 +1,158 @@
+"""
+Inventory report.
+
+Items are grouped by the day, week or month they were created in and by
+category or location, with ``Trunc`` + ``annotate`` doing the counting and
+summing in a single query, so the report's size depends on the number of
+periods and groups, never on the number of items.
+
+Each period is cached on its own. Periods that ended before today are
+cached for INVENTORY_REPORT_CACHE_TTL (with no timeout when the cache is
+shared between processes); saving or deleting an item drops the cached
+periods it falls in (see signals.py). The current period is always
+computed fresh. Cached rows hold category/location ids only: names are
+read when the report is built, so a rename shows up straight away.
+"""
+import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .models import Category, Inventory, Location
+
+GROUPS = ("day", "week", "month")
+
+# dimension -> (id column, model the id refers to)
+DIMENSIONS = {
+    "category": ("category_id", Category),
+    "location": ("location_id", Location),
+}
+
+# Longest report we'll build (a little over a year of days)
+MAX_PERIODS = 400
+
+VALUE = ExpressionWrapper(F("quantity") * F("unit_price"), output_field=DecimalField(max_digits=24, decimal_places=2))
+
+
+def period_start(day, group):
+    if group == "week":
+        return day - datetime.timedelta(days=day.weekday())
+    if group == "month":
+        return day.replace(day=1)
+    return day
+
+
+def next_period(start, group):
+    if group == "week":
+        return start + datetime.timedelta(days=7)
+    if group == "month":
+        return (start + datetime.timedelta(days=32)).replace(day=1)
+    return start + datetime.timedelta(days=1)
+
+
+def periods(start, end, group):
+    """Starts of every period touching ``start``..``end`` (inclusive dates)."""
+    result = []
+    current = period_start(start, group)
+    while current <= end:
+        result.append(current)
+        current = next_period(current, group)
+    return result
+
+
+def _cache_key(group, dimension, start):
+    return f"inventory_report:{group}:{dimension}:{start.isoformat()}"
+
+
+def _midnight(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def _query(first, last, group, dimension):
+    """{period start: [row, ...]} for the periods ``first``..``last``, in one query."""
+    key_column = DIMENSIONS[dimension][0]
+    rows = (
+        Inventory.objects.filter(
+            created_at__gte=_midnight(first),
+            created_at__lt=_midnight(next_period(last, group)),
+        )
+        .annotate(period=Trunc("created_at", group))
+        .values("period", key_column)
+        .annotate(items=Count("id"), total_quantity=Sum("quantity"), total_value=Sum(VALUE))
+        .order_by("period", key_column)
+    )
+    by_period = {}
+    for row in rows:
+        by_period.setdefault(timezone.localtime(row["period"]).date(), []).append({
+            "key": row[key_column],
+            "items": row["items"],
+            "quantity": row["total_quantity"],
+            "value": row["total_value"],
+        })
+    return by_period
+
+
+def _named(results, dimension):
+    """``results`` with each row's current category/location name, rows sorted by name, in one query."""
+    keys = {row["key"] for rows in results.values() for row in rows}
+    names = dict(DIMENSIONS[dimension][1].objects.filter(pk__in=keys).values_list("id", "name")) if keys else {}
+    return {
+        p: sorted(({**row, "name": names.get(row["key"], "")} for row in rows), key=lambda row: (row["name"], row["key"]))
+        for p, rows in results.items()
+    }
+
+
+def inventory_report(start, end, group="day", dimension="category"):
+    """Report rows for items created ``start``..``end`` (inclusive dates).
+
+    The range is widened to whole periods. Returns a list of
+    ``{"start", "end", "rows", "total"}`` for every period; rows and the
+    total hold ``items``, ``quantity`` and ``value`` (rows also ``key``
+    and ``name``).
+    """
+    starts = periods(start, end, group)
+    today = timezone.localdate()
+    closed = [p for p in starts if next_period(p, group) <= today]
+
+    cached = cache.get_many([_cache_key(group, dimension, p) for p in closed])
+    results = {p: cached[_cache_key(group, dimension, p)] for p in closed if _cache_key(group, dimension, p) in cached}
+
+    missing = [p for p in starts if p not in results]
+    if missing:
+        fresh = _query(missing[0], missing[-1], group, dimension)
+        for p in missing:
+            results[p] = fresh.get(p, [])
+        cache.set_many(
+            {_cache_key(group, dimension, p): results[p] for p in missing if p in closed},
+            settings.INVENTORY_REPORT_CACHE_TTL,
+        )
+    results = _named(results, dimension)
+
+    return [
+        {
+            "start": p,
+            "end": next_period(p, group) - datetime.timedelta(days=1),
+            "rows": results[p],
+            "total": {
+                "items": sum(row["items"] for row in results[p]),
+                "quantity": sum(row["quantity"] for row in results[p]),
+                "value": sum((row["value"] for row in results[p]), Decimal("0.00")),
+            },
+        }
+        for p in starts
+    ]
+
+
+def invalidate_inventory_report(*created_at):
+    """Drop the cached periods that items created at these times fall in."""
+    keys = []
+    for moment in created_at:
+        day = timezone.localtime(moment).date()
+        for group in GROUPS:
+            for dimension in DIMENSIONS:
+                keys.append(_cache_key(group, dimension, period_start(day, group)))
+    cache.delete_many(keys)
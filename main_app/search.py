@@ -0,0 +1,180 @@
+"""
+Search.
+
+Supplier search (``search_suppliers``): on PostgreSQL the query matches
+against expression GIN indexes created in migration 0010, a
+``to_tsvector('simple', ...)`` index for word/prefix matches and a
+``pg_trgm`` index for substring matches (``ILIKE '%q%'``), both over name,
+contact person and email. Results are ranked by ``ts_rank`` plus trigram
+similarity, rounded to a ``numeric`` so a pagination cursor carries the
+exact value the next page compares against (a float4 rank read back from
+JSON as a double can miss or repeat the boundary row). Other databases (SQLite in local development and tests) fall
+back to ``icontains`` with a simple "name starts with / name contains" rank.
+
+Global search (``search_everything``): every asset, inventory item,
+purchase order, supplier, category and location has one ``SearchEntry``
+row with lowercased ``search_text``, kept current by signals and rebuilt
+in bulk by ``rebuild_search_index``. One query against that table (trigram
+indexed on PostgreSQL) returns the top mixed results.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import BooleanField, Case, DecimalField, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from .models import Asset, Category, Inventory, Location, PurchaseOrder, SearchEntry, Supplier
+
+# Decimal places kept of the Postgres rank
+RANK_PLACES = 6
+
+# Must stay identical to the indexed expression in migration 0010
+SUPPLIER_DOCUMENT = "({table}.name || ' ' || {table}.contact_person || ' ' || {table}.email)"
+
+
+def _prefix_tsquery(query):
+    # "acme jan" -> "acme:* & jan:*" (every word, as a prefix)
+    words = re.findall(r"\w+", query.lower())
+    return " & ".join(f"{word}:*" for word in words)
+
+
+def _escape_like(query):
+    return query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _postgres_search(queryset, query):
+    document = SUPPLIER_DOCUMENT.format(table=connection.ops.quote_name(Supplier._meta.db_table))
+    vector = f"to_tsvector('simple', {document})"
+    like = f"%{_escape_like(query)}%"
+    tsquery = _prefix_tsquery(query)
+
+    if tsquery:
+        match_sql = f"({vector} @@ to_tsquery('simple', %s) OR {document} ILIKE %s)"
+        match_params = (tsquery, like)
+        rank_sql = f"ts_rank({vector}, to_tsquery('simple', %s)) + similarity({document}, %s)"
+        rank_params = (tsquery, query)
+    else:
+        match_sql = f"{document} ILIKE %s"
+        match_params = (like,)
+        rank_sql = f"similarity({document}, %s)"
+        rank_params = (query,)
+
+    rank_sql = f"round(({rank_sql})::numeric, {RANK_PLACES})"
+    return queryset.filter(RawSQL(match_sql, match_params, output_field=BooleanField())).annotate(
+        rank=RawSQL(rank_sql, rank_params, output_field=DecimalField(max_digits=12, decimal_places=RANK_PLACES))
+    )
+
+
+def _fallback_search(queryset, query):
+    match = Q(name__icontains=query) | Q(contact_person__icontains=query) | Q(email__icontains=query)
+    rank = Case(
+        When(name__istartswith=query, then=Value(3)),
+        When(name__icontains=query, then=Value(2)),
+        default=Value(1),
+        output_field=IntegerField(),
+    )
+    return queryset.filter(match).annotate(rank=rank)
+
+
+def search_suppliers(query, queryset=None):
+    """Suppliers matching ``query``, annotated with ``rank`` (higher is better).
+
+    Order by ``("-rank", "id")`` for best matches first.
+    """
+    if queryset is None:
+        queryset = Supplier.objects.all()
+    query = query.strip()
+    if connection.vendor == "postgresql":
+        return _postgres_search(queryset, query)
+    return _fallback_search(queryset, query)
+
+
+# Global search index
+
+# model -> (kind, columns needed to describe it, describe(obj) -> (title, subtitle))
+INDEXED_MODELS = {
+    Asset: ("asset", ("name", "serial_number"), lambda o: (o.name, f"Asset · SN {o.serial_number}")),
+    Inventory: ("inventory", ("name",), lambda o: (o.name, "Inventory")),
+    PurchaseOrder: ("purchase_order", ("name",), lambda o: (f"PO-{o.pk}", o.name)),
+    Supplier: ("supplier", ("name", "contact_person", "email"), lambda o: (o.name, f"Supplier · {o.contact_person} · {o.email}")),
+    Category: ("category", ("name",), lambda o: (o.name, "Category")),
+    Location: ("location", ("name",), lambda o: (o.name, "Location")),
+}
+
+# kind -> detail URL name
+DETAIL_ROUTES = {
+    "asset": "asset_detail",
+    "inventory": "inventory_detail",
+    "purchase_order": "purchase_order_detail",
+    "supplier": "supplier_detail",
+    "category": "category_detail",
+    "location": "location_detail",
+}
+
+ENTRY_TEXT_LENGTH = SearchEntry._meta.get_field("title").max_length
+
+
+def _entries(model, objs):
+    kind, _, describe = INDEXED_MODELS[model]
+    for obj in objs:
+        title, subtitle = describe(obj)
+        yield SearchEntry(
+            kind=kind,
+            object_id=obj.pk,
+            title=title[:ENTRY_TEXT_LENGTH],
+            subtitle=subtitle[:ENTRY_TEXT_LENGTH],
+            search_text=f"{title} {subtitle}".lower(),
+        )
+
+
+def index_objects(model, objs):
+    """Insert or refresh the search entries for ``objs`` in one statement."""
+    SearchEntry.objects.bulk_create(
+        list(_entries(model, objs)),
+        update_conflicts=True,
+        unique_fields=["kind", "object_id"],
+        update_fields=["title", "subtitle", "search_text", "updated_at"],
+    )
+
+
+def remove_objects(model, pks):
+    kind = INDEXED_MODELS[model][0]
+    SearchEntry.objects.filter(kind=kind, object_id__in=list(pks)).delete()
+
+
+def rebuild_search_index(batch_size=2000):
+    """Rebuild every entry from the source tables; returns the number indexed."""
+    total = 0
+    with transaction.atomic():
+        SearchEntry.objects.all().delete()
+        for model, (_, fields, _) in INDEXED_MODELS.items():
+            batch = []
+            for obj in model.objects.only(*fields).order_by("pk").iterator(chunk_size=batch_size):
+                batch.append(obj)
+                if len(batch) == batch_size:
+                    SearchEntry.objects.bulk_create(_entries(model, batch))
+                    total += len(batch)
+                    batch = []
+            SearchEntry.objects.bulk_create(_entries(model, batch))
+            total += len(batch)
+    return total
+
+
+def search_everything(query, limit=20):
+    """Top ``limit`` entries containing ``query``: exact title, then title prefix, then the rest."""
+    query = query.strip().lower()
+    if not query:
+        return []
+    rank = Case(
+        When(title__iexact=query, then=Value(3)),
+        When(title__istartswith=query, then=Value(2)),
+        default=Value(1),
+        output_field=IntegerField(),
+    )
+    entries = (
+        SearchEntry.objects.filter(search_text__contains=query)
+        .annotate(rank=rank)
+        .order_by("-rank", "title", "id")
+        .values("kind", "object_id", "title", "subtitle")
+    )
+    return list(entries[:limit])
@@ -0,0 +1,189 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .counters import COUNTED_FIELDS, apply_changes
+from .fragments import bump_generations
+from .instrumentation import record_query
+from .kpis import invalidate_dashboard_kpis
+from .models import Asset, Category, Inventory, Location, PurchaseOrder, Supplier, Tombstone
+from .permissions import bump_global_version, bump_user_version
+from .reports import invalidate_inventory_report
+from .search import index_objects, remove_objects
+from .sync import tombstone_name
+
+
+# Dashboard KPIs count these models, so any write makes the cached copy stale.
+# Clear it after commit so a concurrent request can't re-cache the old counts.
+@receiver(post_save, sender=Asset)
+@receiver(post_save, sender=Supplier)
+@receiver(post_save, sender=PurchaseOrder)
+@receiver(post_delete, sender=Asset)
+@receiver(post_delete, sender=Supplier)
+@receiver(post_delete, sender=PurchaseOrder)
+def clear_dashboard_kpis(sender, **kwargs):
+    transaction.on_commit(invalidate_dashboard_kpis)
+
+
+# Stat counters
+def _writes_counted_field(fields, update_fields):
+    if update_fields is None:
+        return True
+    names = set(update_fields)
+    return any(f in names or f.removesuffix("_id") in names for f in fields)
+
+
+def _stored_values(sender, instance, fields, lock=False):
+    qs = sender._base_manager.filter(pk=instance.pk)
+    if lock:
+        # Serialize concurrent writes to this row so each sees the other's result
+        qs = qs.select_for_update()
+    return qs.values(*fields).first()
+
+
+@receiver(pre_save, sender=Asset)
+@receiver(pre_save, sender=Inventory)
+@receiver(pre_save, sender=PurchaseOrder)
+def remember_counted_values(sender, instance, update_fields=None, **kwargs):
+    fields = COUNTED_FIELDS[sender]
+    instance._counted_before = None
+    if instance._state.adding or not _writes_counted_field(fields, update_fields):
+        return
+    instance._counted_before = _stored_values(sender, instance, fields, lock=True)
+
+
+@receiver(post_save, sender=Asset)
+@receiver(post_save, sender=Inventory)
+@receiver(post_save, sender=PurchaseOrder)
+@receiver(post_save, sender=Supplier)
+def update_counters_on_save(sender, instance, created, update_fields=None, **kwargs):
+    fields = COUNTED_FIELDS[sender]
+    before = getattr(instance, "_counted_before", None)
+    if not created and before is None:
+        return
+
+    # Deferred fields and fields left out of update_fields weren't written
+    deferred = instance.get_deferred_fields()
+    after = {}
+    for field in fields:
+        unchanged = field in deferred or not _writes_counted_field([field], update_fields)
+        after[field] = before[field] if unchanged and before else getattr(instance, field)
+
+    apply_changes(sender, removed=[before] if before else [], added=[after])
+
+
+@receiver(pre_delete, sender=Asset)
+@receiver(pre_delete, sender=Inventory)
+@receiver(pre_delete, sender=PurchaseOrder)
+@receiver(pre_delete, sender=Supplier)
+def remember_deleted_values(sender, instance, **kwargs):
+    fields = COUNTED_FIELDS[sender]
+    if set(fields) & instance.get_deferred_fields():
+        instance._counted_before = _stored_values(sender, instance, fields)
+    else:
+        instance._counted_before = {field: getattr(instance, field) for field in fields}
+
+
+@receiver(post_delete, sender=Asset)
+@receiver(post_delete, sender=Inventory)
+@receiver(post_delete, sender=PurchaseOrder)
+@receiver(post_delete, sender=Supplier)
+def update_counters_on_delete(sender, instance, **kwargs):
+    before = getattr(instance, "_counted_before", None)
+    if before is not None:
+        apply_changes(sender, removed=[before])
+
+
+# Inventory report: closed periods are cached forever, so drop the period an item falls in
+@receiver(post_save, sender=Inventory)
+@receiver(post_delete, sender=Inventory)
+def clear_inventory_report(sender, instance, **kwargs):
+    created_at = instance.created_at
+    transaction.on_commit(lambda: invalidate_inventory_report(created_at))
+
+
+# Group membership cache (see permissions.py)
+@receiver(m2m_changed, sender=get_user_model().groups.through)
+def group_membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        # user.groups.add(...) / remove / clear
+        transaction.on_commit(lambda: bump_user_version(instance.pk))
+    elif pk_set:
+        # group.user_set.add(...) / remove
+        user_ids = set(pk_set)
+        transaction.on_commit(lambda: bump_user_version(*user_ids))
+    else:
+        # group.user_set.clear() doesn't say which users were affected
+        transaction.on_commit(bump_global_version)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, **kwargs):
+    transaction.on_commit(bump_global_version)
+
+
+# Global search index (see search.py)
+@receiver(post_save, sender=Asset)
+@receiver(post_save, sender=Inventory)
+@receiver(post_save, sender=PurchaseOrder)
+@receiver(post_save, sender=Supplier)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Location)
+def update_search_entry(sender, instance, **kwargs):
+    index_objects(sender, [instance])
+
+
+@receiver(post_delete, sender=Asset)
+@receiver(post_delete, sender=Inventory)
+@receiver(post_delete, sender=PurchaseOrder)
+@receiver(post_delete, sender=Supplier)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Location)
+def remove_search_entry(sender, instance, **kwargs):
+    remove_objects(sender, [instance.pk])
+
+
+# Delta sync: record deletes so sync clients can drop the row (see sync.py)
+@receiver(post_delete, sender=Asset)
+@receiver(post_delete, sender=Inventory)
+@receiver(post_delete, sender=PurchaseOrder)
+@receiver(post_delete, sender=Supplier)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Location)
+def record_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(model=tombstone_name(sender), object_id=instance.pk)
+
+
+# Cached tables and rows (see fragments.py)
+@receiver(post_save, sender=Asset)
+@receiver(post_save, sender=Inventory)
+@receiver(post_save, sender=PurchaseOrder)
+@receiver(post_save, sender=Supplier)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Location)
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=Asset)
+@receiver(post_delete, sender=Inventory)
+@receiver(post_delete, sender=PurchaseOrder)
+@receiver(post_delete, sender=Supplier)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Location)
+@receiver(post_delete, sender=get_user_model())
+def clear_fragments(sender, update_fields=None, **kwargs):
+    # Logging in saves last_login, which no table shows
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    transaction.on_commit(lambda: bump_generations(sender))
+
+
+# Request metrics: count every connection's queries (see instrumentation.py)
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
@@ -0,0 +1,253 @@
+"""
+Stock ledger.
+
+Every change to an inventory item's or asset's quantity is recorded as a
+``StockMovement`` (a receipt, issue, transfer between locations or
+adjustment) in the same transaction as the change. Movements are only ever
+added, so the ledger is the item's audit trail.
+
+Quantities are changed with one conditional ``UPDATE ... SET quantity =
+quantity + <delta> WHERE quantity >= <units taken>``. The row lock it takes
+makes concurrent movements, from any request or worker, queue up and add
+up instead of overwriting each other, and stock can't go below zero. Paths
+that must read the quantity before deciding (an adjustment to a counted
+quantity, a transfer between two items) lock the rows with
+``select_for_update`` first.
+
+The add/edit forms are saved with ``save_stock_form``. A new item's
+quantity is its opening receipt. An edit applies the difference between
+the quantity submitted and the one the form showed, so two people editing
+the same item both keep their change.
+
+``snapshot_stock`` (the ``snapshot_stock`` command; schedule it nightly)
+stores the quantity at the end of the last closed day for each item that
+moved since the previous snapshot. ``quantity_on`` then reads one snapshot
+plus the movements after it, never the whole ledger.
+
+Movements bypass ``save()``, so they stamp ``updated_at`` (which the low
+stock evaluator watches) and update the stat counters, cached tables and
+inventory report themselves.
+"""
+import datetime
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from .analytics import WATERMARK_OVERLAP
+from .counters import COUNTED_FIELDS, apply_changes
+from .fragments import bump_generations
+from .models import Inventory, StockMovement, StockSnapshot, Watermark
+from .reports import invalidate_inventory_report
+
+SNAPSHOT_WATERMARK = "stock:snapshots"
+
+
+class InsufficientStock(ValueError):
+    pass
+
+
+def _name(model):
+    return model._meta.model_name
+
+
+def _day_end(day):
+    return timezone.make_aware(datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time.min))
+
+
+def _stock_changed(model, created_at=()):
+    transaction.on_commit(lambda: bump_generations(model))
+    if model is Inventory and created_at:
+        transaction.on_commit(lambda: invalidate_inventory_report(*created_at))
+
+
+def move(obj, delta, kind, user=None, note="", other_location_id=None):
+    """Change ``obj``'s quantity by ``delta`` and record the movement.
+
+    Raises ``InsufficientStock``, changing nothing, if that would take the
+    quantity below zero. Sets ``obj.quantity`` to the new quantity and
+    returns the ``StockMovement`` (None when ``delta`` is 0).
+    """
+    if not delta:
+        return None
+    model = type(obj)
+    with transaction.atomic():
+        # Checks and writes in one statement; the row stays locked until commit
+        changed = model.objects.filter(pk=obj.pk, quantity__gte=max(0, -delta)).update(
+            quantity=F("quantity") + delta, updated_at=timezone.now(),
+        )
+        if not changed:
+            on_hand = model.objects.values_list("quantity", flat=True).get(pk=obj.pk)
+            raise InsufficientStock(f"Only {on_hand} on hand; can't take {-delta}.")
+
+        row = model.objects.values("created_at", *COUNTED_FIELDS[model]).get(pk=obj.pk)
+        after = {field: row[field] for field in COUNTED_FIELDS[model]}
+        apply_changes(model, removed=[{**after, "quantity": after["quantity"] - delta}], added=[after])
+        movement = StockMovement.objects.create(
+            model=_name(model), object_id=obj.pk, kind=kind, delta=delta, quantity=after["quantity"],
+            location_id=after["location_id"], other_location_id=other_location_id, note=note, user=user,
+            # Stamped once the row is locked, so an item's movements are in the order they applied
+            created_at=timezone.now(),
+        )
+        _stock_changed(model, [row["created_at"]])
+    obj.quantity = after["quantity"]
+    return movement
+
+
+def adjust(obj, counted, user=None, note=""):
+    """Set ``obj``'s quantity to ``counted`` (e.g. after a stock take), recording the difference."""
+    with transaction.atomic():
+        on_hand = type(obj).objects.select_for_update().values_list("quantity", flat=True).get(pk=obj.pk)
+        return move(obj, counted - on_hand, "adjustment", user, note)
+
+
+def transfer(item, location, quantity, user=None, note=""):
+    """Move ``quantity`` units of an inventory item to the same item at ``location``.
+
+    The item there (same name and category) is created when missing.
+    Returns it.
+    """
+    if location.pk == item.location_id:
+        raise ValueError(f"{item.name} is already at {location.name}.")
+    with transaction.atomic():
+        target = (
+            Inventory.objects.filter(name=item.name, category_id=item.category_id, location=location)
+            .order_by("id").first()
+        )
+        if target is None:
+            target = Inventory.objects.create(
+                name=item.name, category_id=item.category_id, location=location, quantity=0,
+                unit_price=item.unit_price, owner=user,
+            )
+        # Lock both rows in id order, so opposite transfers between two items can't deadlock
+        list(Inventory.objects.select_for_update().filter(pk__in=[item.pk, target.pk]).order_by("id").values_list("id"))
+        move(item, -quantity, "transfer", user, note, other_location_id=location.pk)
+        move(target, quantity, "transfer", user, note, other_location_id=item.location_id)
+    return target
+
+
+def record_movement(obj, kind, quantity, user=None, note="", location=None):
+    """Record one movement as entered on the stock page.
+
+    ``quantity`` is the units received, issued or transferred, or the
+    counted quantity for an adjustment; ``location`` is a transfer's
+    destination.
+    """
+    if kind == "receipt":
+        return move(obj, quantity, kind, user, note)
+    if kind == "issue":
+        return move(obj, -quantity, kind, user, note)
+    if kind == "adjustment":
+        return adjust(obj, quantity, user, note)
+    if kind == "transfer":
+        return transfer(obj, location, quantity, user, note)
+    raise ValueError(f"Unknown movement {kind!r}.")
+
+
+def record_movements(model, kind, changes, user=None, note=""):
+    """Record movements for quantities a bulk write has already changed.
+
+    ``changes`` are ``(obj, delta)`` pairs, where ``obj.quantity`` is the
+    new quantity.
+    """
+    now = timezone.now()
+    StockMovement.objects.bulk_create(
+        StockMovement(
+            model=_name(model), object_id=obj.pk, kind=kind, delta=delta, quantity=obj.quantity,
+            location_id=obj.location_id, note=note, user=user, created_at=now,
+        )
+        for obj, delta in changes
+        if delta
+    )
+
+
+def save_stock_form(form, user=None):
+    """Save a valid ``InventoryForm``/``AssetForm``, recording its quantity change.
+
+    Raises ``InsufficientStock``, saving nothing, if other changes since the
+    form was shown leave too little stock to apply this one.
+    """
+    adding = form.instance._state.adding
+    with transaction.atomic():
+        if adding:
+            obj = form.save()
+            record_movements(type(obj), "receipt", [(obj, obj.quantity)], user, "New item")
+            return obj
+
+        seen = form.cleaned_data.get("quantity_seen")
+        if seen is None:
+            seen = form.initial["quantity"]
+        delta = form.cleaned_data["quantity"] - seen
+        obj = form.save(commit=False)
+        # Everything but the quantity, which changes by the edit's difference instead
+        obj.save(update_fields=[name for name in form._meta.fields if name != "quantity"] + ["updated_at"])
+        form.save_m2m()
+        if move(obj, delta, "adjustment", user, "Edited") is None:
+            obj.refresh_from_db(fields=["quantity"])
+    return obj
+
+
+def record_opening_balances(model, pks, batch_size=2000):
+    """Record the quantity of bulk-created rows as their opening receipt."""
+    for start in range(0, len(pks), batch_size):
+        objs = model.objects.filter(pk__in=pks[start:start + batch_size]).only("quantity", "location")
+        record_movements(model, "receipt", [(obj, obj.quantity) for obj in objs], note="New item")
+
+
+def snapshot_stock(day=None, batch_size=2000):
+    """Store the quantity at the end of ``day`` of every item that moved since the last snapshot.
+
+    ``day`` defaults to the last day that ended at least WATERMARK_OVERLAP
+    ago, so movements stamped before midnight have committed; a later day is
+    refused. Returns the number of snapshots written.
+    """
+    if day is None:
+        day = timezone.localdate(timezone.now() - WATERMARK_OVERLAP) - datetime.timedelta(days=1)
+    end = _day_end(day)
+    if end > timezone.now() - WATERMARK_OVERLAP:
+        raise ValueError(f"{day} hasn't ended yet.")
+    written = 0
+    with transaction.atomic():
+        # The row lock keeps two runs from interleaving
+        watermark, _ = Watermark.objects.select_for_update().get_or_create(name=SNAPSHOT_WATERMARK)
+        if watermark.value and watermark.value >= end:
+            return 0
+
+        moved = StockMovement.objects.filter(created_at__lt=end)
+        if watermark.value:
+            moved = moved.filter(created_at__gte=watermark.value)
+        previous = StockSnapshot.objects.filter(
+            model=OuterRef("model"), object_id=OuterRef("object_id"),
+        ).order_by("-date").values("quantity")[:1]
+        rows = moved.order_by().values("model", "object_id").annotate(delta=Sum("delta"), previous=Subquery(previous))
+
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(StockSnapshot(
+                model=row["model"], object_id=row["object_id"], date=day,
+                quantity=(row["previous"] or 0) + row["delta"],
+            ))
+            if len(batch) == batch_size:
+                written += len(StockSnapshot.objects.bulk_create(batch))
+                batch = []
+        if batch:
+            written += len(StockSnapshot.objects.bulk_create(batch))
+
+        watermark.value = end
+        watermark.save()
+    return written
+
+
+def quantity_on(obj, day):
+    """``obj``'s quantity at the end of ``day``: its latest snapshot by then plus the movements after it."""
+    name = _name(type(obj))
+    snapshot = (
+        StockSnapshot.objects.filter(model=name, object_id=obj.pk, date__lte=day)
+        .order_by("-date").values_list("date", "quantity").first()
+    )
+    moved = StockMovement.objects.filter(model=name, object_id=obj.pk, created_at__lt=_day_end(day))
+    quantity = 0
+    if snapshot:
+        snapshot_date, quantity = snapshot
+        moved = moved.filter(created_at__gte=_day_end(snapshot_date))
+    return quantity + (moved.aggregate(total=Sum("delta"))["total"] or 0)
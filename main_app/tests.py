@@ -1,3 +1,1870 @@
-from django.test import TestCase
+import base64
+import csv
+import datetime
+import io
+import itertools
+import json
+import logging
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
+from importlib import import_module
+from unittest import mock
+from decimal import Decimal
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import HttpResponse
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Sum
+from django.template import engines
+from django.template.loaders.app_directories import Loader as AppDirectoriesLoader
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .alerts import LOW_STOCK_WATERMARK, evaluate_low_stock, low_stock_items
+from .analytics import (
+    REPORTS_LEASE, RefreshRunning, category_distribution, lead_time_trend, materialize_reports, supplier_spend,
+)
+from .benchmarks import BENCH_ROUTES, SCALE_UNIT, InProcessTransport, compare_results, run_routes, seed_bench_data
+from .concurrency import gather_queries
+from .counters import compute_counters, diff_counters, rebuild_counters
+from .exports import iter_csv
+from . import fragments
+from .imports import ASSET_IMPORT_LOCK, InventoryImporter, import_csv
+from .instrumentation import RequestMetricsMiddleware, histogram
+from .jobs import claim_jobs, enqueue, run_job, work
+from .kpis import get_dashboard_kpis
+from .pagination import CursorPaginator, InvalidCursor, paginate
+from .reports import inventory_report
+from .models import (
+    Asset, Category, Inventory, Job, Location, PurchaseOrder, PurchaseOrderFact, SearchEntry, StockAlert,
+    StatCounter, StockMovement, StockSnapshot, Supplier, Tombstone, Watermark,
+)
+from .search import rebuild_search_index, search_everything, search_suppliers
+from .stock import InsufficientStock, move, quantity_on, snapshot_stock, transfer
+from .transitions import transition_orders
+from .urls import urlpatterns
+from .views import INVENTORY_LIST_PLAN, INVENTORY_TABLE, LOW_STOCK_PLAN
+from .warmup import template_names, warm_templates
+
+User = get_user_model()
+
+
+def setUpModule():
+    # Keep the per-request log lines out of the test output (assertLogs still sees them)
+    logging.getLogger("main_app.requests").setLevel(logging.WARNING)
+
+
+def make_catalog(owner=None):
+    category = Category.objects.create(name="Laptops", owner=owner)
+    location = Location.objects.create(name="Warehouse A", owner=owner)
+    supplier = Supplier.objects.create(
+        name="Acme", contact_person="Jane", phone_number="555-0100",
+        email="jane@acme.test", address="1 Main St", owner=owner,
+    )
+    return category, location, supplier
+
+
+@override_settings(STRICT_QUERY_PLANS=True)
+class QueryPlanTests(TestCase):
+    """Templates must only read what their view's query plan loaded."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@test.io", "pw")
+        category, location, supplier = make_catalog(owner=cls.user)
+        cls.asset = Asset.objects.create(
+            name="MacBook", category=category, location=location, quantity=1,
+            serial_number="SN-1", purchase_date=datetime.date(2025, 1, 1),
+            status="available", owner=cls.user,
+        )
+        cls.inventory = Inventory.objects.create(
+            name="Cables", category=category, location=location, quantity=3,
+            unit_price=Decimal("9.99"), owner=cls.user,
+        )
+        cls.order = PurchaseOrder.objects.create(
+            name="Restock", supplier=supplier, order_date=datetime.date(2025, 1, 2),
+            status="pending", owner=cls.user,
+        )
+        cls.category, cls.location, cls.supplier = category, location, supplier
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_views_render_without_unplanned_queries(self):
+        urls = [
+            reverse("dashboard"),
+            reverse("purchase_order_list"),
+            reverse("purchase_order_detail", args=[self.order.pk]),
+            reverse("asset_index"),
+            reverse("asset_detail", args=[self.asset.pk]),
+            reverse("inventory_list"),
+            reverse("inventory_detail", args=[self.inventory.pk]),
+            reverse("category_list"),
+            reverse("category_detail", args=[self.category.pk]),
+            reverse("location_list"),
+            reverse("location_detail", args=[self.location.pk]),
+            reverse("supplier_list"),
+            reverse("supplier_detail", args=[self.supplier.pk]),
+            reverse("reports"),
+        ]
+        materialize_reports()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+
+def cursor_token(values):
+    # A well-formed cursor holding arbitrary values
+    return base64.urlsafe_b64encode(json.dumps({"v": values}).encode()).decode().rstrip("=")
+
+
+class PaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        _, _, supplier = make_catalog()
+        # Several orders share each date and status, so the leading columns tie
+        for i in range(11):
+            PurchaseOrder.objects.create(
+                name=f"PO {i % 4}", supplier=supplier, order_date=datetime.date(2025, 1, 1 + i % 3),
+                status=("pending", "delivered")[i % 2],
+            )
+
+    def walk(self, ordering, page_size=3):
+        """Every page, forward from the first, then backward from the last."""
+        paginator = CursorPaginator(PurchaseOrder.objects.all(), ordering, page_size)
+        forward = [paginator.page()]
+        while forward[-1].has_next:
+            forward.append(paginator.page(forward[-1].next_cursor))
+        backward = [forward[-1]]
+        while backward[-1].has_previous:
+            backward.append(paginator.page(backward[-1].previous_cursor))
+        return forward, backward[::-1]
+
+    def test_cursors_walk_every_row_once_in_both_directions(self):
+        for ordering in (("-order_date", "-id"), ("status", "-order_date", "name", "id"), ("id",)):
+            with self.subTest(ordering=ordering):
+                expected = [order.pk for order in PurchaseOrder.objects.order_by(*ordering)]
+                forward, backward = self.walk(ordering)
+                self.assertEqual([order.pk for page in forward for order in page], expected)
+                self.assertEqual([[o.pk for o in page] for page in backward], [[o.pk for o in page] for page in forward])
+                self.assertEqual([len(page) for page in forward], [3, 3, 3, 2])
+
+    def test_first_last_and_empty_pages(self):
+        forward, _ = self.walk(("-order_date", "-id"))
+        self.assertEqual((forward[0].has_previous, forward[0].has_next), (False, True))
+        self.assertEqual((forward[-1].has_previous, forward[-1].has_next), (True, False))
+
+        page = CursorPaginator(PurchaseOrder.objects.none(), ("id",), 3).page()
+        self.assertEqual((list(page), page.next_cursor, page.previous_cursor), ([], None, None))
+
+    def test_invalid_cursors_start_over_at_the_first_page(self):
+        paginator = CursorPaginator(PurchaseOrder.objects.all(), ("-order_date", "-id"), 3)
+        other = CursorPaginator(PurchaseOrder.objects.all(), ("id",), 3)
+        first = [order.pk for order in paginator.page()]
+        wrong_types = [cursor_token(["nope", 1]), cursor_token(["2025-01-01", "abc"]), cursor_token([None, 1]), cursor_token([[1], 1])]
+        for cursor in ("not a cursor", "e30", other.page().next_cursor, paginator.page().next_cursor[:-3], *wrong_types):
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(InvalidCursor):
+                    paginator.page(cursor)
+                request = RequestFactory().get("/", {"cursor": cursor, "page_size": 3})
+                self.assertEqual([order.pk for order in paginate(request, PurchaseOrder.objects.all(), ("-order_date", "-id"))], first)
+
+    def test_cursors_holding_the_wrong_types_are_rejected(self):
+        user = User.objects.create_superuser("admin", "admin@test.io", "pw")
+        self.client.force_login(user)
+        for url, cursor in (("purchase_order_list", ["nope", 1]), ("inventory_list", ["abc"])):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(reverse(url), {"cursor": cursor_token(cursor)}).status_code, 200)
+
+        response = self.client.get(reverse("api_list", args=["inventory"]), {"cursor": cursor_token(["abc"])})
+        self.assertEqual(response.status_code, 400)
+        token = f"{cursor_token(['yesterday', 1])}.{cursor_token(['2025-01-01T00:00:00', 'x'])}"
+        self.assertEqual(self.client.get(reverse("api_sync", args=["inventory"]), {"since": token}).status_code, 400)
+
+    @override_settings(PAGINATION_PAGE_SIZE=4, PAGINATION_MAX_PAGE_SIZE=6)
+    def test_page_size_is_clamped(self):
+        for page_size, expected in ((None, 4), ("2", 2), ("100", 6), ("0", 1), ("-5", 1), ("lots", 4)):
+            with self.subTest(page_size=page_size):
+                request = RequestFactory().get("/", {"page_size": page_size} if page_size else {})
+                page = paginate(request, PurchaseOrder.objects.all(), ("id",))
+                self.assertEqual((page.page_size, len(page)), (expected, expected))
+
+
+class DashboardKpiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        _, _, self.supplier = make_catalog()
+
+    def make_order(self, status):
+        return PurchaseOrder.objects.create(
+            name="PO", supplier=self.supplier, order_date=datetime.date(2025, 1, 1), status=status,
+        )
+
+    def test_kpis_are_one_query_then_cached(self):
+        self.make_order("pending")
+        self.make_order("delivered")
+        with self.assertNumQueries(1):
+            kpi = get_dashboard_kpis()
+        self.assertEqual((kpi["suppliers"], kpi["pos_open"], kpi["pos_delivered"]), (1, 1, 1))
+        with self.assertNumQueries(0):
+            get_dashboard_kpis()
+
+    def test_writes_invalidate_cached_kpis(self):
+        get_dashboard_kpis()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_order("confirmed")
+        self.assertEqual(get_dashboard_kpis()["pos_open"], 1)
+
+
+class StatCounterTests(TestCase):
+    def assertCountersMatch(self):
+        self.assertEqual(diff_counters(compute_counters()), {})
+
+    def test_counters_follow_saves_and_deletes(self):
+        category, location, supplier = make_catalog()
+        other = Category.objects.create(name="Phones")
+        order = PurchaseOrder.objects.create(
+            name="PO", supplier=supplier, order_date=datetime.date(2025, 1, 1), status="pending",
+        )
+        item = Inventory.objects.create(
+            name="Cables", category=category, location=location, quantity=4, unit_price=Decimal("2.50"),
+        )
+        Asset.objects.create(
+            name="Laptop", category=other, location=location, quantity=2,
+            serial_number="SN-9", purchase_date=datetime.date(2025, 1, 1), status="available",
+        )
+        self.assertCountersMatch()
+
+        order.status = "shipped"
+        order.save()
+        item.category = other
+        item.quantity = 10
+        item.save()
+        # Saving a row loaded with only() must not lose the deferred columns
+        Inventory.objects.only("name").get(pk=item.pk).save()
+        self.assertCountersMatch()
+
+        # Cascading deletes go through the same signals
+        other.delete()
+        order.delete()
+        self.assertCountersMatch()
+
+    def test_migration_populates_the_same_counters(self):
+        category, location, supplier = make_catalog()
+        PurchaseOrder.objects.create(name="PO", supplier=supplier, order_date=datetime.date(2025, 1, 1), status="pending")
+        Inventory.objects.create(name="Cables", category=category, location=location, quantity=4, unit_price=Decimal("2.50"))
+        Asset.objects.create(
+            name="Laptop", category=category, location=location, quantity=2,
+            serial_number="SN-9", purchase_date=datetime.date(2025, 1, 1), status="available",
+        )
+        StatCounter.objects.all().delete()
+        state = MigrationExecutor(connection).loader.project_state(("main_app", "0009_statcounter"))
+        import_module("main_app.migrations.0009_statcounter").populate_counters(state.apps, None)
+        self.assertCountersMatch()
+
+
+# One test process, so the local cache stands in for a shared one
+@override_settings(GROUP_CACHE_IN_SESSION=True, SHARED_CACHE=True)
+class GroupCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = Group.objects.create(name="Staff")
+        self.user = User.objects.create_user("sam", password="pw")
+        self.user.groups.add(self.staff)
+        self.client.force_login(self.user)
+
+    def group_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        return response, [q for q in ctx.captured_queries if "auth_group" in q["sql"]]
+
+    def test_membership_is_loaded_once_then_read_from_session(self):
+        response, queries = self.group_queries(reverse("asset_index"))
+        self.assertEqual((response.status_code, len(queries)), (200, 1))
+        response, queries = self.group_queries(reverse("asset_index"))
+        self.assertEqual((response.status_code, len(queries)), (200, 0))
+
+    @override_settings(SHARED_CACHE=False)
+    def test_session_copy_needs_a_shared_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.client.get(reverse("asset_index"))
+
+    def test_membership_change_invalidates_session_copy(self):
+        self.group_queries(reverse("asset_index"))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.remove(self.staff)
+        response, _ = self.group_queries(reverse("asset_index"))
+        self.assertEqual(response.status_code, 403)
+
+
+class SupplierSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@test.io", "pw")
+        for name, contact, email in [
+            ("Northwind", "Nancy", "nancy@northwind.test"),
+            ("Acme Tools", "Jane", "jane@acme.test"),
+            ("Best Acme", "Bob", "bob@best.test"),
+        ]:
+            Supplier.objects.create(name=name, contact_person=contact, phone_number="1", email=email, address="")
+
+    def test_ranked_matches_across_columns(self):
+        names = [s.name for s in search_suppliers("acme").order_by("-rank", "id")]
+        self.assertEqual(names, ["Acme Tools", "Best Acme"])
+        self.assertEqual([s.name for s in search_suppliers("nancy@")], ["Northwind"])
+
+    def test_list_and_typeahead_endpoints(self):
+        self.client.force_login(self.user)
+        cache.clear()
+        response = self.client.get(reverse("supplier_list"), {"q": "acme"})
+        self.assertEqual([s.name for s in response.context["page"].object_list], ["Acme Tools", "Best Acme"])
+        response = self.client.get(reverse("supplier_search"), {"q": "Acm"})
+        self.assertEqual(response.json()["results"][0]["name"], "Acme Tools")
+
+
+    def test_list_pages_through_tied_ranks(self):
+        for i in range(5):
+            Supplier.objects.create(name=f"Acme {i}", contact_person="", phone_number="1", email="", address="")
+        expected = [s.pk for s in search_suppliers("acme").order_by("-rank", "id")]
+        self.client.force_login(self.user)
+        cache.clear()
+
+        seen, cursor, pages = [], None, []
+        while True:
+            params = {"q": "acme", "page_size": 2, **({"cursor": cursor} if cursor else {})}
+            page = self.client.get(reverse("supplier_list"), params).context["page"]
+            pages.append(page)
+            seen += [s.pk for s in page.object_list]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, expected)
+
+        previous = self.client.get(reverse("supplier_list"), {"q": "acme", "page_size": 2, "cursor": pages[-1].previous_cursor})
+        self.assertEqual([s.pk for s in previous.context["page"].object_list], [s.pk for s in pages[-2].object_list])
+
+
+class GlobalSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@test.io", "pw")
+        category, location, supplier = make_catalog()
+        cls.asset = Asset.objects.create(
+            name="Forklift", category=category, location=location, quantity=1,
+            serial_number="FL-0042", purchase_date=datetime.date(2025, 1, 1), status="available",
+        )
+        cls.order = PurchaseOrder.objects.create(
+            name="Forklift tyres", supplier=supplier, order_date=datetime.date(2025, 1, 2), status="pending",
+        )
+
+    def test_saves_and_deletes_keep_index_current(self):
+        kinds = [r["kind"] for r in search_everything("forklift")]
+        self.assertEqual(kinds, ["asset", "purchase_order"])
+        self.assertEqual(search_everything(f"PO-{self.order.pk}")[0]["object_id"], self.order.pk)
+        self.assertEqual(search_everything("fl-0042")[0]["title"], "Forklift")
+
+        self.asset.delete()
+        self.assertEqual([r["kind"] for r in search_everything("forklift")], ["purchase_order"])
+
+    def test_rebuild_and_endpoint(self):
+        self.assertEqual(rebuild_search_index(batch_size=2), 5)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("global_search"), {"q": "acme"})
+        result = response.json()["results"][0]
+        self.assertEqual(result["kind"], "supplier")
+        self.assertEqual(result["url"], reverse("supplier_detail", args=[result["id"]]))
+
+
+def sequential_scans(sql, params, tables):
+    """Tables from ``tables`` that the database plans to read with a full scan."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(f"EXPLAIN {sql}", params)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+            scanned = re.findall(r"Seq Scan on (\w+)", plan)
+        else:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            # "SCAN t" is a full scan; "SCAN t USING INDEX i" / "SEARCH t ..." are not
+            scanned = [m.group(1) for row in cursor.fetchall() if (m := re.fullmatch(r"SCAN (\w+)", row[-1]))]
+    return [table for table in scanned if table in tables]
+
+
+class IndexUsageTests(TestCase):
+    """The hot views' queries must be served by indexes on a large dataset."""
+
+    ROWS = 3000
+    HOT_TABLES = {m._meta.db_table for m in (PurchaseOrder, Inventory, Asset)}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@test.io", "pw")
+        categories = Category.objects.bulk_create(Category(name=f"Category {i}") for i in range(20))
+        locations = Location.objects.bulk_create(Location(name=f"Location {i}") for i in range(20))
+        suppliers = Supplier.objects.bulk_create(
+            Supplier(name=f"Supplier {i}", contact_person="c", phone_number="1", email="s@x.test", address="")
+            for i in range(50)
+        )
+        now = timezone.now()
+        statuses = [s for s, _ in PurchaseOrder.STATUS_CHOICES]
+        PurchaseOrder.objects.bulk_create(
+            PurchaseOrder(
+                name=f"PO {i}", supplier=suppliers[i % 50], status=statuses[i % 4],
+                order_date=datetime.date(2022, 1, 1) + datetime.timedelta(days=i % 1000),
+            )
+            for i in range(cls.ROWS)
+        )
+        Inventory.objects.bulk_create(
+            Inventory(
+                name=f"Item {i}", category=categories[i % 20], location=locations[i % 20],
+                quantity=i % 500, unit_price=Decimal("1.00"), created_at=now - datetime.timedelta(days=i),
+                reorder_threshold=10 if i % 3 else None,
+            )
+            for i in range(cls.ROWS)
+        )
+        Asset.objects.bulk_create(
+            Asset(
+                name=f"Asset {i}", category=categories[i % 20], location=locations[i % 20],
+                serial_number=f"SN-{i}", purchase_date=datetime.date(2024, 1, 1),
+                status=["available", "unavailable", "discontinued"][i % 3],
+            )
+            for i in range(cls.ROWS)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertIndexedQueries(self, queries):
+        for sql, params in queries:
+            with self.subTest(sql=sql[:120]):
+                self.assertEqual(sequential_scans(sql, params, self.HOT_TABLES), [])
+
+    def view_queries(self, url):
+        self.client.force_login(self.user)
+        # Cached tables would skip the queries under test
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        # Captured SQL already has its parameters inlined
+        return [(q["sql"], ()) for q in ctx.captured_queries if q["sql"].startswith("SELECT")]
+
+    def test_hot_views_use_indexes(self):
+        for url in [
+            reverse("purchase_order_list"),
+            reverse("dashboard"),
+            reverse("inventory_report", args=["week"]),
+        ]:
+            self.assertIndexedQueries(self.view_queries(url))
+
+        # A deep cursor page seeks through the (order_date, id) index too
+        self.client.force_login(self.user)
+        # Skip the cached table, which has no page in its context
+        cache.clear()
+        page = self.client.get(reverse("purchase_order_list")).context["page"]
+        self.assertIndexedQueries(self.view_queries(f"{reverse('purchase_order_list')}?cursor={page.next_cursor}"))
+
+    def test_low_stock_reads_the_partial_index(self):
+        sql, params = LOW_STOCK_PLAN.apply(low_stock_items())[:5].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"{'EXPLAIN' if connection.vendor == 'postgresql' else 'EXPLAIN QUERY PLAN'} {sql}", params)
+            plan = " ".join(str(column) for row in cursor.fetchall() for column in row)
+        self.assertIn("inventory_low_stock_idx", plan)
+
+    def test_status_filters_use_indexes(self):
+        category = Category.objects.first()
+        self.assertIndexedQueries([
+            PurchaseOrder.objects.filter(status="delivered").values("id").query.sql_with_params(),
+            Asset.objects.filter(status="available", category=category).values("id").query.sql_with_params(),
+        ])
+
+
+class ExportTests(TestCase):
+    ROWS = 20000
+    # Peak Python allocations allowed while streaming an export, whatever its size
+    MEMORY_BOUND = 1024 * 1024
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@test.io", "pw")
+        category, location, _ = make_catalog()
+        cls.other_category = Category.objects.create(name="Phones")
+        Inventory.objects.bulk_create(
+            Inventory(
+                name=f"Item {i:06d} with a reasonably long description", category=category,
+                location=location, quantity=i % 500, unit_price=Decimal("12.50"),
+            )
+            for i in range(cls.ROWS)
+        )
+        Inventory.objects.create(name="=HYPERLINK()", category=cls.other_category, location=location, quantity=1, unit_price=1)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def read_csv(self, response):
+        return list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+
+    def test_export_honours_list_filters(self):
+        response = self.client.get(reverse("inventory_export"), {"category": self.other_category.pk})
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment;", response["Content-Disposition"])
+        rows = self.read_csv(response)
+        self.assertEqual(rows[0][:3], ["ID", "Name", "Category"])
+        # One row, with the formula neutralised
+        self.assertEqual([row[1:3] for row in rows[1:]], [["'=HYPERLINK()", "Phones"]])
+
+        cache.clear()
+        listed = self.client.get(reverse("inventory_list"), {"category": self.other_category.pk}).context["page"]
+        self.assertEqual([item.name for item in listed.object_list], ["=HYPERLINK()"])
+
+    @override_settings(EXPORT_CHUNK_SIZE=500, EXPORT_BUFFER_BYTES=16 * 1024)
+    def test_peak_memory_is_bounded(self):
+        tracemalloc.start()
+        try:
+            size = 0
+            for chunk in self.client.get(reverse("inventory_export")).streaming_content:
+                size += len(chunk)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # The export is well over the bound, so it can't have been held in memory
+        self.assertGreater(size, 2 * self.MEMORY_BOUND)
+        self.assertLess(peak, self.MEMORY_BOUND)
+
+    def test_csv_buffer_is_bounded_for_a_million_rows(self):
+        row = (1, "Item with a reasonably long description", "Laptops", "Warehouse A", 250, Decimal("12.50"))
+        rows = itertools.repeat(row, 1_000_000)
+        tracemalloc.start()
+        try:
+            chunks = sum(1 for _ in iter_csv(["ID", "Name", "Category", "Location", "Quantity", "Unit Price"], rows, 64 * 1024))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertGreater(chunks, 100)
+        self.assertLess(peak, self.MEMORY_BOUND)
+
+
+class InventoryReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@test.io", "pw")
+        cls.laptops, cls.warehouse, _ = make_catalog()
+        cls.phones = Category.objects.create(name="Phones")
+        cls.today = timezone.localdate()
+        cls.last_month = (cls.today.replace(day=1) - datetime.timedelta(days=1)).replace(day=1)
+
+        def at(day):
+            return timezone.make_aware(datetime.datetime.combine(day, datetime.time(12)))
+
+        for category, quantity, day in [
+            (cls.laptops, 2, cls.last_month),
+            (cls.laptops, 3, cls.last_month),
+            (cls.phones, 4, cls.last_month + datetime.timedelta(days=1)),
+            (cls.phones, 5, cls.today),
+        ]:
+            Inventory.objects.create(
+                name="Item", category=category, location=cls.warehouse,
+                quantity=quantity, unit_price=Decimal("10.00"), created_at=at(day),
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_groups_by_period_and_dimension(self):
+        # The report, then the category names
+        with self.assertNumQueries(2):
+            report = inventory_report(self.last_month, self.today, "month", "category")
+        first = report[0]
+        self.assertEqual(first["start"], self.last_month)
+        self.assertEqual(
+            [(r["name"], r["items"], r["quantity"], r["value"]) for r in first["rows"]],
+            [("Laptops", 2, 5, Decimal("50.00")), ("Phones", 1, 4, Decimal("40.00"))],
+        )
+        self.assertEqual(first["total"], {"items": 3, "quantity": 9, "value": Decimal("90.00")})
+        self.assertEqual([(r["name"], r["items"]) for r in report[-1]["rows"]], [("Phones", 1)])
+
+        days = inventory_report(self.last_month, self.last_month + datetime.timedelta(days=1), "day", "location")
+        self.assertEqual([[(r["name"], r["items"]) for r in p["rows"]] for p in days], [[("Warehouse A", 2)], [("Warehouse A", 1)]])
+
+    def test_closed_periods_are_cached_until_an_item_in_them_changes(self):
+        inventory_report(self.last_month, self.today, "month", "category")
+        # Last month comes from the cache; only the current month (and the names) are queried
+        with self.assertNumQueries(2):
+            inventory_report(self.last_month, self.today, "month", "category")
+        with self.assertNumQueries(1):
+            inventory_report(self.last_month, self.last_month, "month", "category")
+
+        item = Inventory.objects.filter(category=self.laptops).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            item.delete()
+        report = inventory_report(self.last_month, self.last_month, "month", "category")
+        self.assertEqual(report[0]["total"]["items"], 2)
+
+    def test_cached_periods_show_renamed_categories(self):
+        inventory_report(self.last_month, self.last_month, "month", "category")
+        self.laptops.name = "Notebooks"
+        self.laptops.save()
+        report = inventory_report(self.last_month, self.last_month, "month", "category")
+        self.assertEqual([r["name"] for r in report[0]["rows"]], ["Notebooks", "Phones"])
+
+    @override_settings(INVENTORY_REPORT_CACHE_TTL=60)
+    def test_closed_periods_expire_without_a_shared_cache(self):
+        with mock.patch("main_app.reports.cache.set_many") as set_many:
+            inventory_report(self.last_month, self.last_month, "month", "category")
+        self.assertEqual(set_many.call_args.args[1], 60)
+
+    def test_view(self):
+        url = reverse("inventory_report", args=["year"])
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(self.user)
+        response = self.client.get(url, {"group": "week", "by": "location"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["periods"])
+        self.assertTrue(all(p["rows"] for p in response.context["periods"]))
+
+        response = self.client.get(url, {"start": "2025-02-01", "end": "2025-01-01"})
+        self.assertEqual(response.context["periods"], [])
+        self.assertTrue(response.context["form"].errors)
+
+
+class ReportMaterializationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category, location, cls.acme = make_catalog()
+        cls.globex = Supplier.objects.create(
+            name="Globex", contact_person="Hank", phone_number="555-0101", email="hank@globex.test", address="",
+        )
+        cls.month = timezone.localdate().replace(day=1)
+        cls.orders = [
+            PurchaseOrder.objects.create(name="A", supplier=cls.acme, order_date=cls.month, quantity=5, status="pending"),
+            PurchaseOrder.objects.create(name="B", supplier=cls.acme, order_date=cls.month, quantity=7, status="shipped"),
+            PurchaseOrder.objects.create(name="C", supplier=cls.globex, order_date=cls.month, quantity=2, status="pending"),
+        ]
+        Inventory.objects.create(name="Cables", category=category, location=location, quantity=4, unit_price=Decimal("2.50"))
+
+    def backdate_orders(self):
+        # QuerySet.update() leaves auto_now alone, so this moves orders behind the watermark's overlap
+        PurchaseOrder.objects.update(updated_at=timezone.now() - datetime.timedelta(days=1))
+
+    def spend(self):
+        return {(row.supplier.name, row.month): (row.orders, row.units) for row in supplier_spend()}
+
+    def test_delivered_at_follows_status(self):
+        order = self.orders[0]
+        order.status = "delivered"
+        order.save(update_fields=["status"])
+        order.refresh_from_db()
+        self.assertIsNotNone(order.delivered_at)
+
+        order.status = "shipped"
+        order.save()
+        order.refresh_from_db()
+        self.assertIsNone(order.delivered_at)
+
+    def test_incremental_materialization(self):
+        self.backdate_orders()
+        self.assertEqual(materialize_reports()["facts"], 3)
+        self.assertEqual(self.spend(), {("Acme", self.month): (2, 12), ("Globex", self.month): (1, 2)})
+
+        # Nothing changed since the watermark
+        self.assertEqual(materialize_reports()["facts"], 0)
+
+        order = self.orders[1]
+        order.status = "delivered"
+        order.quantity = 10
+        order.save()
+        self.orders[2].delete()
+        result = materialize_reports()
+        self.assertEqual((result["facts"], result["removed"]), (1, 1))
+        self.assertEqual(self.spend(), {("Acme", self.month): (2, 15)})
+        self.assertEqual(PurchaseOrderFact.objects.count(), 2)
+
+        [lead] = lead_time_trend()
+        self.assertEqual((lead.delivered, lead.max_lead_days), (1, (timezone.localdate() - self.month).days))
+
+    def test_deleted_orders_are_found_through_their_tombstones(self):
+        self.backdate_orders()
+        materialize_reports()
+        untracked = self.orders[1].pk
+        self.orders[2].delete()
+        self.orders[1].delete()
+        # An order deleted before tombstones were recorded
+        Tombstone.objects.filter(object_id=untracked).delete()
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(materialize_reports()["removed"], 1)
+        self.assertFalse([q for q in ctx.captured_queries if "EXISTS" in q["sql"]])
+        self.assertEqual(materialize_reports(full=True)["removed"], 1)
+        self.assertEqual(self.spend(), {("Acme", self.month): (1, 5)})
+
+    def test_progress_is_reported_after_every_batch(self):
+        calls = []
+        materialize_reports(batch_size=2, progress=lambda done, total=None: calls.append((done, total)))
+        self.assertEqual(calls, [(0, 3), (2, None), (3, None)])
+
+    def test_an_interrupted_run_leaves_no_month_counting_a_moved_order(self):
+        self.backdate_orders()
+        materialize_reports()
+        previous = (self.month - datetime.timedelta(days=1)).replace(day=1)
+        order = self.orders[0]
+        order.order_date = previous
+        order.save()
+
+        def dies_after_the_first_batch(done, total=None):
+            if done:
+                raise SystemExit
+
+        with self.assertRaises(SystemExit):
+            materialize_reports(batch_size=1, progress=dies_after_the_first_batch)
+        self.assertEqual(materialize_reports()["facts"], 1)
+        self.assertEqual(self.spend(), {
+            ("Acme", previous): (1, 5), ("Acme", self.month): (1, 7), ("Globex", self.month): (1, 2),
+        })
+
+    def test_one_run_at_a_time(self):
+        Watermark.objects.create(name=REPORTS_LEASE, value=timezone.now() + datetime.timedelta(minutes=1))
+        with self.assertRaises(RefreshRunning):
+            materialize_reports()
+        # A lease left behind by a run that died runs out
+        Watermark.objects.filter(name=REPORTS_LEASE).update(value=timezone.now() - datetime.timedelta(seconds=1))
+        self.assertEqual(materialize_reports()["facts"], 3)
+        self.assertIsNone(Watermark.objects.get(name=REPORTS_LEASE).value)
+
+    def test_category_distribution_reads_counters(self):
+        self.assertEqual(category_distribution(), [{
+            "name": "Laptops", "assets": 0, "asset_quantity": 0,
+            "inventory_items": 1, "inventory_value": Decimal("10.00"),
+        }])
+
+
+class CsvImportTests(TestCase):
+    ASSET_HEADER = "name,category,location,serial_number,purchase_date,status,quantity\n"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@test.io", "pw")
+        cls.category, cls.location, _ = make_catalog()
+        cls.existing = Asset.objects.create(
+            name="Old name", category=cls.category, location=cls.location, quantity=1,
+            serial_number="SN-1", purchase_date=datetime.date(2024, 1, 1), status="available",
+        )
+
+    def test_inventory_rows_are_validated_and_reported(self):
+        csv_text = (
+            "name,category,location,quantity,unit_price\n"
+            "Cables,laptops, warehouse a ,10,2.50\n"
+            "Mice,Phones,Warehouse A,3,1.00\n"
+            "Keyboards,Laptops,Warehouse A,-1,oops\n"
+            "Docks,Laptops,Warehouse A,2,99.00\n"
+        )
+        result = import_csv("inventory", io.StringIO(csv_text), owner=self.user)
+        self.assertEqual((result.created, result.updated, result.error_count), (2, 0, 2))
+        self.assertEqual([line for line, _ in result.errors], [3, 4])
+        self.assertIn("category: Unknown category 'Phones'.", result.errors[0][1])
+        self.assertEqual(len(result.errors[1][1]), 2)
+
+        self.assertEqual(sorted(Inventory.objects.values_list("name", flat=True)), ["Cables", "Docks"])
+        self.assertEqual(SearchEntry.objects.filter(kind="inventory").count(), 2)
+        self.assertEqual(diff_counters(compute_counters()), {})
+
+    def test_assets_upsert_on_serial_number(self):
+        csv_text = self.ASSET_HEADER + (
+            "Laptop,Laptops,Warehouse A,SN-1,2024-02-01,unavailable,2\n"
+            "Phone,Laptops,Warehouse A,SN-2,2024-02-01,available,1\n"
+            "Phone v2,Laptops,Warehouse A,SN-2,2024-02-01,available,4\n"
+            "Tablet,Laptops,Warehouse A,SN-3,not a date,available,1\n"
+        )
+        result = import_csv("assets", io.StringIO(csv_text), batch_size=10)
+        self.assertEqual((result.created, result.updated, result.error_count), (1, 2, 1))
+
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.name, self.existing.status, self.existing.quantity), ("Laptop", "unavailable", 2))
+        self.assertEqual(Asset.objects.get(serial_number="SN-2").name, "Phone v2")
+        self.assertEqual(Asset.objects.count(), 2)
+        self.assertEqual(diff_counters(compute_counters()), {})
+
+    def test_queries_scale_with_batches_not_rows(self):
+        csv_text = self.ASSET_HEADER + "".join(
+            f"Asset {i},Laptops,Warehouse A,Q-{i},2024-01-01,available,1\n" for i in range(200)
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            import_csv("assets", io.StringIO(csv_text), batch_size=100)
+        self.assertLess(len(ctx.captured_queries), 40)
+
+    def test_asset_batches_take_the_import_lock_before_reading_existing_assets(self):
+        csv_text = self.ASSET_HEADER + "Laptop,Laptops,Warehouse A,SN-1,2024-02-01,available,3\n"
+        with CaptureQueriesContext(connection) as ctx:
+            import_csv("assets", io.StringIO(csv_text))
+        tables = [
+            table for q in ctx.captured_queries
+            for table in ("main_app_watermark", "main_app_asset") if q["sql"].startswith("SELECT") and f'FROM "{table}"' in q["sql"]
+        ]
+        self.assertEqual(tables[:2], ["main_app_watermark", "main_app_asset"])
+        self.assertEqual(Watermark.objects.filter(name=ASSET_IMPORT_LOCK).count(), 1)
+        self.assertEqual(diff_counters(compute_counters()), {})
+        self.assertEqual(list(StockMovement.objects.values_list("kind", "delta")), [("adjustment", 2)])
+
+    def test_each_batch_runs_a_fixed_number_of_queries(self):
+        def queries(batches):
+            csv_text = self.ASSET_HEADER + "".join(
+                f"Asset {i},Laptops,Warehouse A,B{batches}-{i},2024-01-01,available,1\n" for i in range(batches * 50)
+            )
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(import_csv("assets", io.StringIO(csv_text), batch_size=50).created, batches * 50)
+            return len(ctx.captured_queries)
+
+        # The first import creates the lock row
+        queries(1)
+        # Rows per minute on a realistic file are measured by the bench_import command
+        self.assertLessEqual((queries(4) - queries(2)) / 2, 13)
+
+
+def run_queued_jobs():
+    for job in claim_jobs(10):
+        run_job(job)
+
+
+class JobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@test.io", "pw")
+        cls.other = User.objects.create_user("other", "other@test.io", "pw")
+        category, location, supplier = make_catalog()
+        for status in ("pending", "pending", "delivered"):
+            PurchaseOrder.objects.create(name="PO", supplier=supplier, order_date=datetime.date(2025, 1, 1), status=status)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.client.force_login(self.user)
+
+    def status(self, job):
+        return self.client.get(reverse("job_status", args=[job.pk])).json()
+
+    def test_import_upload_runs_in_background(self):
+        upload = SimpleUploadedFile(
+            "assets.csv",
+            b"name,category,location,serial_number,purchase_date,status,quantity\n"
+            b"Scanner,Laptops,Nowhere,SN-9,2024-01-01,available,1\n"
+            b"Printer,Laptops,Warehouse A,SN-10,2024-01-01,available,1\n",
+            content_type="text/csv",
+        )
+        response = self.client.post(reverse("asset_import"), {"file": upload})
+        job = Job.objects.get()
+        self.assertRedirects(response, reverse("job_detail", args=[job.pk]))
+        self.assertEqual(self.status(job)["status"], "queued")
+        self.assertFalse(Asset.objects.exists())
+
+        run_queued_jobs()
+        status = self.status(job)
+        self.assertEqual((status["status"], status["progress"]), ("done", 2))
+        self.assertEqual(status["result"]["errors"], [[2, ["location: Unknown location 'Nowhere'."]]])
+        self.assertTrue(Asset.objects.filter(serial_number="SN-10").exists())
+        self.assertContains(self.client.get(reverse("job_detail", args=[job.pk])), "Unknown location")
+
+    def test_export_jobs(self):
+        response = self.client.get(reverse("purchase_order_export"), {"format": "xlsx", "status": "pending", "cursor": "x"})
+        job = Job.objects.get()
+        self.assertRedirects(response, reverse("job_detail", args=[job.pk]))
+        self.assertEqual(job.params, {"name": "purchase_orders", "format": "xlsx", "filters": {"status": "pending"}})
+
+        self.client.get(reverse("purchase_order_export"), {"background": "1", "status": "delivered"})
+        run_queued_jobs()
+
+        xlsx, csv_job = Job.objects.order_by("id")
+        self.assertEqual((self.status(xlsx)["total"], self.status(csv_job)["total"]), (2, 1))
+        download = self.client.get(self.status(xlsx)["download_url"])
+        self.assertTrue(b"".join(download.streaming_content).startswith(b"PK"))
+        download = self.client.get(self.status(csv_job)["download_url"])
+        self.assertEqual(len(b"".join(download.streaming_content).decode().splitlines()), 2)
+
+    def test_failures_are_recorded(self):
+        job = enqueue("export", owner=self.user, params={"name": "nothing"})
+        run_queued_jobs()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.message), ("failed", "'nothing'"))
+
+    @override_settings(JOB_STALE_SECONDS=60)
+    def test_claiming_skips_running_jobs_until_they_go_stale(self):
+        job = enqueue("materialize_reports", owner=self.user)
+        self.assertEqual(claim_jobs(5), [job])
+        self.assertEqual(claim_jobs(5), [])
+
+        Job.objects.filter(pk=job.pk).update(updated_at=timezone.now() - datetime.timedelta(minutes=5))
+        self.assertEqual(claim_jobs(5), [job])
+
+    def test_materialize_reports_its_progress(self):
+        job = enqueue("materialize_reports", owner=self.user)
+        run_queued_jobs()
+        status = self.status(job)
+        self.assertEqual((status["status"], status["progress"], status["total"]), ("done", 3, 3))
+
+    def test_a_run_that_lost_its_claim_leaves_the_job_alone(self):
+        job = enqueue("materialize_reports", owner=self.user)
+        [slow_run] = claim_jobs(1)
+        # It went stale and another worker claimed it again
+        Job.objects.filter(pk=job.pk).update(started_at=slow_run.started_at + datetime.timedelta(minutes=5))
+        run_job(slow_run)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result, job.finished_at), ("running", {}, None))
+
+    @override_settings(IMPORT_BATCH_SIZE=2)
+    def test_a_reclaimed_import_skips_the_rows_it_already_wrote(self):
+        rows = "".join(f"Item {i},Laptops,Warehouse A,1,1.00\n" for i in range(5))
+        upload = SimpleUploadedFile("inventory.csv", f"name,category,location,quantity,unit_price\n{rows}".encode())
+        job = enqueue("import", owner=self.user, params={"kind": "inventory"}, input_file=upload)
+        [job] = claim_jobs(1)
+
+        write, written = InventoryImporter.write, []
+
+        def dies_in_second_batch(importer, objs):
+            if written:
+                raise SystemExit
+            written.append(objs)
+            write(importer, objs)
+
+        with mock.patch.object(InventoryImporter, "write", dies_in_second_batch), self.assertRaises(SystemExit):
+            run_job(job)
+        Job.objects.filter(pk=job.pk).update(updated_at=timezone.now() - datetime.timedelta(days=1))
+        [job] = claim_jobs(1)
+        self.assertEqual(job.progress, 2)
+
+        run_job(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result["created"]), ("done", 5))
+        self.assertEqual(Inventory.objects.filter(name__startswith="Item ").count(), 5)
+        self.assertEqual(StockMovement.objects.filter(note="CSV import").count(), 5)
+
+    def test_jobs_are_private_to_their_owner(self):
+        job = enqueue("materialize_reports", owner=self.user)
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(reverse("job_status", args=[job.pk])).status_code, 404)
+
+
+class JobWorkerTests(TransactionTestCase):
+    def test_worker_drains_the_queue(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+        jobs = [enqueue("export", params={"name": name}) for name in ("inventory", "assets", "purchase_orders")]
+        # One thread: SQLite's shared in-memory test database can't take concurrent writers
+        work(workers=1, once=True, poll_interval=0)
+        self.assertEqual(
+            list(Job.objects.filter(pk__in=[job.pk for job in jobs]).values_list("status", flat=True)),
+            ["done"] * 3,
+        )
+
+
+class BulkStatusTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        _, _, supplier = make_catalog()
+        cls.manager = User.objects.create_user("manny", password="pw")
+        cls.manager.groups.add(Group.objects.create(name="Manager"))
+        cls.staff = User.objects.create_user("sam", password="pw")
+        cls.staff.groups.add(Group.objects.create(name="Staff"))
+        cls.shipped = [
+            PurchaseOrder.objects.create(name=f"PO {i}", supplier=supplier, order_date=datetime.date(2025, 1, 1), status="shipped")
+            for i in range(40)
+        ]
+        cls.pending = PurchaseOrder.objects.create(name="Later", supplier=supplier, order_date=datetime.date(2025, 1, 1), status="pending")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_one_update_per_from_status(self):
+        ids = [order.pk for order in self.shipped] + [self.pending.pk, 999999]
+        with CaptureQueriesContext(connection) as ctx:
+            results = transition_orders(ids, "delivered")
+        self.assertEqual(len([q for q in ctx.captured_queries if q["sql"].startswith("UPDATE \"main_app_purchaseorder\"")]), 1)
+        # A fixed handful (lock, update, counters), however many orders move
+        self.assertLess(len(ctx.captured_queries), 15)
+
+        self.assertTrue(all(result["ok"] for result in results[:40]))
+        self.assertEqual(results[40]["error"], "Can't go from Pending Order to Delivered.")
+        self.assertEqual(results[41]["error"], "Purchase order not found.")
+
+        delivered = PurchaseOrder.objects.filter(status="delivered")
+        self.assertEqual(delivered.count(), 40)
+        self.assertFalse(delivered.filter(delivered_at__isnull=True).exists())
+        self.assertEqual(diff_counters(compute_counters()), {})
+        self.assertEqual(get_dashboard_kpis()["pos_delivered"], 40)
+
+    def test_endpoint_checks_groups_once_and_returns_per_id_results(self):
+        url = reverse("purchase_order_bulk_status") + "?format=json"
+        data = {"ids": [self.shipped[0].pk, self.pending.pk], "status": "delivered"}
+
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.post(url, data).status_code, 403)
+
+        self.client.force_login(self.manager)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(url, data)
+        self.assertEqual(len([q for q in ctx.captured_queries if "auth_group" in q["sql"]]), 1)
+        self.assertEqual([(r["id"], r["ok"]) for r in response.json()["results"]], [(self.shipped[0].pk, True), (self.pending.pk, False)])
+
+        response = self.client.post(reverse("purchase_order_bulk_status"), {**data, "next": "https://evil.test/"}, follow=True)
+        self.assertRedirects(response, reverse("purchase_order_list"))
+        self.assertContains(response, "Can&#x27;t go from Pending Order to Delivered.")
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("reader", password="pw")
+        cls.staff = User.objects.create_user("sam", password="pw")
+        cls.staff.groups.add(Group.objects.create(name="Staff"))
+        cls.category, cls.location, _ = make_catalog()
+        cls.items = [
+            Inventory.objects.create(name=f"Item {i}", category=cls.category, location=cls.location, quantity=i, unit_price=2)
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_sparse_fields_narrow_the_select(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("api_list", args=["inventory"]), {"fields": "name,quantity"})
+        self.assertEqual(response.json()["results"][0], {"id": self.items[0].pk, "name": "Item 0", "quantity": 0})
+        page_sql = [q["sql"] for q in ctx.captured_queries if "LIMIT" in q["sql"]][0]
+        self.assertNotIn("unit_price", page_sql)
+
+        response = self.client.get(reverse("api_list", args=["inventory"]), {"fields": "name,owner"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("owner", response.json()["error"])
+
+    def test_cursor_pages_follow_the_list_filters(self):
+        Inventory.objects.create(name="Elsewhere", category=Category.objects.create(name="Phones"), location=self.location, quantity=1, unit_price=1)
+        url = reverse("api_list", args=["inventory"])
+        first = self.client.get(url, {"category": self.category.pk, "page_size": 3}).json()
+        self.assertEqual([row["name"] for row in first["results"]], ["Item 0", "Item 1", "Item 2"])
+        self.assertIsNone(first["previous"])
+
+        second = self.client.get(first["next"]).json()
+        self.assertEqual([row["name"] for row in second["results"]], ["Item 3", "Item 4"])
+        self.assertIsNone(second["next"])
+
+        self.assertEqual(self.client.get(url, {"cursor": "nonsense"}).status_code, 400)
+
+    def test_if_none_match_gets_a_cheap_304(self):
+        url = reverse("api_list", args=["inventory"])
+        tag = self.client.get(url)["ETag"]
+        self.assertTrue(tag.startswith('W/"'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(response.status_code, 304)
+        # Only the max(updated_at)/count aggregate touches the inventory table
+        self.assertEqual(len([q for q in ctx.captured_queries if "main_app_inventory" in q["sql"]]), 1)
+
+        self.items[0].quantity = 99
+        self.items[0].save()
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(changed.status_code, 200)
+        self.items[1].delete()
+        self.assertNotEqual(self.client.get(url, HTTP_IF_NONE_MATCH=changed["ETag"])["ETag"], changed["ETag"])
+
+    def test_detail_and_permissions(self):
+        response = self.client.get(reverse("api_detail", args=["inventory", self.items[2].pk]), {"fields": "name"})
+        self.assertEqual(response.json(), {"id": self.items[2].pk, "name": "Item 2"})
+        self.assertEqual(self.client.get(reverse("api_detail", args=["inventory", 999999])).status_code, 404)
+        self.assertEqual(self.client.get(reverse("api_list", args=["widgets"])).status_code, 404)
+
+        # Assets follow the asset pages' group check
+        self.assertEqual(self.client.get(reverse("api_list", args=["assets"])).status_code, 403)
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(reverse("api_list", args=["assets"])).status_code, 200)
+
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse("api_list", args=["inventory"])).status_code, 401)
+
+    def test_resources_follow_their_pages_groups(self):
+        _, _, supplier = make_catalog()
+        # (resource, a row's pk, readable by a user with no groups, by Staff)
+        cases = [
+            ("inventory", self.items[0].pk, True, True),
+            ("categories", self.category.pk, True, True),
+            ("assets", None, False, True),
+            ("locations", self.location.pk, False, True),
+            ("suppliers", supplier.pk, False, False),
+        ]
+        for user in (self.user, self.staff):
+            self.client.force_login(user)
+            for resource, pk, anyone, staff in cases:
+                expected = 200 if (anyone if user is self.user else staff) else 403
+                urls = [reverse("api_list", args=[resource])]
+                if pk:
+                    urls.append(reverse("api_detail", args=[resource, pk]))
+                for url in urls:
+                    with self.subTest(user=user.username, url=url):
+                        self.assertEqual(self.client.get(url).status_code, expected)
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class SyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("erp", password="pw")
+        cls.category, cls.location, _ = make_catalog()
+        cls.items = [
+            Inventory.objects.create(name=f"Item {i}", category=cls.category, location=cls.location, quantity=i, unit_price=2)
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def sync(self, since=None, **params):
+        if since:
+            params["since"] = since
+        response = self.client.get(reverse("api_sync", args=["inventory"]), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_initial_copy_then_only_changes_and_deletes(self):
+        first = self.sync(limit=3, fields="name")
+        self.assertEqual([row["name"] for row in first["changed"]], ["Item 0", "Item 1", "Item 2"])
+        self.assertTrue(first["has_more"])
+        second = self.sync(first["next"], limit=3, fields="name")
+        self.assertEqual([row["name"] for row in second["changed"]], ["Item 3", "Item 4"])
+        self.assertFalse(second["has_more"])
+        self.assertEqual(self.sync(second["next"])["changed"], [])
+
+        self.items[1].quantity = 50
+        self.items[1].save()
+        deleted_pk = self.items[3].pk
+        self.items[3].delete()
+        delta = self.sync(second["next"])
+        self.assertEqual([(row["id"], row["quantity"]) for row in delta["changed"]], [(self.items[1].pk, 50)])
+        self.assertEqual(delta["deleted"], [deleted_pk])
+
+        # Nothing new since then
+        caught_up = self.sync(delta["next"])
+        self.assertEqual((caught_up["changed"], caught_up["deleted"]), ([], []))
+        self.assertEqual(caught_up["next"], delta["next"])
+
+    def test_bulk_writes_and_cascades_show_up(self):
+        token = self.sync()["next"]
+        Category.objects.create(name="Phones")
+        import_csv("inventory", io.StringIO("name,category,location,quantity,unit_price\nImported,Phones,Warehouse A,3,1.00\n"))
+        imported = Inventory.objects.get(name="Imported")
+        # Deleting the category cascades to its items, one tombstone each
+        self.category.delete()
+
+        delta = self.sync(token)
+        self.assertEqual([row["id"] for row in delta["changed"]], [imported.pk])
+        self.assertEqual(sorted(delta["deleted"]), sorted(item.pk for item in self.items))
+
+    def test_rows_sharing_a_timestamp_are_not_skipped(self):
+        stamp = timezone.now()
+        Inventory.objects.update(updated_at=stamp)
+        seen, token = [], None
+        while True:
+            page = self.sync(token, limit=2)
+            seen += [row["id"] for row in page["changed"]]
+            token = page["next"]
+            if not page["has_more"]:
+                break
+        self.assertEqual(seen, sorted(item.pk for item in self.items))
+
+    def test_bad_token(self):
+        response = self.client.get(reverse("api_sync", args=["inventory"]), {"since": "garbage"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_feeds_follow_their_pages_groups(self):
+        # The change feed and its tombstones are the whole table, so they get the same check as the API
+        for resource in ("assets", "locations", "suppliers"):
+            with self.subTest(resource=resource):
+                self.assertEqual(self.client.get(reverse("api_sync", args=[resource])).status_code, 403)
+
+        staff = User.objects.create_user("sam", password="pw")
+        staff.groups.add(Group.objects.create(name="Staff"))
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(reverse("api_sync", args=["locations"])).status_code, 200)
+        self.assertEqual(self.client.get(reverse("api_sync", args=["suppliers"])).status_code, 403)
+
+
+class AsyncViewTests(TransactionTestCase):
+    def test_reads_run_concurrently_on_their_own_connections(self):
+        make_catalog()
+
+        def read():
+            time.sleep(0.2)
+            return threading.get_ident(), Category.objects.count()
+
+        started = time.perf_counter()
+        results = async_to_sync(gather_queries)(read, read, read)
+        # Roughly the slowest read, not the sum of all three
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(len({thread for thread, _ in results}), 3)
+        self.assertEqual([count for _, count in results], [1, 1, 1])
+
+    def test_reads_inside_a_transaction_stay_on_its_connection(self):
+        with transaction.atomic():
+            make_catalog()
+            results = async_to_sync(gather_queries)(lambda: Category.objects.count(), lambda: threading.get_ident())
+        self.assertEqual(results, [1, threading.get_ident()])
+
+    def test_async_views_check_login_and_groups(self):
+        staff = User.objects.create_user("sam", password="pw")
+        self.assertRedirects(self.client.get(reverse("dashboard")), f"{reverse('login')}?next={reverse('dashboard')}")
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(reverse("dashboard")).status_code, 403)
+
+        staff.groups.add(Group.objects.create(name="Staff"))
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx, self.assertLogs("main_app.requests", "INFO") as logs:
+            response = self.client.get(reverse("dashboard"))
+        self.assertContains(response, "sam")
+        # The user is loaded once and shared with the template
+        self.assertEqual(len([q for q in ctx.captured_queries if 'FROM "auth_user"' in q["sql"]]), 1)
+        # The request metrics also count the three dashboard reads made on the pool threads
+        queries = json.loads(logs.records[-1].getMessage())["queries"]
+        self.assertEqual(queries, len(ctx.captured_queries) + 3)
+
+
+class HealthTests(TestCase):
+    def test_health_reports_database_and_pool_to_staff_only(self):
+        response = self.client.get(reverse("health"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "ok")
+        self.assertNotIn("pool", response.json())
+
+        self.client.force_login(User.objects.create_user("ops", password="pw", is_staff=True))
+        # No pool on the test database; pooling is opt-in with DB_POOL
+        self.assertIsNone(self.client.get(reverse("health")).json()["pool"])
+
+
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@test.io", "pw")
+        make_catalog()
+
+    def setUp(self):
+        histogram.clear()
+        self.client.force_login(self.admin)
+
+    def test_server_timing_log_line_and_histogram(self):
+        with self.assertLogs("main_app.requests", "INFO") as logs, CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("category_list"))
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((line["view"], line["status"]), ("category_list", 200))
+        self.assertEqual(line["queries"], len(ctx.captured_queries))
+        self.assertGreater(line["template_ms"], 0)
+        self.assertIn(f'desc="{line["queries"]} queries"', response["Server-Timing"])
+
+        metrics = self.client.get(reverse("request_metrics")).json()
+        self.assertEqual(metrics["category_list"]["requests"], 1)
+        self.assertEqual(sum(metrics["category_list"]["histogram"].values()), 1)
+
+        self.client.force_login(User.objects.create_user("sam", password="pw"))
+        self.assertEqual(self.client.get(reverse("request_metrics")).status_code, 302)
+
+    @override_settings(DUPLICATE_QUERY_THRESHOLD=3)
+    def test_repeated_statement_is_logged_with_its_origin(self):
+        def n_plus_one(request):
+            for category in Category.objects.all()[:1]:
+                for _ in range(3):
+                    Location.objects.filter(pk=category.pk).exists()
+            return HttpResponse()
+
+        with self.assertLogs("main_app.requests", "WARNING") as logs:
+            RequestMetricsMiddleware(n_plus_one)(RequestFactory().get("/report/"))
+        self.assertIn("ran 3 times in one request", logs.output[0])
+        self.assertIn("main_app/tests.py", logs.output[0])
+        self.assertIn("in n_plus_one", logs.output[0])
+
+
+def seed_rows(count, category_count=20, location_count=10, start=0):
+    """Bulk-create ``count`` suppliers, assets, inventory items and purchase orders."""
+    categories = Category.objects.bulk_create(Category(name=f"Category {start + i}") for i in range(category_count))
+    locations = Location.objects.bulk_create(Location(name=f"Location {start + i}") for i in range(location_count))
+    suppliers = Supplier.objects.bulk_create(
+        Supplier(
+            name=f"Supplier {start + i}", contact_person=f"Contact {i}", phone_number=f"555-{start + i:07d}",
+            email=f"supplier{start + i}@example.test", address=f"{i} Main St",
+        )
+        for i in range(count)
+    )
+    Asset.objects.bulk_create(
+        Asset(
+            name=f"Asset {start + i}", category=categories[i % category_count], location=locations[i % location_count],
+            quantity=i % 7, serial_number=f"SN-{start + i:08d}", purchase_date=datetime.date(2025, 1, 1) + datetime.timedelta(days=i % 300),
+            status=Asset.STATUS_CHOICES[i % 3][0],
+        )
+        for i in range(count)
+    )
+    Inventory.objects.bulk_create(
+        Inventory(
+            name=f"Item {start + i}", category=categories[i % category_count], location=locations[i % location_count],
+            quantity=i % 90, unit_price=Decimal("4.50"),
+        )
+        for i in range(count)
+    )
+    PurchaseOrder.objects.bulk_create(
+        PurchaseOrder(
+            name=f"PO {start + i}", supplier=suppliers[i % count], quantity=i % 40,
+            order_date=datetime.date(2025, 1, 1) + datetime.timedelta(days=i % 300),
+            status=PurchaseOrder.STATUS_CHOICES[i % 4][0],
+        )
+        for i in range(count)
+    )
+
+
+def refresh_derived_tables():
+    # Bulk-created rows skip the signals that keep these current
+    rebuild_counters(compute_counters())
+    rebuild_search_index()
+    materialize_reports()
+
+
+# What a request the group check refuses costs: session, user and groups
+DENIED = (3, 403)
+
+
+def budgets(budget, status=200, **users):
+    """{user: (query budget, expected status)}, the same for every user unless given by name."""
+    return {user: users.get(user, (budget, status)) for user in ("Manager", "Owner", "Staff")}
+
+
+class QueryBudgetTests(TestCase):
+    """Every named route stays within a fixed number of queries, however many rows there are.
+
+    Each route is requested as a Manager, an Owner and a Staff user with a
+    small dataset, then again after growing it to thousands of rows; both runs
+    must answer with the expected status and issue the same number of
+    queries, at most that user's budget. A new route needs an entry in ROUTES.
+    """
+
+    SMALL = 30
+    LARGE = 3000
+
+    # route -> (method, args(test) -> URL args, query string / POST data (test) -> dict, budgets(...))
+    ROUTES = {
+        "home": ("get", None, None, budgets(0)),
+        "dashboard": ("get", None, None, budgets(6)),
+        "global_search": ("get", None, lambda t: {"q": "item 1"}, budgets(4)),
+        "health": ("get", None, None, budgets(3)),
+        "request_metrics": ("get", None, None, budgets(2, Manager=(2, 302), Staff=(2, 302))),
+        "reports": ("get", None, None, budgets(8)),
+        "reports_refresh": ("post", None, None, budgets(4, status=302, Staff=DENIED)),
+        "api_root": ("get", None, None, budgets(2)),
+        "api_list": ("get", lambda t: ["suppliers"], lambda t: {"fields": "name,email"}, budgets(5, Staff=DENIED)),
+        "api_detail": ("get", lambda t: ["suppliers", t.supplier.pk], None, budgets(5, Staff=DENIED)),
+        "api_sync": ("get", lambda t: ["suppliers"], None, budgets(5, Staff=DENIED)),
+        "job_detail": ("get", lambda t: [t.job.pk], None, budgets(3, Manager=(3, 404), Staff=(3, 404))),
+        "job_status": ("get", lambda t: [t.job.pk], None, budgets(3, Manager=(3, 404), Staff=(3, 404))),
+        "job_download": ("get", lambda t: [t.job.pk], None, budgets(3, Manager=(3, 404), Staff=(3, 404))),
+        "signup": ("get", None, None, budgets(0)),
+        "login": ("get", None, None, budgets(0)),
+        "logout": ("post", None, None, budgets(4, status=302)),
+        "purchase_order_list": ("get", None, lambda t: {"status": "pending"}, budgets(3)),
+        "purchase_order_export": ("get", None, lambda t: {"status": "pending"}, budgets(3)),
+        "purchase_order_bulk_status": (
+            "post", None, lambda t: {"ids": [t.pending_order().pk], "status": "confirmed"}, budgets(12, status=302, Staff=(4, 403)),
+        ),
+        "purchase_order_detail": ("get", lambda t: [t.order.pk], None, budgets(3)),
+        "purchase_order_create": ("get", None, None, budgets(4)),
+        "purchase_order_edit": ("get", lambda t: [t.order.pk], None, budgets(5, Staff=DENIED)),
+        "purchase_order_delete": ("get", lambda t: [t.order.pk], None, budgets(5, Manager=DENIED, Staff=DENIED)),
+        "asset_index": ("get", None, lambda t: {"status": "available"}, budgets(4)),
+        "asset_export": ("get", None, None, budgets(4)),
+        "asset_import": ("get", None, None, budgets(3, Staff=DENIED)),
+        "asset_create": ("get", None, None, budgets(5)),
+        "asset_detail": ("get", lambda t: [t.asset.pk], None, budgets(4)),
+        "asset_update": ("get", lambda t: [t.asset.pk], None, budgets(6, Staff=DENIED)),
+        "asset_delete": ("get", lambda t: [t.asset.pk], None, budgets(4, Manager=DENIED, Staff=DENIED)),
+        "inventory_list": ("get", None, lambda t: {"category": t.category.pk}, budgets(3)),
+        "inventory_export": ("get", None, None, budgets(3)),
+        "inventory_import": ("get", None, None, budgets(3, Staff=DENIED)),
+        "inventory_add": ("get", None, None, budgets(6)),
+        "inventory_detail": ("get", lambda t: [t.item.pk], None, budgets(3)),
+        "inventory_edit": ("get", lambda t: [t.item.pk], None, budgets(7, Staff=DENIED)),
+        "inventory_stock": ("get", lambda t: [t.item.pk], None, budgets(6)),
+        "inventory_delete": ("get", lambda t: [t.item.pk], None, budgets(4, Manager=DENIED, Staff=DENIED)),
+        "inventory_report": ("get", lambda t: ["month"], None, budgets(4)),
+        "category_list": ("get", None, None, budgets(3)),
+        "category_add": ("get", None, None, budgets(3)),
+        "category_detail": ("get", lambda t: [t.category.pk], None, budgets(3)),
+        "category_edit": ("get", lambda t: [t.category.pk], None, budgets(4, Staff=DENIED)),
+        "category_delete": ("get", lambda t: [t.category.pk], None, budgets(4, Manager=DENIED, Staff=DENIED)),
+        "location_list": ("get", None, None, budgets(4)),
+        "location_add": ("get", None, None, budgets(3, Staff=DENIED)),
+        "location_detail": ("get", lambda t: [t.location.pk], None, budgets(4)),
+        "location_edit": ("get", lambda t: [t.location.pk], None, budgets(4, Staff=DENIED)),
+        "location_delete": ("get", lambda t: [t.location.pk], None, budgets(4, Manager=DENIED, Staff=DENIED)),
+        "supplier_list": ("get", None, lambda t: {"q": "supplier 1"}, budgets(4)),
+        "supplier_create": ("get", None, None, budgets(3, Staff=DENIED)),
+        "supplier_search": ("get", None, lambda t: {"q": "sup"}, budgets(4)),
+        "supplier_detail": ("get", lambda t: [t.supplier.pk], None, budgets(4, Staff=DENIED)),
+        "supplier_edit": ("get", lambda t: [t.supplier.pk], None, budgets(4, Staff=DENIED)),
+        "supplier_delete": ("get", lambda t: [t.supplier.pk], None, budgets(4, Manager=DENIED, Staff=DENIED)),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        media = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(media.cleanup)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media.name))
+
+        cls.users = {}
+        for name in ("Manager", "Owner", "Staff"):
+            user = User.objects.create_user(name.lower(), password="pw", is_staff=name == "Owner")
+            user.groups.add(Group.objects.create(name=name))
+            cls.users[name] = user
+
+        seed_rows(cls.SMALL)
+        cls.category, cls.location = Category.objects.first(), Location.objects.first()
+        cls.supplier, cls.asset = Supplier.objects.first(), Asset.objects.first()
+        cls.item, cls.order = Inventory.objects.first(), PurchaseOrder.objects.filter(status="pending").first()
+        cls.job = Job.objects.create(kind="export", owner=cls.users["Owner"], status="done")
+        cls.job.result_file.save("result.csv", io.BytesIO(b"id\n1\n"))
+        refresh_derived_tables()
+
+    def pending_order(self):
+        return PurchaseOrder.objects.filter(status="pending").order_by("id").first()
+
+    def request(self, name, user):
+        method, args, data, _ = self.ROUTES[name]
+        self.client.force_login(self.users[user])
+        cache.clear()
+        url = reverse(name, args=args(self) if args else None)
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, data(self) if data else None)
+            if response.streaming:
+                b"".join(response.streaming_content)
+        return len(ctx.captured_queries), response.status_code
+
+    def test_every_named_route_has_a_budget(self):
+        names = {pattern.name for pattern in urlpatterns if pattern.name}
+        self.assertEqual(names - self.ROUTES.keys(), set())
+
+    def test_query_counts_do_not_grow_with_the_data(self):
+        pairs = [(name, user) for name in self.ROUTES for user in self.users]
+        small = {pair: self.request(*pair) for pair in pairs}
+        seed_rows(self.LARGE - self.SMALL, start=self.SMALL)
+        refresh_derived_tables()
+        large = {pair: self.request(*pair) for pair in pairs}
+
+        for name, user in pairs:
+            budget, status = self.ROUTES[name][3][user]
+            (queries, code), (small_queries, small_code) = large[name, user], small[name, user]
+            with self.subTest(route=name, user=user):
+                self.assertEqual((small_code, code), (status, status))
+                self.assertEqual(queries, small_queries, f"{name} ran more queries with more rows")
+                self.assertLessEqual(queries, budget)
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_bench_data(scale=1, log=lambda *args: None)
+
+    def test_seeds_consistent_data(self):
+        self.assertEqual(Supplier.objects.count(), SCALE_UNIT["suppliers"])
+        self.assertEqual(Asset.objects.count(), SCALE_UNIT["assets"])
+        self.assertEqual(Inventory.objects.count(), SCALE_UNIT["inventory"])
+        self.assertEqual(PurchaseOrder.objects.count(), SCALE_UNIT["purchase_orders"])
+        # The derived tables were rebuilt, so counters and search agree with the rows
+        self.assertEqual(diff_counters(compute_counters()), {})
+        self.assertTrue(SearchEntry.objects.exists())
+        self.assertTrue(PurchaseOrderFact.objects.exists())
+
+    def test_every_route_responds(self):
+        owner = get_user_model().objects.get(username="bench_owner")
+        results = run_routes(InProcessTransport(owner), repeat=1, warmup=0, log=lambda *args: None)
+        self.assertEqual(results.keys(), BENCH_ROUTES.keys())
+        for label, row in results.items():
+            with self.subTest(route=label):
+                self.assertEqual(row["status"], [200])
+                self.assertIsNotNone(row["queries"])
+
+    def test_compare_flags_slower_and_chattier_routes(self):
+        def report(p95, queries):
+            return {"routes": {"dashboard": {"p95": p95, "queries": queries}}}
+
+        def regressed(old, new):
+            return compare_results(old, new, threshold=0.15, min_ms=2.0)[0][3]
+
+        self.assertFalse(regressed(report(10.0, 5), report(11.0, 5)))
+        self.assertTrue(regressed(report(10.0, 5), report(20.0, 5)))
+        # Under min_ms is noise, however large the ratio
+        self.assertFalse(regressed(report(1.0, 5), report(2.5, 5)))
+        self.assertTrue(regressed(report(10.0, 5), report(10.0, 6)))
+
+
+@override_settings(FRAGMENT_CACHE=True)
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_superuser("admin", "admin@test.io", "pw")
+        self.category, self.location, self.supplier = make_catalog()
+        self.items = [
+            Inventory.objects.create(
+                name=f"Cable {i}", category=self.category, location=self.location, quantity=i, unit_price=Decimal("1.00"),
+            )
+            for i in range(3)
+        ]
+        self.client.force_login(self.user)
+
+    def get(self, name, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse(name), params)
+        return response.content.decode(), len(ctx.captured_queries)
+
+    def rendered_rows(self):
+        objects = list(INVENTORY_LIST_PLAN.apply(Inventory.objects.order_by("id")))
+        with mock.patch.object(fragments, "_render", wraps=fragments._render) as render:
+            rows = INVENTORY_TABLE.render_rows(objects)
+        return rows, render.call_count
+
+    def test_cached_table_skips_the_query_until_a_write(self):
+        first, first_queries = self.get("inventory_list")
+        second, second_queries = self.get("inventory_list")
+        self.assertIn("Cable 2", first)
+        # The page around the table has a fresh CSRF token each time
+        self.assertEqual(second.split("<main>")[1], first.split("<main>")[1])
+        self.assertEqual(second_queries, first_queries - 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.items[0].name = "Renamed"
+            self.items[0].save()
+        self.assertIn("Renamed", self.get("inventory_list")[0])
+
+        # Rows show the category name, so a category rename drops them too
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = "Accessories"
+            self.category.save()
+        self.assertIn("Accessories", self.get("inventory_list")[0])
+
+    def test_only_changed_rows_are_rendered_again(self):
+        rows, renders = self.rendered_rows()
+        self.assertEqual(renders, 3)
+        self.assertEqual(self.rendered_rows(), (rows, 0))
+
+        self.items[1].quantity = 50
+        self.items[1].save()
+        self.assertEqual(self.rendered_rows()[1], 1)
+
+        fragments.bump_generations(Location)
+        self.assertEqual(self.rendered_rows()[1], 3)
+
+    def test_bulk_status_change_drops_cached_order_tables(self):
+        order = PurchaseOrder.objects.create(
+            name="PO", supplier=self.supplier, order_date=datetime.date(2025, 1, 1), status="pending",
+        )
+        self.assertIn('<td data-label="Status">Pending Order</td>', self.get("purchase_order_list")[0])
+        self.assertIn("bg-warning", self.get("dashboard")[0])
+
+        # A bulk UPDATE sends no signals; transition_orders drops the tables itself
+        with self.captureOnCommitCallbacks(execute=True):
+            transition_orders([order.pk], "confirmed")
+        self.assertIn('<td data-label="Status">Order Confirmed</td>', self.get("purchase_order_list")[0])
+        self.assertNotIn("bg-warning", self.get("dashboard")[0])
+
+    def test_logging_in_keeps_user_rows(self):
+        before = fragments.generations(User)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.login(username="admin", password="pw")
+        self.assertEqual(fragments.generations(User), before)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.username = "root"
+            self.user.save()
+        self.assertNotEqual(fragments.generations(User), before)
+
+    @override_settings(FRAGMENT_CACHE=False)
+    def test_disabled_cache_renders_every_time(self):
+        first_queries = self.get("inventory_list")[1]
+        self.assertEqual(self.get("inventory_list")[1], first_queries)
+        self.assertEqual(self.rendered_rows()[1], 3)
+        self.assertEqual(self.rendered_rows()[1], 3)
+
+
+class TemplateWarmupTests(TestCase):
+    def test_warm_up_compiles_every_template_once(self):
+        loader = engines["django"].engine.template_loaders[0]
+        loader.reset()
+        count, _ = warm_templates()
+        self.assertEqual(count, len(template_names()))
+        self.assertIn("base.html", template_names())
+        self.assertLessEqual(set(template_names()), loader.get_template_cache.keys())
+
+        # A warm process renders pages without reading template files
+        user = User.objects.create_superuser("admin", "admin@test.io", "pw")
+        self.client.force_login(user)
+        cache.clear()
+        with mock.patch.object(AppDirectoriesLoader, "get_contents", side_effect=AssertionError("template read")):
+            for name in ("dashboard", "inventory_list", "purchase_order_list", "reports"):
+                self.assertEqual(self.client.get(reverse(name)).status_code, 200)
+
+
+class LowStockTests(TestCase):
+    def setUp(self):
+        self.category, self.location, self.supplier = make_catalog()
+
+        def item(name, quantity, threshold=None, **reorder):
+            return Inventory.objects.create(
+                name=name, category=self.category, location=self.location, quantity=quantity,
+                unit_price=Decimal("1.00"), reorder_threshold=threshold, **reorder,
+            )
+
+        self.cables = item("Cables", 3, 10, reorder_quantity=50, reorder_supplier=self.supplier)
+        self.mice = item("Mice", 1, 5)
+        self.desks = item("Desks", 8, 5)
+        self.chairs = item("Chairs", 0)
+
+    def test_only_items_below_their_threshold_are_low(self):
+        self.assertEqual(list(low_stock_items()), [self.mice, self.cables])
+
+    def test_alerts_are_raised_once_and_resolved(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            result = evaluate_low_stock()
+        self.assertEqual(result, {"checked": 4, "raised": 2, "resolved": 0, "orders": 1})
+
+        alert = StockAlert.objects.get(inventory=self.cables)
+        self.assertEqual((alert.quantity, alert.threshold), (3, 10))
+        order = alert.purchase_order
+        self.assertEqual((order.supplier, order.quantity, order.status), (self.supplier, 50, "pending"))
+        self.assertIsNone(StockAlert.objects.get(inventory=self.mice).purchase_order)
+        # The bulk-created order is counted and searchable like a saved one
+        self.assertEqual(diff_counters(compute_counters()), {})
+        self.assertTrue(SearchEntry.objects.filter(kind="purchase_order", object_id=order.pk).exists())
+
+        # Re-checking an item that already has an open alert changes nothing
+        self.assertEqual(evaluate_low_stock()["raised"], 0)
+        self.assertEqual(PurchaseOrder.objects.count(), 1)
+
+        self.cables.quantity = 60
+        self.cables.save()
+        result = evaluate_low_stock()
+        self.assertEqual((result["raised"], result["resolved"]), (0, 1))
+        self.assertIsNotNone(StockAlert.objects.get(inventory=self.cables).resolved_at)
+
+        # Falling low again opens a new alert
+        self.cables.quantity = 2
+        self.cables.save()
+        self.assertEqual(evaluate_low_stock()["raised"], 1)
+        self.assertEqual(StockAlert.objects.filter(inventory=self.cables, resolved_at__isnull=True).count(), 1)
+
+    def test_only_items_changed_since_the_last_run_are_checked(self):
+        evaluate_low_stock()
+        # Move the watermark past the overlap window, as if the last run was long ago
+        past = timezone.now() - datetime.timedelta(days=1)
+        Inventory.objects.update(updated_at=past)
+        Watermark.objects.filter(name=LOW_STOCK_WATERMARK).update(value=past + datetime.timedelta(hours=1))
+
+        self.desks.quantity = 2
+        self.desks.save()
+        self.assertEqual(evaluate_low_stock(), {"checked": 1, "raised": 1, "resolved": 0, "orders": 0})
+        self.assertEqual(evaluate_low_stock(full=True)["checked"], 4)
+
+    def test_dashboard_lists_low_items(self):
+        user = User.objects.create_superuser("admin", "admin@test.io", "pw")
+        self.client.force_login(user)
+        cache.clear()
+        content = self.client.get(reverse("dashboard")).content.decode()
+        self.assertIn("<td>Mice</td>", content)
+        self.assertNotIn("<td>Desks</td>", content)
+        self.assertNotIn("<td>Chairs</td>", content)
+
+
+def ledger_totals(model):
+    """{pk: sum of the item's movements}, which must equal its quantity."""
+    rows = StockMovement.objects.filter(model=model._meta.model_name).values("object_id").annotate(total=Sum("delta"))
+    return {row["object_id"]: row["total"] for row in rows}
+
+
+class StockLedgerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@test.io", "pw")
+        cls.category, cls.location, _ = make_catalog()
+        cls.annex = Location.objects.create(name="Annex")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse("inventory_add"), {
+            "name": "Cables", "category": self.category.pk, "location": self.location.pk,
+            "quantity": 10, "unit_price": "2.00",
+        })
+        self.item = Inventory.objects.get(name="Cables")
+
+    def assertLedgerMatches(self):
+        quantities = dict(Inventory.objects.values_list("id", "quantity"))
+        self.assertEqual(ledger_totals(Inventory), {pk: qty for pk, qty in quantities.items() if qty})
+        self.assertEqual(diff_counters(compute_counters()), {})
+
+    def edit(self, quantity, seen):
+        return self.client.post(reverse("inventory_edit", args=[self.item.pk]), {
+            "name": "Cables", "category": self.category.pk, "location": self.location.pk,
+            "quantity": quantity, "quantity_seen": seen, "unit_price": "2.00",
+        })
+
+    def test_new_items_start_with_a_receipt(self):
+        movement = StockMovement.objects.get()
+        self.assertEqual((movement.kind, movement.delta, movement.quantity), ("receipt", 10, 10))
+        self.assertEqual((movement.location, movement.user), (self.location, self.user))
+        self.assertLedgerMatches()
+
+    def test_moves_update_the_quantity_in_place(self):
+        move(self.item, 5, "receipt")
+        movement = move(self.item, -12, "issue", note="Site visit")
+        self.assertEqual((movement.delta, movement.quantity), (-12, 3))
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity, 3)
+
+        with self.assertRaises(InsufficientStock):
+            move(self.item, -4, "issue")
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity, 3)
+        self.assertEqual(StockMovement.objects.count(), 3)
+        self.assertLedgerMatches()
+
+    def test_concurrent_edits_both_apply(self):
+        # Two people opened the edit form while the quantity was 10
+        self.assertRedirects(self.edit(12, seen=10), reverse("inventory_list"))
+        self.assertRedirects(self.edit(7, seen=10), reverse("inventory_list"))
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity, 9)
+        self.assertEqual(
+            list(StockMovement.objects.filter(kind="adjustment").values_list("delta", flat=True).order_by("id")), [2, -3],
+        )
+
+        # Taking more than is left now fails instead of going negative
+        response = self.edit(0, seen=10)
+        self.assertContains(response, "The quantity changed while you were editing")
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity, 9)
+        self.assertLedgerMatches()
+
+    def test_other_fields_save_without_touching_the_quantity(self):
+        move(self.item, -4, "issue")
+        self.client.post(reverse("inventory_edit", args=[self.item.pk]), {
+            "name": "Cat6 Cables", "category": self.category.pk, "location": self.location.pk,
+            "quantity": 10, "quantity_seen": 10, "unit_price": "3.00",
+        })
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.name, self.item.unit_price, self.item.quantity), ("Cat6 Cables", Decimal("3.00"), 6))
+        self.assertLedgerMatches()
+
+    def test_asset_edits_apply_their_change(self):
+        data = {
+            "name": "Laptop", "category": self.category.pk, "location": self.location.pk,
+            "serial_number": "SN-1", "purchase_date": "2024-01-01", "status": "available", "quantity": 4,
+        }
+        self.client.post(reverse("asset_create"), data)
+        asset = Asset.objects.get(serial_number="SN-1")
+        move(asset, -1, "issue")
+        self.client.post(reverse("asset_update", args=[asset.pk]), {**data, "quantity": 6, "quantity_seen": 4})
+        asset.refresh_from_db()
+        self.assertEqual(asset.quantity, 5)
+        self.assertEqual(ledger_totals(Asset), {asset.pk: 5})
+        self.assertEqual(diff_counters(compute_counters()), {})
+
+    def test_transfer_moves_stock_to_the_item_at_the_other_location(self):
+        target = transfer(self.item, self.annex, 4, user=self.user)
+        self.assertEqual((target.name, target.location, target.quantity), ("Cables", self.annex, 4))
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity, 6)
+
+        # The next transfer reuses it
+        self.assertEqual(transfer(self.item, self.annex, 1).pk, target.pk)
+        out, into = StockMovement.objects.filter(kind="transfer").order_by("-id")[:2][::-1]
+        self.assertEqual((out.delta, out.location, out.other_location), (-1, self.location, self.annex))
+        self.assertEqual((into.delta, into.location, into.other_location), (1, self.annex, self.location))
+        with self.assertRaises(ValueError):
+            transfer(self.item, self.location, 1)
+        self.assertLedgerMatches()
+
+    def test_stock_page_records_movements(self):
+        url = reverse("inventory_stock", args=[self.item.pk])
+        self.assertRedirects(self.client.post(url, {"kind": "issue", "quantity": 3, "note": "Desk 4"}), url)
+        self.client.post(url, {"kind": "adjustment", "quantity": 5})
+        response = self.client.post(url, {"kind": "transfer", "quantity": 2})
+        self.assertFormError(response.context["form"], "location", "Pick the location to transfer to.")
+        response = self.client.post(url, {"kind": "issue", "quantity": 50})
+        self.assertContains(response, "Only 5 on hand")
+
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity, 5)
+        response = self.client.get(url)
+        self.assertEqual([m.delta for m in response.context["movements"]], [-2, -3, 10])
+        self.assertContains(response, "Desk 4")
+
+    def test_quantity_on_a_past_day_reads_the_latest_snapshot(self):
+        today = timezone.localdate()
+        days = [today - datetime.timedelta(days=n) for n in (5, 4, 3)]
+
+        def on(day):
+            return timezone.make_aware(datetime.datetime.combine(day, datetime.time(12)))
+
+        StockMovement.objects.update(created_at=on(days[0]))
+        for day, delta in ((days[1], -4), (days[2], 7)):
+            movement = move(self.item, delta, "receipt" if delta > 0 else "issue")
+            StockMovement.objects.filter(pk=movement.pk).update(created_at=on(day))
+
+        self.assertEqual(snapshot_stock(days[0]), 1)
+        self.assertEqual(snapshot_stock(days[1]), 1)
+        # Nothing moved since the last run, or the day was already done
+        self.assertEqual(snapshot_stock(days[1]), 0)
+        self.assertEqual(
+            list(StockSnapshot.objects.order_by("date").values_list("date", "quantity")), [(days[0], 10), (days[1], 6)],
+        )
+        with self.assertRaises(ValueError):
+            snapshot_stock(today)
+
+        expected = {days[0] - datetime.timedelta(days=1): 0, days[0]: 10, days[1]: 6, days[2]: 13, today: 13}
+        for day, quantity in expected.items():
+            with self.subTest(day=day):
+                with self.assertNumQueries(2):
+                    self.assertEqual(quantity_on(self.item, day), quantity)
+
+    def test_admin_records_new_quantities_and_leaves_existing_ones_alone(self):
+        fields = {
+            "name": "Cables", "category": self.category.pk, "location": self.location.pk, "unit_price": "2.00",
+            "created_at_0": "2025-01-01", "created_at_1": "00:00:00",
+        }
+        move(self.item, -4, "issue")
+        response = self.client.post(
+            reverse("admin:main_app_inventory_change", args=[self.item.pk]), {**fields, "name": "Cable", "quantity": 50},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.name, self.item.quantity), ("Cable", 6))
+
+        self.client.post(reverse("admin:main_app_inventory_add"), {**fields, "quantity": 7})
+        added = Inventory.objects.get(name="Cables")
+        self.assertEqual(ledger_totals(Inventory)[added.pk], 7)
+        self.assertLedgerMatches()
+
+    def test_csv_import_records_movements(self):
+        Asset.objects.create(
+            name="Laptop", category=self.category, location=self.location, quantity=1,
+            serial_number="SN-1", purchase_date=datetime.date(2024, 1, 1), status="available",
+        )
+        csv_text = CsvImportTests.ASSET_HEADER + (
+            "Laptop,Laptops,Warehouse A,SN-1,2024-01-01,available,3\n"
+            "Phone,Laptops,Warehouse A,SN-2,2024-01-01,available,2\n"
+        )
+        import_csv("assets", io.StringIO(csv_text), owner=self.user)
+        self.assertEqual(
+            sorted(StockMovement.objects.filter(model="asset").values_list("kind", "delta")),
+            [("adjustment", 2), ("receipt", 2)],
+        )
+        # The asset created without the form has no opening movement, so only the import's change is recorded
+        phone = Asset.objects.get(serial_number="SN-2")
+        self.assertEqual(ledger_totals(Asset)[phone.pk], 2)
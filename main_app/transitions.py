@@ -0,0 +1,73 @@
+"""
+Bulk purchase order status changes.
+
+``transition_orders`` reads the current status of every requested order in
+one locked query, checks each move against ALLOWED_STATUS_TRANSITIONS, then
+applies one ``UPDATE ... WHERE id IN (...) AND status = <from>`` per
+starting status. Like the other bulk paths it bypasses ``save()``, so it
+stamps ``updated_at``/``delivered_at``, moves the stat counters and drops
+the cached order tables itself.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .counters import apply_changes
+from .fragments import bump_generations
+from .kpis import invalidate_dashboard_kpis
+from .models import PurchaseOrder
+
+# from status -> statuses it may move to
+ALLOWED_STATUS_TRANSITIONS = {
+    "pending": ("confirmed",),
+    "confirmed": ("shipped",),
+    "shipped": ("delivered",),
+    "delivered": (),
+}
+
+STATUS_LABELS = dict(PurchaseOrder.STATUS_CHOICES)
+
+
+def transition_orders(ids, to_status):
+    """Move the orders ``ids`` to ``to_status``.
+
+    Returns one ``{"id", "ok", "from", "to", "error"}`` dict per requested id,
+    in the order given.
+    """
+    if to_status not in STATUS_LABELS:
+        raise ValueError(f"Unknown status {to_status!r}.")
+    ids = list(dict.fromkeys(ids))
+
+    results = {}
+    with transaction.atomic():
+        # Lock the rows so the statuses we checked are the ones we update
+        current = dict(PurchaseOrder.objects.select_for_update().filter(pk__in=ids).values_list("id", "status"))
+
+        by_status = {}
+        for pk in ids:
+            from_status = current.get(pk)
+            result = {"id": pk, "ok": False, "from": from_status, "to": to_status, "error": ""}
+            if from_status is None:
+                result["error"] = "Purchase order not found."
+            elif to_status not in ALLOWED_STATUS_TRANSITIONS[from_status]:
+                result["error"] = f"Can't go from {STATUS_LABELS[from_status]} to {STATUS_LABELS[to_status]}."
+            else:
+                by_status.setdefault(from_status, []).append(pk)
+                result["ok"] = True
+            results[pk] = result
+
+        now = timezone.now()
+        changes = {"status": to_status, "updated_at": now}
+        changes["delivered_at"] = now if to_status == "delivered" else F("delivered_at")
+        for from_status, pks in by_status.items():
+            PurchaseOrder.objects.filter(pk__in=pks, status=from_status).update(**changes)
+            apply_changes(
+                PurchaseOrder,
+                removed=[{"status": from_status}] * len(pks),
+                added=[{"status": to_status}] * len(pks),
+            )
+        if by_status:
+            transaction.on_commit(invalidate_dashboard_kpis)
+            transaction.on_commit(lambda: bump_generations(PurchaseOrder))
+
+    return [results[pk] for pk in ids]
@@ -10,6 +10,22 @@ urlpatterns = [
     # Home and Dashboard
     path('', home, name='home' ),
     path('dashboard/', dashboard, name='dashboard'),
+    path('search/', views.global_search, name='global_search'),
+    path('health/', views.health, name='health'),
+    path('metrics/requests/', views.request_metrics, name='request_metrics'),
+    path('reports/', views.reports_view, name='reports'),
+    path('reports/refresh/', views.reports_refresh, name='reports_refresh'),
+
+    # Read-only JSON API
+    path('api/', views.api_root, name='api_root'),
+    path('api/<str:resource>/', views.api_list, name='api_list'),
+    path('api/<str:resource>/<int:pk>/', views.api_detail, name='api_detail'),
+    path('sync/<str:resource>/', views.api_sync, name='api_sync'),
+
+    # Background jobs
+    path('jobs/<int:pk>/', views.job_detail, name='job_detail'),
+    path('jobs/<int:pk>/status/', views.job_status, name='job_status'),
+    path('jobs/<int:pk>/download/', views.job_download, name='job_download'),
 
     # Auth
     path('signup/', signup, name='signup'),
@@ -18,6 +34,8 @@ urlpatterns = [
     
     #purchase order
     path("purchase-list/", views.purchase_order_list, name="purchase_order_list"),
+    path("purchase-list/export/", views.purchase_order_export, name="purchase_order_export"),
+    path("purchase-list/status/", views.purchase_order_bulk_status, name="purchase_order_bulk_status"),
     path("purchase/<int:pk>/", views.purchase_order_detail, name="purchase_order_detail"),
     path("purchase/new/", views.purchase_order_create, name="purchase_order_create"),
     path("purchase/<int:pk>/edit/", views.purchase_order_edit, name="purchase_order_edit"),
@@ -25,6 +43,8 @@ urlpatterns = [
 
     # Asset URLS
     path('assets/', asset_index, name='asset_index'),
+    path('assets/export/', views.asset_export, name='asset_export'),
+    path('assets/import/', views.asset_import, name='asset_import'),
     path('assets/new/', AssetCreate.as_view(), name="asset_create"),
     path('assets/<int:pk>', AssetDetail.as_view(), name="asset_detail"),
     path("assets/<int:pk>/edit", AssetUpdate.as_view(), name='asset_update'),
@@ -32,9 +52,12 @@ urlpatterns = [
 
     # Inventory URLs
     path('inventory/', views.inventory_list, name='inventory_list'),
+    path('inventory/export/', views.inventory_export, name='inventory_export'),
+    path('inventory/import/', views.inventory_import, name='inventory_import'),
     path('inventory/add/', views.inventory_add, name='inventory_add'),
     path("inventory/<int:pk>/", views.inventory_detail, name='inventory_detail'),
     path('inventory/<int:pk>/edit/', views.inventory_edit, name='inventory_edit'),
+    path('inventory/<int:pk>/stock/', views.inventory_stock, name='inventory_stock'),
     path('inventory/<int:pk>/delete/', views.inventory_delete, name='inventory_delete'),
     path("inventory/report/<str:period>/", views.inventory_report, name="inventory_report"),
 
@@ -55,6 +78,7 @@ urlpatterns = [
     # Suppliers URLS
     path("suppliers/", views.supplier_list, name="supplier_list"),
     path("suppliers/new/", views.supplier_create, name="supplier_create"),
+    path("suppliers/search/", views.supplier_search, name="supplier_search"),
     path("suppliers/<int:pk>/", views.supplier_detail, name="supplier_detail"),
     path("suppliers/<int:pk>/edit/", views.supplier_edit, name="supplier_edit"),
     path("suppliers/<int:pk>/delete/", views.supplier_delete, name="supplier_delete"),
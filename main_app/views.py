@@ -1,22 +1,74 @@
+import os
 from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
 from django.contrib import messages
-from django.http import HttpResponseForbidden
+from django.http import FileResponse, Http404, HttpResponseForbidden, JsonResponse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_GET
 from datetime import timedelta
 
 # Auth Imports
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import get_user_model
 from django.contrib.auth import login
 from django.contrib.auth.mixins import LoginRequiredMixin
 
 # CBV Imports
 from django.views.generic import CreateView, DetailView, UpdateView, DeleteView
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.shortcuts import render, get_object_or_404, redirect
 
 # Form Imports
-from .forms import InventoryForm, CategoryForm, LocationForm, PurchaseOrderForm, AssetForm, SupplierForm, SignupForm
+from .forms import InventoryForm, CategoryForm, LocationForm, PurchaseOrderForm, AssetForm, SupplierForm, SignupForm, InventoryReportForm, ImportUploadForm, StockMovementForm
+
+# Concurrent reads for the async views
+from .concurrency import gather_queries, render_async, resolve_user, run_query
+
+# Health check and pool metrics
+from .health import check_database, pool_stats
+from .instrumentation import histogram
+
+# Pagination
+from .pagination import CursorPaginator, InvalidCursor, get_page_size, paginate
+
+# JSON API
+from .api import RESOURCES, InvalidFields, etag, filtered_queryset, selected_fields
+from .sync import sync_feed
+
+# List filters and exports
+from .filters import filter_assets, filter_inventory, filter_purchase_orders
+from .exports import csv_response
+
+# Background jobs
+from .jobs import enqueue
+
+# Dashboard KPIs and low stock
+from .kpis import get_dashboard_kpis
+from .alerts import low_stock_items
+
+# Group checks
+from .permissions import user_in_groups
+
+# Query plans
+from .query_plans import QueryPlan, QueryPlanMixin, render_planned
+
+# Fragment caching
+from .fragments import TableFragment
+
+# Reports
+from .analytics import category_distribution, last_materialized, lead_time_trend, supplier_spend
+from .reports import inventory_report as build_inventory_report
+
+# Bulk status changes
+from .transitions import transition_orders
+
+# Stock ledger
+from .stock import InsufficientStock, record_movement, save_stock_form
+
+# Search
+from .search import DETAIL_ROUTES, search_everything, search_suppliers
 
 # Models Imports
 from .models import Inventory
@@ -25,9 +77,46 @@ from .models import Location
 from .models import PurchaseOrder
 from .models import Supplier
 from .models import Asset
+from .models import Job
+from .models import StockMovement
 
 User = get_user_model()
 
+SUPPLIER_TYPEAHEAD_LIMIT = 10
+GLOBAL_SEARCH_LIMIT = 20
+# Movements listed on an item's stock page
+STOCK_HISTORY_LIMIT = 50
+
+# Query parameters that steer an export rather than filter it
+EXPORT_CONTROL_PARAMS = ("format", "background", "cursor", "page_size")
+
+
+# Query plans: the relations and columns each template reads
+PURCHASE_ORDER_LIST_PLAN = QueryPlan(select_related=["supplier"], only=["name", "order_date", "status", "updated_at", "supplier__name"])
+PURCHASE_ORDER_DETAIL_PLAN = QueryPlan(select_related=["supplier", "owner"], only=["order_date", "status", "supplier__name", "owner__username"])
+ASSET_LIST_PLAN = QueryPlan(select_related=["owner"], only=["name", "status", "updated_at", "owner__username"])
+ASSET_DETAIL_PLAN = QueryPlan(select_related=["category", "location", "owner"])
+INVENTORY_LIST_PLAN = QueryPlan(select_related=["category", "location"], only=["name", "quantity", "unit_price", "updated_at", "category__name", "location__name"])
+INVENTORY_DETAIL_PLAN = QueryPlan(select_related=["category", "location", "owner"], only=["name", "quantity", "unit_price", "created_at", "category__name", "location__name", "owner__username"])
+CATEGORY_LIST_PLAN = QueryPlan(only=["name", "description", "updated_at"])
+CATEGORY_DETAIL_PLAN = QueryPlan(select_related=["owner"], only=["name", "description", "created_at", "owner__username"])
+LOCATION_LIST_PLAN = QueryPlan(only=["name", "address", "updated_at"])
+LOCATION_DETAIL_PLAN = QueryPlan(select_related=["owner"], only=["name", "address", "owner__username"])
+SUPPLIER_LIST_PLAN = QueryPlan(only=["name", "contact_person", "email", "phone_number", "updated_at"])
+SUPPLIER_DETAIL_PLAN = QueryPlan(only=["name", "contact_person", "email", "phone_number", "address"])
+RECENT_PURCHASE_ORDERS_PLAN = QueryPlan(select_related=["supplier"], only=["order_date", "status", "updated_at", "supplier__name"])
+LOW_STOCK_PLAN = QueryPlan(select_related=["category"], only=["name", "quantity", "reorder_threshold", "updated_at", "category__name"])
+
+# Cached list and dashboard tables: the model each row shows and the related models it reads
+PURCHASE_ORDER_TABLE = TableFragment("purchase_order/purchase_order_table.html", "purchase_order/purchase_order_row.html", "order", PurchaseOrder, related=[Supplier])
+ASSET_TABLE = TableFragment("asset/asset_table.html", "asset/asset_row.html", "asset", Asset, related=[User])
+INVENTORY_TABLE = TableFragment("inventory/inventory_table.html", "inventory/inventory_row.html", "item", Inventory, related=[Category, Location])
+CATEGORY_TABLE = TableFragment("category/category_table.html", "category/category_row.html", "category", Category)
+LOCATION_TABLE = TableFragment("location/location_table.html", "location/location_row.html", "loc", Location)
+SUPPLIER_TABLE = TableFragment("supplier/supplier_table.html", "supplier/supplier_row.html", "s", Supplier)
+RECENT_PURCHASE_ORDERS_TABLE = TableFragment("partials/recent_purchase_orders.html", "partials/recent_purchase_order_row.html", "po", PurchaseOrder, related=[Supplier])
+LOW_STOCK_TABLE = TableFragment("partials/low_stock.html", "partials/low_stock_row.html", "it", Inventory, related=[Category])
+
 
 # Group Permisions
 def groups_required(*group_names):
@@ -42,18 +131,25 @@ def groups_required(*group_names):
         # Accepts the same arguments as the original view
         def _wrapped_view(request, *args, **kwargs):
 
-            # ✅ Superuser bypasses group checks
-            if request.user.is_authenticated and request.user.is_superuser:
-                return view_func(request, *args, **kwargs)
-
-            # Check if the user is logged in AND belongs to any of the allowed groups
-            if request.user.is_authenticated and request.user.groups.filter(name__in=group_names).exists():
+            # Check if the user is logged in AND is a superuser or belongs to any of the allowed groups
+            # (group names are loaded once per request, see permissions.py)
+            if user_in_groups(request, group_names):
                 # If the user is authorized, call the original view with the same arguments
                 return view_func(request, *args, **kwargs)
             
             # If the user is not authorized, return a 403 Forbidden response with a message
             return HttpResponseForbidden("You are not authorized to access this page.")
 
+        # Async views get an async wrapper; the group lookup itself is sync-only
+        @wraps(view_func)
+        async def _async_wrapped_view(request, *args, **kwargs):
+            await resolve_user(request)
+            if await sync_to_async(user_in_groups)(request, group_names):
+                return await view_func(request, *args, **kwargs)
+            return HttpResponseForbidden("You are not authorized to access this page.")
+
+        if iscoroutinefunction(view_func):
+            return _async_wrapped_view
         return _wrapped_view
 
     return decorator
@@ -63,25 +159,294 @@ def groups_required(*group_names):
 def home(request):
     return render(request, 'home.html') 
 
+# Health check for load balancers: 200 while the database answers, 503 otherwise.
+# Staff also see the database connection pool's usage.
+@require_GET
+def health(request):
+    ok, latency = check_database()
+    data = {"status": "ok" if ok else "unavailable", "database_ms": latency}
+    if request.user.is_staff:
+        data["pool"] = pool_stats()
+    return JsonResponse(data, status=200 if ok else 503)
+
+# Latency, query count and render time of recent requests, per view (see instrumentation.py)
+@staff_member_required
+@require_GET
+def request_metrics(request):
+    return JsonResponse(histogram.snapshot())
+
+# Search across assets, inventory, POs, suppliers, categories and locations
+@login_required
+@groups_required("Manager", "Owner" ,"Staff")
+def global_search(request):
+    query = request.GET.get('q', '')
+    try:
+        limit = min(int(request.GET.get('limit', GLOBAL_SEARCH_LIMIT)), GLOBAL_SEARCH_LIMIT)
+    except ValueError:
+        limit = GLOBAL_SEARCH_LIMIT
+    results = [
+        {
+            "kind": entry["kind"],
+            "id": entry["object_id"],
+            "title": entry["title"],
+            "subtitle": entry["subtitle"],
+            "url": reverse(DETAIL_ROUTES[entry["kind"]], args=[entry["object_id"]]),
+        }
+        for entry in search_everything(query, limit=max(limit, 1))
+    ]
+    return JsonResponse({"query": query, "results": results})
+
+# Read-only JSON API (see api.py)
+def _api_denied(request, resource):
+    if resource not in RESOURCES:
+        raise Http404("Unknown API resource.")
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required."}, status=401)
+    groups = RESOURCES[resource][3]
+    if groups and not user_in_groups(request, groups):
+        return JsonResponse({"error": "You are not authorized to access this resource."}, status=403)
+    return None
+
+def _api_response(request, data, tag):
+    response = JsonResponse(data)
+    response["ETag"] = tag
+    # Clients may keep a copy but must revalidate it (cheaply, via the ETag)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+@require_GET
+def api_root(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required."}, status=401)
+    return JsonResponse({
+        resource: {"url": reverse("api_list", args=[resource]), "fields": list(fields)}
+        for resource, (_, fields, _, _) in RESOURCES.items()
+    })
+
+@require_GET
+def api_list(request, resource):
+    denied = _api_denied(request, resource)
+    if denied:
+        return denied
+    try:
+        fields = selected_fields(resource, request.GET.get("fields"))
+    except InvalidFields as error:
+        return JsonResponse({"error": str(error)}, status=400)
+
+    queryset = filtered_queryset(resource, request.GET)
+    tag = etag(queryset, request.GET.urlencode())
+    not_modified = get_conditional_response(request, etag=tag)
+    if not_modified is not None:
+        return not_modified
+
+    paginator = CursorPaginator(queryset.values(*fields), ("id",), get_page_size(request))
+    try:
+        page = paginator.page(request.GET.get("cursor"))
+    except InvalidCursor as error:
+        return JsonResponse({"error": str(error)}, status=400)
+
+    def link(cursor):
+        if cursor is None:
+            return None
+        params = request.GET.copy()
+        params["cursor"] = cursor
+        return f"{request.path}?{params.urlencode()}"
+
+    return _api_response(request, {
+        "results": page.object_list,
+        "next": link(page.next_cursor),
+        "previous": link(page.previous_cursor),
+    }, tag)
+
+@require_GET
+def api_detail(request, resource, pk):
+    denied = _api_denied(request, resource)
+    if denied:
+        return denied
+    try:
+        fields = selected_fields(resource, request.GET.get("fields"))
+    except InvalidFields as error:
+        return JsonResponse({"error": str(error)}, status=400)
+
+    queryset = RESOURCES[resource][0].objects.filter(pk=pk)
+    tag = etag(queryset, request.GET.urlencode())
+    not_modified = get_conditional_response(request, etag=tag)
+    if not_modified is not None:
+        return not_modified
+
+    row = queryset.values(*fields).first()
+    if row is None:
+        return JsonResponse({"error": "Not found."}, status=404)
+    return _api_response(request, row, tag)
+
+@require_GET
+def api_sync(request, resource):
+    # The feed is every row plus tombstones, so it gets the same group check as the list
+    denied = _api_denied(request, resource)
+    if denied:
+        return denied
+    limit = request.GET.get("limit", "")
+    if limit and not limit.isdigit():
+        return JsonResponse({"error": "limit must be a positive number."}, status=400)
+    try:
+        fields = selected_fields(resource, request.GET.get("fields"))
+        feed = sync_feed(resource, fields, since=request.GET.get("since"), limit=int(limit or 0))
+    except (InvalidFields, InvalidCursor) as error:
+        return JsonResponse({"error": str(error)}, status=400)
+    return JsonResponse(feed)
+
 # View reports
 @login_required
 @groups_required("Manager", "Owner" ,"Staff")
 # Define the reports view function
 def reports_view(request):
+    # Everything here comes from pre-aggregated tables (see analytics.py)
+    context = {
+        "supplier_spend": supplier_spend(),
+        "lead_times": lead_time_trend(),
+        "categories": category_distribution(),
+        "refreshed_at": last_materialized(),
+    }
     # Render and return the "reports.html" template to the browser
-    return render(request, "reports.html")
+    return render_planned(request, "reports.html", context)
+
+# Refresh the report tables now instead of waiting for the nightly run
+@login_required
+@groups_required("Manager", "Owner")
+def reports_refresh(request):
+    if request.method != "POST":
+        return redirect("reports")
+    job = enqueue("materialize_reports", owner=request.user)
+    return redirect("job_detail", pk=job.pk)
+
+# Background jobs: users only see their own (superusers see all)
+def _get_job(request, pk):
+    jobs = Job.objects.all() if request.user.is_superuser else Job.objects.filter(owner=request.user)
+    return get_object_or_404(jobs, pk=pk)
+
+def _job_status(job):
+    return {
+        "id": job.pk,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress,
+        "total": job.total,
+        "percent": job.percent,
+        "message": job.message,
+        "result": job.result,
+        "download_url": reverse("job_download", args=[job.pk]) if job.result_file else None,
+    }
+
+@login_required
+def job_detail(request, pk):
+    job = _get_job(request, pk)
+    return render(request, "job_detail.html", {"job": job, "status": _job_status(job)})
+
+@login_required
+def job_status(request, pk):
+    return JsonResponse(_job_status(_get_job(request, pk)))
+
+@login_required
+def job_download(request, pk):
+    job = _get_job(request, pk)
+    if not job.result_file:
+        raise Http404("This job has no result file.")
+    return FileResponse(job.result_file.open("rb"), as_attachment=True, filename=os.path.basename(job.result_file.name))
+
+# Export a list with the same filters as the list view: CSV streams straight
+# back, XLSX (or ?background=1) is built by a background job
+def _export(request, name):
+    extension = "xlsx" if request.GET.get("format") == "xlsx" else "csv"
+    if extension == "xlsx" or request.GET.get("background"):
+        filters = {key: value for key, value in request.GET.items() if key not in EXPORT_CONTROL_PARAMS}
+        job = enqueue("export", owner=request.user, params={"name": name, "format": extension, "filters": filters})
+        return redirect("job_detail", pk=job.pk)
+    return csv_response(name, request.GET)
+
+@login_required
+def purchase_order_export(request):
+    return _export(request, "purchase_orders")
+
+@login_required
+@groups_required("Manager", "Owner" ,"Staff")
+def asset_export(request):
+    return _export(request, "assets")
+
+@login_required
+def inventory_export(request):
+    return _export(request, "inventory")
+
+# Queue a CSV upload for import; the job page shows progress and per-row errors
+def _import(request, kind, title, columns, back_url):
+    if request.method == "POST":
+        form = ImportUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            job = enqueue("import", owner=request.user, params={"kind": kind}, input_file=form.cleaned_data["file"])
+            return redirect("job_detail", pk=job.pk)
+    else:
+        form = ImportUploadForm()
+    return render(request, "import.html", {"form": form, "title": title, "columns": columns, "back_url": back_url})
+
+@login_required
+@groups_required("Manager", "Owner")
+def inventory_import(request):
+    return _import(request, "inventory", "Import Inventory", "name, category, location, quantity, unit_price", "inventory_list")
+
+@login_required
+@groups_required("Manager", "Owner")
+def asset_import(request):
+    return _import(
+        request, "assets", "Import Assets",
+        "name, category, location, serial_number, purchase_date, status, quantity", "asset_index",
+    )
 
 # View purchase order list
 @login_required
-def purchase_order_list(request):
-    orders = PurchaseOrder.objects.select_related("supplier").order_by("-order_date", "-id")
-    return render(request, "purchase_order/purchase_order_list.html", {"orders": orders})
+async def purchase_order_list(request):
+    orders = filter_purchase_orders(PURCHASE_ORDER_LIST_PLAN.apply(PurchaseOrder.objects.all()), request.GET)
+    # The table comes from the fragment cache until an order or supplier changes
+    table = await run_query(lambda: PURCHASE_ORDER_TABLE.render(
+        lambda: paginate(request, orders, ("-order_date", "-id")), request, status_choices=PurchaseOrder.STATUS_CHOICES,
+    ))
+    return await render_async(request, "purchase_order/purchase_order_list.html", {"table": table})
+
+# Move the checked purchase orders to a new status. The group check runs once
+# for the whole batch; ?format=json (or an Accept: application/json header)
+# returns the per-order results instead of redirecting back to the list.
+@login_required
+@groups_required("Manager", "Owner")
+def purchase_order_bulk_status(request):
+    if request.method != "POST":
+        return redirect("purchase_order_list")
+    wants_json = request.GET.get("format") == "json" or "application/json" in request.headers.get("Accept", "")
+    try:
+        ids = [int(pk) for pk in request.POST.getlist("ids")]
+        results = transition_orders(ids, request.POST.get("status", ""))
+    except ValueError as error:
+        if wants_json:
+            return JsonResponse({"error": str(error)}, status=400)
+        messages.error(request, "Pick some purchase orders and a valid status.")
+        return redirect("purchase_order_list")
+
+    if wants_json:
+        return JsonResponse({"results": results})
+    updated = [r for r in results if r["ok"]]
+    if updated:
+        messages.success(request, f"Updated {len(updated)} purchase order{'s' if len(updated) != 1 else ''}.")
+    for result in results:
+        if not result["ok"]:
+            messages.error(request, f"PO-{result['id']}: {result['error']}")
+    # Back to the page of the list the user was on
+    next_url = request.POST.get("next", "")
+    if not next_url.startswith(reverse("purchase_order_list")):
+        next_url = reverse("purchase_order_list")
+    return redirect(next_url)
 
 # Detail of purchase order
 @login_required
 def purchase_order_detail(request, pk):
-    order = get_object_or_404(PurchaseOrder, pk=pk)
-    return render(request, "purchase_order/purchase_order_detail.html", {"order": order})
+    order = get_object_or_404(PURCHASE_ORDER_DETAIL_PLAN.apply(PurchaseOrder.objects.all()), pk=pk)
+    return render_planned(request, "purchase_order/purchase_order_detail.html", {"order": order})
 
 # Add purchase order
 @login_required
@@ -138,44 +503,45 @@ def signup(request):
 
 @login_required
 @groups_required("Manager", "Owner" ,"Staff")
-def dashboard(request):
-    # KPIs
-    kpi = {
-        "assets": Asset.objects.count(),
-        "suppliers": Supplier.objects.count(),
-        "pos_open": PurchaseOrder.objects.filter(status__in=["pending","confirmed"]).count(),
-        "pos_delivered": PurchaseOrder.objects.filter(status="delivered").count(),
-    }
-
-    # Tables
-    recent_pos = PurchaseOrder.objects.select_related("supplier").order_by("-order_date", "-id")[:5]
-    low_stock  = Inventory.objects.order_by("quantity")[:5] 
+async def dashboard(request):
+    # KPIs and both tables are independent reads, so run them at the same time
+    kpi, recent_pos, low_stock = await gather_queries(
+        get_dashboard_kpis,
+        # Each table's query only runs when its cached copy is stale (see fragments.py)
+        lambda: RECENT_PURCHASE_ORDERS_TABLE.render(
+            lambda: list(RECENT_PURCHASE_ORDERS_PLAN.apply(PurchaseOrder.objects.order_by("-order_date", "-id"))[:5])
+        ),
+        lambda: LOW_STOCK_TABLE.render(lambda: list(LOW_STOCK_PLAN.apply(low_stock_items())[:5])),
+    )
 
     context = {
         "kpi": kpi,
         "recent_pos": recent_pos,
         "low_stock": low_stock,
     }
-    return render(request, "dashboard.html", context)
+    return await render_async(request, "dashboard.html", context)
 
 
 # Asset List
 
 @login_required
 @groups_required("Manager", "Owner" ,"Staff")
-def asset_index(request):
-    assets = Asset.objects.all()
-    return render(request, "asset/asset_list.html", {'assets': assets})
+async def asset_index(request):
+    assets = filter_assets(ASSET_LIST_PLAN.apply(Asset.objects.all()), request.GET)
+    table = await run_query(lambda: ASSET_TABLE.render(lambda: paginate(request, assets, ("id",)), request))
+    return await render_async(request, "asset/asset_list.html", {'table': table})
 
 # List category
 @login_required
 # Define the function that will list all categories
-def category_list(request):
-    # Query the database to get all Category objects
-    categories = Category.objects.all()
+async def category_list(request):
+    # Query the database for one page of Category objects, unless the table is cached
+    table = await run_query(lambda: CATEGORY_TABLE.render(
+        lambda: paginate(request, CATEGORY_LIST_PLAN.apply(Category.objects.all()), ("id",)), request,
+    ))
     # Render the category template
-    # Pass the list of categories into the template as context
-    return render(request, 'category/category_list.html', {'categories': categories})
+    # Pass the rendered table into the template as context
+    return await render_async(request, 'category/category_list.html', {'table': table})
 
 
 # Detail for category
@@ -184,9 +550,9 @@ def category_list(request):
 # It takes the request object and the primary key (pk) of the category
 def category_detail(request, pk):
     # Fetch the category object with given pk form db
-    category = get_object_or_404(Category, pk=pk)
+    category = get_object_or_404(CATEGORY_DETAIL_PLAN.apply(Category.objects.all()), pk=pk)
     # render the category template
-    return render(request, "category/category_detail.html", {"category": category})
+    return render_planned(request, "category/category_detail.html", {"category": category})
 
 # Add category
 @login_required
@@ -217,9 +583,9 @@ def category_add(request):
 @login_required
 def inventory_detail(request, pk):
     # Fetch the inventory object with given pk form db
-    inventory = get_object_or_404(Inventory, pk=pk)
+    inventory = get_object_or_404(INVENTORY_DETAIL_PLAN.apply(Inventory.objects.all()), pk=pk)
     # Render the template
-    return render(request, "inventory/inventory_detail.html", {"inventory": inventory})
+    return render_planned(request, "inventory/inventory_detail.html", {"inventory": inventory})
 
 # Edit category
 @login_required
@@ -263,11 +629,12 @@ def category_delete(request, pk):
 # List inventory
 @login_required
 # Define a function to list all inventory items
-def inventory_list(request):
-    # Fetch all inventory objects from the database
-    inventories = Inventory.objects.all()
+async def inventory_list(request):
+    # Fetch one page of inventory objects from the database, unless the table is cached
+    inventories = filter_inventory(INVENTORY_LIST_PLAN.apply(Inventory.objects.all()), request.GET)
+    table = await run_query(lambda: INVENTORY_TABLE.render(lambda: paginate(request, inventories, ("id",)), request))
     # Render the template
-    return render(request, 'inventory/inventory_list.html', {'inventories': inventories})
+    return await render_async(request, 'inventory/inventory_list.html', {'table': table})
 
 # Add inventory
 @login_required
@@ -281,12 +648,10 @@ def inventory_add(request):
         # Bind the submitted POST data to the InventoryForm
         form = InventoryForm(request.POST)
         if form.is_valid():
-            # Don't save yet 
-            inventory = form.save(commit=False)
             # Set the created by field and assign to logged in user
-            inventory.owner = request.user
-            # Now save to DB
-            inventory.save()
+            form.instance.owner = request.user
+            # Now save to DB, recording the opening quantity in the stock ledger
+            save_stock_form(form, request.user)
             return redirect('inventory_list')
     else:
         form = InventoryForm()
@@ -305,16 +670,50 @@ def inventory_edit(request, pk):
         form = InventoryForm(request.POST, instance=inventory)
         # Validate the form data
         if form.is_valid():
-            # Save the changes to DB
-            form.save()
-            # redirect back to inventory list
-            return redirect('inventory_list')
+            try:
+                # Save the changes to DB; the quantity changes by what the user changed
+                save_stock_form(form, request.user)
+            except InsufficientStock as error:
+                form.add_error(None, f"The quantity changed while you were editing: {error}")
+            else:
+                # redirect back to inventory list
+                return redirect('inventory_list')
        # If the request is not POST or form is invalid:
     else:
         # Create a form pre-filled with the existing inventory data
         form = InventoryForm(instance=inventory)
     return render(request, 'inventory/inventory_form.html', {'form': form, 'title': 'Edit Inventory'})
 
+# Inventory stock movements
+@login_required
+# Authorization of groups
+@groups_required("Manager", "Owner", "Staff")
+def inventory_stock(request, pk):
+    # Get the inventory object with the given primary key
+    item = get_object_or_404(Inventory.objects.select_related("location"), pk=pk)
+    # Check if the request method is POST
+    if request.method == 'POST':
+        # Bind the submitted POST data to the StockMovementForm
+        form = StockMovementForm(request.POST)
+        if form.is_valid():
+            try:
+                # Apply the movement and record it in the ledger
+                record_movement(item, user=request.user, **form.cleaned_data)
+            except ValueError as error:
+                form.add_error(None, str(error))
+            else:
+                messages.success(request, f"Stock updated for {item.name}.")
+                return redirect('inventory_stock', pk=item.pk)
+    else:
+        form = StockMovementForm()
+    # The item's latest movements, newest first
+    movements = (
+        StockMovement.objects.filter(model="inventory", object_id=item.pk)
+        .select_related("location", "other_location", "user")
+        .order_by("-created_at", "-id")[:STOCK_HISTORY_LIMIT]
+    )
+    return render(request, 'inventory/inventory_stock.html', {'item': item, 'form': form, 'movements': movements})
+
 # Delete inventory
 @login_required
 # Authorization of groups
@@ -330,38 +729,50 @@ def inventory_delete(request, pk):
     # Render the template
     return render(request, 'inventory/inventory_delete_confirm.html', {'item': item})
 
+# Inventory report
+@login_required
 def inventory_report(request, period):
     # Get today's date
     today = timezone.now().date()
     # Check what period was requested
     if period == "week":
-        # For weekly report: include items from the last 7 days
-        start_date = today - timedelta(days=7)
+        # For weekly report: the last 7 days, day by day
+        initial = {"start": today - timedelta(days=7), "group": "day"}
     elif period == "month":
-        # For monthly report: include items from the start of the current month
-        start_date = today.replace(day=1)
+        # For monthly report: from the start of the current month, day by day
+        initial = {"start": today.replace(day=1), "group": "day"}
     elif period == "year":
-        # For yearly report: include items from the start of the current year
-        start_date = today.replace(month=1, day=1)
+        # For yearly report: from the start of the current year, month by month
+        initial = {"start": today.replace(month=1, day=1), "group": "month"}
     else:
         # If an invalid period is passed, fallback to today's date only
-        start_date = today
-     # Fetch inventory records created after the start_date
-    inventories = Inventory.objects.filter(created_at__gte=start_date)
-
-    return render(request, "inventory/report.html", {
-        "inventories": inventories,
+        initial = {"start": today, "group": "day"}
+    initial.update(end=today, by="category")
+
+    # ?start=&end=&group=&by= override the preset
+    form = InventoryReportForm({**initial, **request.GET.dict()})
+    periods = []
+    if form.is_valid():
+        data = form.cleaned_data
+        # Only show periods that had activity
+        periods = [p for p in build_inventory_report(data["start"], data["end"], data["group"], data["by"]) if p["rows"]]
+
+    return render_planned(request, "inventory/report.html", {
+        "form": form,
+        "periods": periods,
         "period": period.capitalize()
     })
 
 # Locations List
 @login_required
 @groups_required("Manager", "Owner" ,"Staff")
-def location_list(request):
-    # Fetch all location objects from the database
-    locations = Location.objects.all()
+async def location_list(request):
+    # Fetch one page of location objects from the database, unless the table is cached
+    table = await run_query(lambda: LOCATION_TABLE.render(
+        lambda: paginate(request, LOCATION_LIST_PLAN.apply(Location.objects.all()), ("id",)), request,
+    ))
     # Render the template
-    return render(request, 'location/location_list.html', {'locations': locations})
+    return await render_async(request, 'location/location_list.html', {'table': table})
 
 # Add a Location
 @login_required
@@ -389,9 +800,9 @@ def location_add(request):
 @groups_required("Manager", "Owner" ,"Staff")
 def location_detail(request, pk):
     # Fetch all location objects from the database
-    locations = get_object_or_404(Location, pk=pk)
+    locations = get_object_or_404(LOCATION_DETAIL_PLAN.apply(Location.objects.all()), pk=pk)
     # Render the template
-    return render(request, "location/location_detail.html", {"locations": locations})
+    return render_planned(request, "location/location_detail.html", {"locations": locations})
 
 # Edit a Location
 @login_required
@@ -430,26 +841,36 @@ def location_delete(request, pk):
 
 @login_required
 @groups_required("Manager", "Owner" ,"Staff")
-def supplier_list(request):
-    query = request.GET.get('q')
+async def supplier_list(request):
+    query = request.GET.get('q', '').strip()
     if query:
-        supplier = Supplier.objects.filter(
-            name__icontains=query
-        ) | Supplier.objects.filter(
-            contact_person__icontains=query
-        ) | Supplier.objects.filter(
-            email__icontains=query
-        )
+        # Indexed, ranked search (see search.py); best matches first
+        supplier = search_suppliers(query)
+        ordering = ("-rank", "id")
     else:
         supplier = Supplier.objects.all()
-    
-    return render(request, 'supplier/supplier_list.html', {'supplier': supplier})
+        ordering = ("id",)
+
+    table = await run_query(lambda: SUPPLIER_TABLE.render(lambda: paginate(request, SUPPLIER_LIST_PLAN.apply(supplier), ordering), request))
+    return await render_async(request, 'supplier/supplier_list.html', {'table': table, 'query': query})
+
+
+# Supplier type-ahead
+@login_required
+@groups_required("Manager", "Owner" ,"Staff")
+def supplier_search(request):
+    query = request.GET.get('q', '').strip()
+    results = []
+    if query:
+        suppliers = search_suppliers(query).order_by("-rank", "id").values("id", "name", "contact_person", "email")
+        results = list(suppliers[:SUPPLIER_TYPEAHEAD_LIMIT])
+    return JsonResponse({"results": results})
 
 @login_required
 @groups_required("Manager", "Owner")
 def supplier_detail(request, pk):
-    supplier = get_object_or_404(Supplier, pk=pk)
-    return render(request, "supplier/supplier_detail.html", {"supplier": supplier})
+    supplier = get_object_or_404(SUPPLIER_DETAIL_PLAN.apply(Supplier.objects.all()), pk=pk)
+    return render_planned(request, "supplier/supplier_detail.html", {"supplier": supplier})
 
 
 @login_required
@@ -492,16 +913,9 @@ class GroupRequiredMixin:
     groups_required = None
 
     def dispatch(self, request, *args, **kwargs):
-        user = request.user
-        # check if user is authenticated 
-        if user.is_authenticated:
-            # Superuser always allowed
-            if user.is_superuser:
-                return super().dispatch(request, *args, **kwargs)
-            
-            # Groups specified
-            if self.groups_required and user.groups.filter(name__in=self.groups_required).exists():
-                return super().dispatch(request, *args, **kwargs)
+        # Same check as groups_required: superuser or member of one of the groups
+        if user_in_groups(request, self.groups_required or ()):
+            return super().dispatch(request, *args, **kwargs)
 
         # If none matched
         messages.error(request, "You are not authorized to access this feature.")
@@ -514,8 +928,13 @@ class AssetCreate(LoginRequiredMixin, GroupRequiredMixin, CreateView):
     groups_required = ["Manager", "Owner", "Staff"]
     success_url = reverse_lazy("asset_index")
 
+    def form_valid(self, form):
+        # Save, recording the opening quantity in the stock ledger
+        self.object = save_stock_form(form, self.request.user)
+        return redirect(self.get_success_url())
+
 
-class AssetDetail(LoginRequiredMixin, GroupRequiredMixin, DetailView):
+class AssetDetail(LoginRequiredMixin, GroupRequiredMixin, QueryPlanMixin, DetailView):
 
     # Set user as owner
     def form_valid(self, form):
@@ -526,6 +945,7 @@ class AssetDetail(LoginRequiredMixin, GroupRequiredMixin, DetailView):
     model = Asset
     template_name = "asset/asset_detail.html"
     groups_required = ["Manager", "Owner", "Staff"]
+    query_plan = ASSET_DETAIL_PLAN
     
 
 class AssetUpdate(LoginRequiredMixin, GroupRequiredMixin, UpdateView):
@@ -536,6 +956,15 @@ class AssetUpdate(LoginRequiredMixin, GroupRequiredMixin, UpdateView):
     groups_required = ["Manager", "Owner", ]
     success_url = reverse_lazy("asset_index")
 
+    def form_valid(self, form):
+        try:
+            # Save; the quantity changes by what the user changed
+            self.object = save_stock_form(form, self.request.user)
+        except InsufficientStock as error:
+            form.add_error(None, f"The quantity changed while you were editing: {error}")
+            return self.form_invalid(form)
+        return redirect(self.get_success_url())
+
 
 class AssetDelete(LoginRequiredMixin, GroupRequiredMixin, DeleteView):
 
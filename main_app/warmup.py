@@ -0,0 +1,29 @@
+"""
+Template warm-up for new server processes.
+
+The cached template loader compiles a template the first time a request
+renders it, so a fresh worker's first response to each page also pays for
+compiling the page, ``base.html`` and the partials it includes.
+``warm_templates`` compiles every template under main_app/templates up
+front; gunicorn calls it as each worker boots, before the worker accepts
+requests (see gunicorn.conf.py).
+"""
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.template.loader import get_template
+
+
+def template_names():
+    root = Path(apps.get_app_config("main_app").path) / "templates"
+    return sorted(path.relative_to(root).as_posix() for path in root.rglob("*.html"))
+
+
+def warm_templates():
+    """Compile every main_app template into the cached loader; returns ``(count, seconds)``."""
+    start = time.perf_counter()
+    names = template_names()
+    for name in names:
+        get_template(name)
+    return len(names), time.perf_counter() - start
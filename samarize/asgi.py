@@ -2,6 +2,7 @@
 ASGI config for samarize project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with e.g. ``uvicorn samarize.asgi:application`` (see the README).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 import os
 import dj_database_url
@@ -54,6 +55,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    'main_app.instrumentation.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -64,12 +66,18 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'samarize.urls'
 
+# Templates live in the apps' templates/ directories. The cached loader compiles each
+# template once per process; gunicorn workers compile them all at boot (see gunicorn.conf.py).
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [BASE_DIR / 'templates'], 
-        'APP_DIRS': True,
+        'DIRS': [],
         'OPTIONS': {
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -80,6 +88,9 @@ TEMPLATES = [
     },
 ]
 
+# Compile every main_app template when a gunicorn worker boots (see main_app/warmup.py)
+TEMPLATE_WARMUP = os.getenv("TEMPLATE_WARMUP", "True") == "True"
+
 WSGI_APPLICATION = 'samarize.wsgi.application'
 
 
@@ -105,6 +116,21 @@ else:
     }
 
 
+# Connection pooling (psycopg 3). With DB_POOL=True each process keeps between
+# DB_POOL_MIN_SIZE and DB_POOL_MAX_SIZE open connections that requests borrow and
+# return, instead of connecting (and negotiating TLS) per request or keeping one
+# per thread. A request that waits more than DB_POOL_TIMEOUT seconds for a free
+# connection fails. Pooled connections can't also be persistent, so CONN_MAX_AGE is 0.
+DB_POOL = os.getenv("DB_POOL", "False") == "True"
+if DB_POOL:
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"].setdefault("OPTIONS", {})["pool"] = {
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+        "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -141,10 +167,110 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / "staticfiles"
+
+# Job input files and results (the web and run_jobs processes must share this storage)
+MEDIA_ROOT = os.getenv("MEDIA_ROOT", BASE_DIR / "media")
 LOGIN_URL = "login"
 LOGIN_REDIRECT_URL = "dashboard"
 LOGOUT_REDIRECT_URL = "home"
 
+# Cache
+# Defaults to a per-process memory cache; set REDIS_URL (and install the
+# redis package) so every gunicorn worker and the run_jobs worker share one cache.
+SHARED_CACHE = "REDIS_URL" in os.environ
+if SHARED_CACHE:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            # The fragment cache stores one entry per table row; the default of 300 would thrash
+            "OPTIONS": {"MAX_ENTRIES": int(os.getenv("LOCMEM_CACHE_MAX_ENTRIES", "20000"))},
+        }
+    }
+
+# Seconds the dashboard KPIs stay cached (writes invalidate them sooner)
+KPI_CACHE_TTL = int(os.getenv("KPI_CACHE_TTL", "60"))
+
+# Cache the list and dashboard tables and their rows (see main_app/fragments.py); writes
+# invalidate them, the TTL only bounds how long unused copies take up cache memory.
+# On by default only with a shared cache: a write in one process invalidates that
+# process's cache alone, so with per-process caches the others would serve stale tables.
+FRAGMENT_CACHE = os.getenv("FRAGMENT_CACHE", str(SHARED_CACHE)) == "True"
+FRAGMENT_CACHE_TTL = int(os.getenv("FRAGMENT_CACHE_TTL", str(24 * 60 * 60)))
+
+# Seconds the inventory report's closed periods stay cached (item writes drop them sooner).
+# Forever with a shared cache; with per-process caches a write in one process isn't
+# seen by the others, so the TTL bounds how stale their copies get.
+INVENTORY_REPORT_CACHE_TTL = (
+    int(os.environ["INVENTORY_REPORT_CACHE_TTL"]) if "INVENTORY_REPORT_CACHE_TTL" in os.environ
+    else None if SHARED_CACHE else 60
+)
+
+# Pagination (list views use keyset pagination, see main_app/pagination.py)
+PAGINATION_PAGE_SIZE = int(os.getenv("PAGINATION_PAGE_SIZE", "50"))
+PAGINATION_MAX_PAGE_SIZE = int(os.getenv("PAGINATION_MAX_PAGE_SIZE", "200"))
+
+# Exports read this many rows per database round trip and flush CSV output every EXPORT_BUFFER_BYTES
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "2000"))
+EXPORT_BUFFER_BYTES = int(os.getenv("EXPORT_BUFFER_BYTES", str(64 * 1024)))
+
+# CSV imports write this many rows per transaction and report at most IMPORT_MAX_ERRORS bad rows
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+
+# Background jobs: worker threads per run_jobs process, seconds between polls for
+# new jobs, and how long a running job may go without reporting progress
+# before another worker picks it up again
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "600"))
+
+# Delta sync (/sync/<resource>/) returns at most SYNC_PAGE_SIZE changes per call and holds
+# back changes younger than SYNC_SETTLE_SECONDS, which may belong to uncommitted transactions
+SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", "1000"))
+SYNC_SETTLE_SECONDS = int(os.getenv("SYNC_SETTLE_SECONDS", "5"))
+
+# Threads (each with its own database connection) that async views run concurrent reads on
+ASYNC_QUERY_THREADS = int(os.getenv("ASYNC_QUERY_THREADS", "8"))
+
+# Per-request metrics (see main_app/instrumentation.py): Server-Timing headers, one JSON log
+# line per request, and the last REQUEST_METRICS_WINDOW requests per view at /metrics/requests/.
+# A statement repeated DUPLICATE_QUERY_THRESHOLD times in one request is logged with its origin (0 turns this off).
+REQUEST_METRICS = os.getenv("REQUEST_METRICS", "True") == "True"
+REQUEST_METRICS_WINDOW = int(os.getenv("REQUEST_METRICS_WINDOW", "1000"))
+DUPLICATE_QUERY_THRESHOLD = int(os.getenv("DUPLICATE_QUERY_THRESHOLD", "10"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "main_app.requests": {
+            "handlers": ["console"],
+            "level": os.getenv("REQUEST_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
+
+# Also keep each user's group names in their session (invalidated on membership changes).
+# The membership versions live in the cache, so this needs a cache shared by every process:
+# with per-process caches, a process that missed a revocation would keep trusting the old copy.
+GROUP_CACHE_IN_SESSION = os.getenv("GROUP_CACHE_IN_SESSION", "False") == "True"
+if GROUP_CACHE_IN_SESSION and not SHARED_CACHE:
+    raise ImproperlyConfigured("GROUP_CACHE_IN_SESSION requires a shared cache; set REDIS_URL.")
+
+# Raise when a template issues SQL its view's query plan didn't load (tests turn this on)
+STRICT_QUERY_PLANS = os.getenv("STRICT_QUERY_PLANS", "False") == "True"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 